@@ -0,0 +1,675 @@
+#!/usr/bin/env python
+# Servidor local que imita os endpoints de /management/domain usados pelos
+# modulos gf_*, para medir os modulos sem um dominio GlassFish real.
+#
+# Uso isolado:
+#   python benchmarks/mock_das.py --port 4848 --clusters 10 --instances 5 --latency 0.02
+#
+# Ou dentro do harness (benchmarks/run_benchmarks.py), que sobe o servidor numa
+# thread, monta o dominio com o tamanho desejado e le os contadores.
+
+import argparse
+import base64
+import gzip
+import json
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer as ThreadingHTTPServer
+
+try:
+    from urllib.parse import parse_qs, unquote, urlsplit
+except ImportError:
+    from urllib import unquote
+    from urlparse import parse_qs, urlsplit
+
+# Tamanho minimo de resposta comprimida com compression (compressionMinSize
+# padrao do Grizzly)
+COMPRESSION_MIN_SIZE = 2048
+
+PREFIX = '/management/domain'
+SESSIONS = '/management/sessions'
+
+
+class MockDomain(object):
+    # Estado do dominio. flavor 'glassfish3' responde o list-clusters no formato
+    # 'properties'; 'payara' usa extraProperties.clusterNames.
+    def __init__(self, flavor='payara'):
+        self.flavor = flavor
+        self.lock = threading.RLock()
+        self.nodes = {}
+        # Como no DAS, os atributos SSH ficam em nodes/node/{name}/ssh-connector
+        # e ssh-connector/ssh-auth, fora da entidade do node
+        self.ssh_connectors = {}
+        self.clusters = {}
+        self.servers = {'server': dict(cluster=None, node='localhost-domain1', status='RUNNING', system_properties={})}
+        self.configs = {'server-config': dict(jms_hosts={}), 'default-config': dict(jms_hosts={})}
+        # Contador de mudancas do domain.xml, exposto como ETag de /management/domain
+        self.version = 1
+
+    @classmethod
+    def build(cls, flavor='payara', clusters=0, instances=0, nodes=0, properties=0, jms_hosts=0):
+        domain = cls(flavor)
+        for n in range(nodes):
+            domain.add_node(f"node{n}", f"host{n}.example.com")
+        for c in range(clusters):
+            cluster = f"cluster{c}"
+            domain.add_cluster(cluster)
+            for p in range(properties):
+                domain.clusters[cluster]['system_properties'][f"prop{p}"] = dict(value=f"value{p}", default_value=None)
+            for h in range(jms_hosts):
+                domain.configs[f"{cluster}-config"]['jms_hosts'][f"jms{h}"] = dict(
+                    name=f"jms{h}", host=f"mq{h}.example.com", port='7676', adminUserName='admin', adminPassword='admin')
+            for i in range(instances):
+                domain.add_instance(f"{cluster}-i{i}", cluster, f"node{i % nodes}" if nodes else 'localhost-domain1')
+        return domain
+
+    def add_node(self, name, nodehost, nodedir='/opt/glassfish/nodes', sshport='22', sshuser='glassfish', sshkeyfile=''):
+        self.nodes[name] = dict(name=name, nodeHost=nodehost, nodeDir=nodedir, installDir='/opt/glassfish', type='SSH')
+        self.ssh_connectors[name] = dict(connector=dict(sshHost=nodehost, sshPort=str(sshport)),
+                                         auth=dict(userName=sshuser, keyfile=sshkeyfile, password=None))
+
+    def add_cluster(self, name):
+        self.clusters[name] = dict(instances=[], system_properties={})
+        self.configs[f"{name}-config"] = dict(jms_hosts={
+            'default_JMS_host': dict(name='default_JMS_host', host='localhost', port='27676',
+                                     adminUserName='admin', adminPassword='admin')
+        })
+
+    def add_instance(self, name, cluster, node, portbase=None):
+        self.servers[name] = dict(cluster=cluster, node=node, status='RUNNING', portbase=portbase, system_properties={})
+        self.clusters[cluster]['instances'].append(name)
+
+
+def entity_response(entity, children=None):
+    return {
+        "message": "",
+        "command": "",
+        "exit_code": "SUCCESS",
+        "extraProperties": {
+            "entity": entity,
+            "methods": [{"name": "GET"}, {"name": "POST"}, {"name": "DELETE"}],
+            "childResources": children or {}
+        }
+    }
+
+
+# "a=1:b=2" do create-system-properties em [(nome, valor)], sem escapes. Uma
+# barra invertida escapa sempre o caractere seguinte (inclusive outra barra).
+def parse_properties(text):
+    properties = []
+    parts = ['']
+    escaped = False
+    for char in text + ':':
+        if escaped:
+            parts[-1] += char
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == ':':
+            if parts != ['']:
+                properties.append((parts[0], parts[1] if len(parts) > 1 else ''))
+            parts = ['']
+        elif char == '=' and len(parts) == 1:
+            parts.append('')
+        else:
+            parts[-1] += char
+    return properties
+
+
+def command_response(extra=None, properties=None, message=""):
+    data = {"message": message, "command": "", "exit_code": "SUCCESS", "extraProperties": extra or {}}
+    if properties is not None:
+        data["properties"] = properties
+    return data
+
+
+class MockDASHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    # Roteamento: lista de (metodo, regex do caminho, nome do metodo do handler)
+    ROUTES = [
+        ('GET', r'/', 'get_domain'),
+        ('GET', r'/clusters/list-clusters', 'list_clusters'),
+        ('POST', r'/clusters/cluster', 'create_cluster'),
+        ('GET', r'/clusters/cluster/(?P<cluster>[^/]+)', 'get_cluster'),
+        ('DELETE', r'/clusters/cluster/(?P<cluster>[^/]+)', 'delete_cluster'),
+        ('GET', r'/clusters/cluster/(?P<cluster>[^/]+)/list-instances', 'list_instances'),
+        ('GET', r'/clusters/cluster/(?P<cluster>[^/]+)/system-properties', 'get_system_properties'),
+        ('POST', r'/clusters/cluster/(?P<cluster>[^/]+)/system-properties', 'set_system_properties'),
+        ('DELETE', r'/clusters/cluster/(?P<cluster>[^/]+)/system-properties/(?P<name>[^/]+)', 'delete_system_property'),
+        ('POST', r'/create-instance', 'create_instance'),
+        ('POST', r'/create-system-properties', 'create_system_properties'),
+        ('GET', r'/servers/server/(?P<server>[^/]+)', 'get_server'),
+        ('DELETE', r'/servers/server/(?P<server>[^/]+)/delete-instance', 'delete_instance'),
+        ('POST', r'/servers/server/(?P<server>[^/]+)/start-instance', 'start_instance'),
+        ('POST', r'/servers/server/(?P<server>[^/]+)/stop-instance', 'stop_instance'),
+        ('POST', r'/servers/server/(?P<server>[^/]+)/restart-instance', 'restart_instance'),
+        ('GET', r'/servers/server/(?P<server>[^/]+)/system-properties', 'get_system_properties'),
+        ('POST', r'/servers/server/(?P<server>[^/]+)/system-properties', 'set_system_properties'),
+        ('DELETE', r'/servers/server/(?P<server>[^/]+)/system-properties/(?P<name>[^/]+)', 'delete_system_property'),
+        ('GET', r'/nodes/node', 'list_nodes'),
+        ('GET', r'/nodes/node/(?P<node>[^/]+)', 'get_node'),
+        ('GET', r'/nodes/node/(?P<node>[^/]+)/ssh-connector', 'get_ssh_connector'),
+        ('GET', r'/nodes/node/(?P<node>[^/]+)/ssh-connector/ssh-auth', 'get_ssh_auth'),
+        ('POST', r'/nodes/create-node-ssh', 'create_node'),
+        ('POST', r'/nodes/node/(?P<node>[^/]+)/update-node-ssh', 'update_node'),
+        ('DELETE', r'/nodes/node/(?P<node>[^/]+)/delete-node-ssh', 'delete_node'),
+        ('GET', r'/nodes/node/(?P<node>[^/]+)/ping-node-ssh', 'ping_node'),
+        ('GET', r'/configs/config', 'list_configs'),
+        ('GET', r'/configs/config/(?P<config>[^/]+)/jms-service/jms-host', 'list_jms_hosts'),
+        ('POST', r'/configs/config/(?P<config>[^/]+)/jms-service/jms-host', 'create_jms_host'),
+        ('GET', r'/configs/config/(?P<config>[^/]+)/jms-service/jms-host/(?P<host>[^/]+)', 'get_jms_host'),
+        ('POST', r'/configs/config/(?P<config>[^/]+)/jms-service/jms-host/(?P<host>[^/]+)', 'update_jms_host'),
+        ('DELETE', r'/configs/config/(?P<config>[^/]+)/jms-service/jms-host/(?P<host>[^/]+)', 'delete_jms_host'),
+        ('GET', r'/jobs/id/(?P<job_id>[^/]+)', 'get_job'),
+    ]
+
+    # Comandos que nao alteram o domain.xml
+    RUNTIME = ('start_instance', 'stop_instance', 'restart_instance')
+
+    # Comandos que aceitam __detached=true
+    DETACHABLE = ('create_instance', 'create_node', 'start_instance', 'stop_instance', 'restart_instance')
+
+    @property
+    def domain(self):
+        return self.server.domain
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_DELETE(self):
+        self.dispatch('DELETE')
+
+    def dispatch(self, method):
+        self.server.count_request(method)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        raw_body = self.rfile.read(length) if length else b''
+        self.server.count_bytes(len(raw_body))
+        try:
+            self.body = json.loads(raw_body) if raw_body else {}
+        except ValueError:
+            self.body = {}
+
+        parts = urlsplit(self.path)
+        self.query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        path = parts.path
+        if path.rstrip('/') == SESSIONS and method == 'POST':
+            return self.login()
+        if path.startswith(SESSIONS + '/') and method == 'DELETE':
+            return self.logout(path[len(SESSIONS) + 1:])
+        if not self.authenticate():
+            return self.send_json(401, command_response(message="Authentication required"))
+        if not path.startswith(PREFIX):
+            return self.send_json(404, command_response(message=f"Unknown path {path}"))
+        path = path[len(PREFIX):].rstrip('/') or '/'
+
+        for route_method, pattern, handler in self.ROUTES:
+            if route_method != method:
+                continue
+            match = re.fullmatch(pattern, path)
+            if match:
+                with self.domain.lock:
+                    status, data = getattr(self, handler)(**match.groupdict())
+                    # Toda escrita bem-sucedida na configuracao muda a versao do domain.xml
+                    if method != 'GET' and status == 200 and handler not in self.RUNTIME:
+                        self.domain.version += 1
+                if handler == 'get_domain':
+                    return self.send_json(status, data, {'ETag': f'"{self.domain.version}"'})
+                if handler in self.DETACHABLE and self.query.get('__detached') == 'true':
+                    job_id = self.server.add_job(status, data)
+                    location = f"{self.base_url()}/jobs/id/{job_id}"
+                    return self.send_json(202, command_response(extra=dict(jobId=job_id)), {'Location': location})
+                return self.send_json(status, data)
+
+        self.send_json(404, command_response(message=f"No mock for {method} {path}"))
+
+    def send_json(self, status, data, headers=None):
+        payload = json.dumps(data).encode('utf-8')
+        # Como um http-listener com compression=on: gzip quando o cliente aceita
+        gzipped = (self.server.compression and len(payload) >= COMPRESSION_MIN_SIZE
+                   and 'gzip' in (self.headers.get('Accept-Encoding') or ''))
+        if gzipped:
+            payload = gzip.compress(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+        self.server.count_bytes(len(payload))
+
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}{PREFIX}"
+
+    # Autenticacao: cookie gfresttoken de uma sessao valida ou Basic auth. Cada
+    # Basic auth conta como uma consulta ao realm (basic_auths).
+
+    def basic_auth(self):
+        header = self.headers.get('Authorization') or ''
+        if not header.startswith('Basic '):
+            return False
+        user, _, password = base64.b64decode(header[6:]).decode('utf-8').partition(':')
+        self.server.count_basic_auth()
+        return bool(user)
+
+    def request_token(self):
+        for cookie in (self.headers.get('Cookie') or '').split(';'):
+            name, _, value = cookie.strip().partition('=')
+            if name == 'gfresttoken':
+                return value
+        return None
+
+    def authenticate(self):
+        token = self.request_token()
+        if token is not None and self.server.touch_token(token):
+            return True
+        return self.basic_auth()
+
+    def login(self):
+        if not self.server.sessions or not self.basic_auth():
+            status = 404 if not self.server.sessions else 401
+            return self.send_json(status, command_response(message="Login failed"))
+        token = self.server.add_token()
+        return self.send_json(200, command_response(extra=dict(token=token)))
+
+    def logout(self, token):
+        if not self.server.remove_token(token):
+            return self.send_json(404, command_response(message=f"Session {token} not found"))
+        return self.send_json(200, command_response(message="Session deleted"))
+
+    # Dominio
+
+    def get_domain(self):
+        return 200, entity_response(dict(name='domain1', applicationRoot='${com.sun.aas.instanceRoot}/applications'))
+
+    # Clusters
+
+    def list_clusters(self):
+        names = sorted(self.domain.clusters)
+        if self.domain.flavor == 'glassfish3':
+            return 200, command_response(properties={name: 'not running' for name in names})
+        return 200, command_response(extra=dict(clusterNames=names))
+
+    def create_cluster(self):
+        name = self.body.get('id')
+        if not name or name in self.domain.clusters:
+            return 400, command_response(message=f"Cluster {name} already exists")
+        self.domain.add_cluster(name)
+        return 200, command_response(message=f"Cluster {name} created")
+
+    def get_cluster(self, cluster):
+        if cluster not in self.domain.clusters:
+            return 404, command_response(message=f"Cluster {cluster} not found")
+        return 200, entity_response(dict(name=cluster, configRef=f"{cluster}-config"))
+
+    def delete_cluster(self, cluster):
+        if cluster not in self.domain.clusters:
+            return 404, command_response(message=f"Cluster {cluster} not found")
+        for name in self.domain.clusters.pop(cluster)['instances']:
+            self.domain.servers.pop(name, None)
+        self.domain.configs.pop(f"{cluster}-config", None)
+        return 200, command_response(message=f"Cluster {cluster} deleted")
+
+    # Instancias
+
+    def list_instances(self, cluster):
+        if cluster not in self.domain.clusters:
+            return 404, command_response(message=f"Cluster {cluster} not found")
+        instances = [dict(name=name, status=self.instance_status(name))
+                     for name in self.domain.clusters[cluster]['instances']]
+        return 200, command_response(extra=dict(instanceList=instances))
+
+    def create_instance(self):
+        name = self.body.get('id')
+        cluster = self.body.get('cluster')
+        if not name or name in self.domain.servers:
+            return 400, command_response(message=f"Instance {name} already exists")
+        if cluster not in self.domain.clusters:
+            return 400, command_response(message=f"Cluster {cluster} not found")
+        self.domain.add_instance(name, cluster, self.body.get('nodeagent'), self.body.get('portbase'))
+        return 200, command_response(message=f"Instance {name} created")
+
+    # Como o DAS, recusa remover uma instancia em execucao
+    def delete_instance(self, server):
+        info = self.domain.servers.get(server)
+        if info is None or info['cluster'] is None:
+            return 404, command_response(message=f"Instance {server} not found")
+        if info['status'] == 'RUNNING':
+            return 400, command_response(message=f"Instance {server} is running; stop it before deleting it")
+        del self.domain.servers[server]
+        self.domain.clusters[info['cluster']]['instances'].remove(server)
+        return 200, command_response(message=f"Instance {server} deleted")
+
+    # Uma instancia iniciada so aparece RUNNING depois de startup_time segundos;
+    # instancias marcadas com broken=True nunca sobem
+    def instance_status(self, name):
+        info = self.domain.servers[name]
+        if info['status'] == 'RUNNING' and info.get('ready_at', 0) <= time.monotonic():
+            return 'RUNNING'
+        return 'NOT_RUNNING'
+
+    def boot_instance(self, server):
+        info = self.domain.servers[server]
+        info['status'] = 'RUNNING'
+        info['ready_at'] = float('inf') if info.get('broken') else time.monotonic() + self.server.startup_time
+
+    def start_instance(self, server):
+        if server not in self.domain.servers:
+            return 404, command_response(message=f"Server {server} not found")
+        if self.instance_status(server) != 'RUNNING':
+            self.boot_instance(server)
+        return 200, command_response(message=f"Instance {server} started")
+
+    def stop_instance(self, server):
+        if server not in self.domain.servers:
+            return 404, command_response(message=f"Server {server} not found")
+        self.domain.servers[server]['status'] = 'NOT_RUNNING'
+        return 200, command_response(message=f"Instance {server} stopped")
+
+    def restart_instance(self, server):
+        if server not in self.domain.servers:
+            return 404, command_response(message=f"Server {server} not found")
+        self.boot_instance(server)
+        return 200, command_response(message=f"Instance {server} restarted")
+
+    def get_server(self, server):
+        if server not in self.domain.servers:
+            return 404, command_response(message=f"Server {server} not found")
+        info = self.domain.servers[server]
+        return 200, entity_response(dict(name=server, nodeRef=info['node'], configRef=f"{info['cluster'] or server}-config"))
+
+    # System properties
+
+    def properties_owner(self, cluster=None, server=None):
+        if cluster is not None:
+            return self.domain.clusters.get(cluster)
+        return self.domain.servers.get(server)
+
+    def get_system_properties(self, cluster=None, server=None):
+        owner = self.properties_owner(cluster, server)
+        if owner is None:
+            return 404, command_response(message="Target not found")
+        properties = [dict(name=name, value=info['value'], defaultValue=info['default_value'])
+                      for name, info in owner['system_properties'].items()]
+        return 200, command_response(extra=dict(systemProperties=properties))
+
+    # O POST substitui todo o conjunto de propriedades, como no DAS
+    def set_system_properties(self, cluster=None, server=None):
+        owner = self.properties_owner(cluster, server)
+        if owner is None:
+            return 404, command_response(message="Target not found")
+        owner['system_properties'] = {name: dict(value=value, default_value=None) for name, value in self.body.items()}
+        return 200, command_response(message="System properties updated")
+
+    # create-system-properties: "nome=valor:nome=valor", com ':' e '=' escapados por '\\'
+    def create_system_properties(self):
+        target = self.body.get('target')
+        owner = self.domain.clusters.get(target) or self.domain.servers.get(target)
+        if owner is None:
+            return 400, command_response(message=f"Target {target} not found")
+        for name, value in parse_properties(self.body.get('id', '')):
+            owner['system_properties'][name] = dict(value=value, default_value=None)
+        return 200, command_response(message="System properties created")
+
+    def delete_system_property(self, name, cluster=None, server=None):
+        name = unquote(name)
+        owner = self.properties_owner(cluster, server)
+        if owner is None or name not in owner['system_properties']:
+            return 404, command_response(message=f"System property {name} not found")
+        del owner['system_properties'][name]
+        return 200, command_response(message=f"System property {name} deleted")
+
+    # Nodes
+
+    def list_nodes(self):
+        if int(self.query.get('expandLevel', 0)) >= 1:
+            children = {name: entity_response(dict(self.domain.nodes[name])) for name in sorted(self.domain.nodes)}
+        else:
+            children = {name: f"{self.base_url()}/nodes/node/{name}" for name in sorted(self.domain.nodes)}
+        return 200, entity_response({}, children)
+
+    def get_node(self, node):
+        if node not in self.domain.nodes:
+            return 404, command_response(message=f"Node {node} not found")
+        return 200, entity_response(self.domain.nodes[node])
+
+    def get_ssh_connector(self, node):
+        if node not in self.domain.ssh_connectors:
+            return 404, command_response(message=f"Node {node} has no ssh-connector")
+        return 200, entity_response(self.domain.ssh_connectors[node]['connector'],
+                                    {'ssh-auth': f"{self.base_url()}/nodes/node/{node}/ssh-connector/ssh-auth"})
+
+    def get_ssh_auth(self, node):
+        if node not in self.domain.ssh_connectors:
+            return 404, command_response(message=f"Node {node} has no ssh-connector")
+        return 200, entity_response(self.domain.ssh_connectors[node]['auth'])
+
+    def create_node(self):
+        name = self.body.get('id')
+        if not name or name in self.domain.nodes:
+            return 400, command_response(message=f"Node {name} already exists")
+        self.domain.add_node(name, self.body.get('nodehost'), self.body.get('nodedir'), self.body.get('sshport', '22'),
+                             self.body.get('sshuser'), self.body.get('sshkeyfile'))
+        return 200, command_response(message=f"Node {name} created")
+
+    def update_node(self, node):
+        if node not in self.domain.nodes:
+            return 404, command_response(message=f"Node {node} not found")
+        keys = dict(nodehost=('node', 'nodeHost'), nodedir=('node', 'nodeDir'), sshport=('connector', 'sshPort'),
+                    sshuser=('auth', 'userName'), sshkeyfile=('auth', 'keyfile'))
+        ssh = self.domain.ssh_connectors[node]
+        for param, value in self.body.items():
+            if param in keys:
+                owner, key = keys[param]
+                target = self.domain.nodes[node] if owner == 'node' else ssh[owner]
+                target[key] = str(value)
+        return 200, command_response(message=f"Node {node} updated")
+
+    def delete_node(self, node):
+        if node not in self.domain.nodes:
+            return 404, command_response(message=f"Node {node} not found")
+        if any(info['node'] == node for info in self.domain.servers.values()):
+            return 400, command_response(message=f"Node {node} is referenced by instances")
+        del self.domain.nodes[node]
+        del self.domain.ssh_connectors[node]
+        return 200, command_response(message=f"Node {node} deleted")
+
+    # Hosts com 'unreachable' no nome falham no teste de SSH
+    def ping_node(self, node):
+        if node not in self.domain.nodes:
+            return 404, command_response(message=f"Node {node} not found")
+        if 'unreachable' in self.domain.nodes[node]['nodeHost']:
+            return 500, command_response(message=f"Could not connect to {self.domain.nodes[node]['nodeHost']}")
+        return 200, command_response(message=f"Successfully made SSH connection to node {node}")
+
+    # Configs e hosts JMS
+
+    def list_configs(self):
+        children = {name: f"{self.base_url()}/configs/config/{name}" for name in sorted(self.domain.configs)}
+        return 200, entity_response({}, children)
+
+    def list_jms_hosts(self, config):
+        if config not in self.domain.configs:
+            return 404, command_response(message=f"Config {config} not found")
+        hosts = self.domain.configs[config]['jms_hosts']
+        # expandLevel >= 1 traz a entidade de cada filho no lugar da URL
+        if int(self.query.get('expandLevel', 0)) >= 1:
+            children = {name: entity_response(dict(hosts[name])) for name in sorted(hosts)}
+        else:
+            children = {name: f"{self.base_url()}/configs/config/{config}/jms-service/jms-host/{name}" for name in sorted(hosts)}
+        return 200, entity_response({}, children)
+
+    def create_jms_host(self, config):
+        if config not in self.domain.configs:
+            return 404, command_response(message=f"Config {config} not found")
+        name = self.body.get('name') or self.body.get('id')
+        hosts = self.domain.configs[config]['jms_hosts']
+        if not name or name in hosts:
+            return 400, command_response(message=f"JMS Host {name} already exists")
+        hosts[name] = dict(name=name, host=self.body.get('host'), port=str(self.body.get('port')),
+                           adminUserName=self.body.get('adminUserName'), adminPassword=self.body.get('adminPassword'))
+        return 200, command_response(message=f"JMS Host {name} created")
+
+    def get_jms_host(self, config, host):
+        hosts = self.domain.configs.get(config, {}).get('jms_hosts', {})
+        if host not in hosts:
+            return 404, command_response(message=f"JMS Host {host} not found")
+        return 200, entity_response(hosts[host])
+
+    def update_jms_host(self, config, host):
+        hosts = self.domain.configs.get(config, {}).get('jms_hosts', {})
+        if host not in hosts:
+            return 404, command_response(message=f"JMS Host {host} not found")
+        for key, value in self.body.items():
+            hosts[host][key] = str(value) if key == 'port' else value
+        return 200, command_response(message=f"JMS Host {host} updated")
+
+    def delete_jms_host(self, config, host):
+        hosts = self.domain.configs.get(config, {}).get('jms_hosts', {})
+        if host not in hosts:
+            return 404, command_response(message=f"JMS Host {host} not found")
+        del hosts[host]
+        return 200, command_response(message=f"JMS Host {host} deleted")
+
+
+    # Jobs
+
+    def get_job(self, job_id):
+        job = self.server.jobs.get(job_id)
+        if job is None:
+            return 404, command_response(message=f"Job {job_id} not found")
+        if time.monotonic() < job['done_at']:
+            info = dict(jobId=job_id, jobState='RUNNING', exitCode='', message='')
+        else:
+            info = dict(jobId=job_id, jobState='COMPLETED', exitCode='SUCCESS' if job['status'] == 200 else 'FAILURE',
+                        message=job['data'].get('message', ''))
+        return 200, command_response(extra=info)
+
+
+class MockDASServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, domain, host='127.0.0.1', port=0, latency=0.0, job_duration=0.0, sessions=True, token_ttl=1800,
+                 startup_time=0.0, compression=False):
+        ThreadingHTTPServer.__init__(self, (host, port), MockDASHandler)
+        self.domain = domain
+        self.latency = latency
+        self.job_duration = job_duration
+        self.startup_time = startup_time
+        self.compression = compression
+        self.jobs = {}
+        # sessions=False imita um DAS sem /management/sessions
+        self.sessions = sessions
+        self.token_ttl = token_ttl
+        self.tokens = {}
+        self.counter_lock = threading.Lock()
+        self.reset_counters()
+
+    # O comando ja foi aplicado; o job apenas fica RUNNING por job_duration segundos
+    def add_job(self, status, data):
+        with self.counter_lock:
+            job_id = str(len(self.jobs) + 1)
+            self.jobs[job_id] = dict(status=status, data=data, done_at=time.monotonic() + self.job_duration)
+        return job_id
+
+    # Tokens de sessao REST: expiram apos token_ttl segundos sem uso
+    def add_token(self):
+        with self.counter_lock:
+            token = f"token{len(self.tokens) + 1}-{int(time.time() * 1000)}"
+            self.tokens[token] = time.monotonic() + self.token_ttl
+        return token
+
+    def touch_token(self, token):
+        with self.counter_lock:
+            expires_at = self.tokens.get(token)
+            if expires_at is None or expires_at < time.monotonic():
+                self.tokens.pop(token, None)
+                return False
+            self.tokens[token] = time.monotonic() + self.token_ttl
+            return True
+
+    def remove_token(self, token):
+        with self.counter_lock:
+            return self.tokens.pop(token, None) is not None
+
+    def reset_counters(self):
+        with self.counter_lock:
+            self.requests = 0
+            self.requests_by_method = {}
+            self.bytes = 0
+            self.basic_auths = 0
+
+    def count_basic_auth(self):
+        with self.counter_lock:
+            self.basic_auths += 1
+
+    def count_request(self, method):
+        with self.counter_lock:
+            self.requests += 1
+            self.requests_by_method[method] = self.requests_by_method.get(method, 0) + 1
+
+    def count_bytes(self, size):
+        with self.counter_lock:
+            self.bytes += size
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock GlassFish DAS REST server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4848)
+    parser.add_argument('--flavor', default='payara', choices=['payara', 'glassfish3'])
+    parser.add_argument('--clusters', type=int, default=2)
+    parser.add_argument('--instances', type=int, default=2, help="instances per cluster")
+    parser.add_argument('--nodes', type=int, default=2)
+    parser.add_argument('--properties', type=int, default=5, help="system properties per cluster")
+    parser.add_argument('--jms-hosts', type=int, default=1, help="extra JMS hosts per cluster config")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--job-duration', type=float, default=0.0, help="seconds a detached job stays RUNNING")
+    parser.add_argument('--startup-time', type=float, default=0.0, help="seconds a started instance takes to be RUNNING")
+    parser.add_argument('--compression', action='store_true', help="gzip responses when the client accepts it")
+    args = parser.parse_args()
+
+    domain = MockDomain.build(args.flavor, args.clusters, args.instances, args.nodes, args.properties, args.jms_hosts)
+    server = MockDASServer(domain, args.host, args.port, args.latency, args.job_duration, startup_time=args.startup_time,
+                           compression=args.compression)
+    print(f"Mock DAS listening on http://{args.host}:{server.port}{PREFIX}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+#!/usr/bin/env python
+# Harness de benchmark dos modulos gf_* contra o mock do DAS (mock_das.py).
+#
+# Para cada cenario e tamanho de dominio (10, 100 e 1000 recursos por padrao)
+# o harness monta o dominio no mock, executa o main() do modulo no proprio
+# processo e mede tempo de parede, round trips recebidos pelo mock, bytes
+# trafegados e pico de memoria (tracemalloc).
+#
+# Requer ansible-core e as dependencias dos modulos instalados:
+#   python benchmarks/run_benchmarks.py
+#   python benchmarks/run_benchmarks.py --sizes 10 100 --latency 0.005 --scenario clusters_present
+#   python benchmarks/run_benchmarks.py --json > bench.json
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PLUGINS = os.path.join(os.path.dirname(HERE), 'plugins')
+
+sys.path.insert(0, HERE)
+from mock_das import MockDomain, MockDASServer  # noqa: E402
+
+
+def setup_module_utils():
+    # Os modulos importam ansible.module_utils.gf_*, que ficam em plugins/module_utils
+    import ansible.module_utils
+    path = os.path.join(PLUGINS, 'module_utils')
+    if path not in ansible.module_utils.__path__:
+        ansible.module_utils.__path__.append(path)
+
+
+def load_module(name):
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", os.path.join(PLUGINS, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def module_args(args):
+    try:
+        # ansible-core >= 2.19
+        from ansible.module_utils.testing import patch_module_args
+    except ImportError:
+        patch_module_args = None
+
+    if patch_module_args is not None:
+        with patch_module_args(args):
+            yield
+        return
+
+    from ansible.module_utils import basic
+    from ansible.module_utils.common.text.converters import to_bytes
+    previous = getattr(basic, '_ANSIBLE_ARGS', None)
+    basic._ANSIBLE_ARGS = to_bytes(json.dumps({'ANSIBLE_MODULE_ARGS': args}))
+    try:
+        yield
+    finally:
+        basic._ANSIBLE_ARGS = previous
+
+
+# Executa o main() do modulo e devolve o resultado JSON impresso por exit_json/fail_json
+def run_main(module, args):
+    stdout = io.StringIO()
+    with module_args(args), contextlib.redirect_stdout(stdout):
+        try:
+            module.main()
+        except SystemExit:
+            pass
+    output = stdout.getvalue().strip()
+    try:
+        return json.loads(output.splitlines()[-1]) if output else {}
+    except ValueError:
+        return dict(failed=True, msg=output)
+
+
+def connection(port, style):
+    # Os modulos usam dois conjuntos de nomes para os parametros de conexao
+    if style == 'base_port':
+        return dict(host='127.0.0.1', base_port=port, user='admin', password='admin', protocol='http')
+    return dict(host='127.0.0.1', admin_port=port, admin_user='admin', admin_pass='admin', protocol='http')
+
+
+# Cenarios: cada um devolve (dominio, nome do modulo, estilo de conexao, argumentos).
+# 'size' escala o recurso que o modulo le para descobrir o estado.
+
+def scenario_clusters_present(size, flavor):
+    domain = MockDomain.build(flavor, clusters=size)
+    return domain, 'gf_manage_clusters', 'base_port', dict(cluster_name='new-cluster', type=flavor, state='present')
+
+
+def scenario_clusters_noop(size, flavor):
+    domain = MockDomain.build(flavor, clusters=size)
+    return domain, 'gf_manage_clusters', 'base_port', dict(cluster_name='cluster0', type=flavor, state='present')
+
+
+def scenario_instance_present(size, flavor):
+    domain = MockDomain.build(flavor, clusters=1, instances=size, nodes=1)
+    return domain, 'gf_manage_instances_in_clusters', 'admin_port', dict(
+        cluster_name='cluster0', instance_name='new-instance', nodeagent='node0', portbase=28000)
+
+
+def scenario_instances_bulk(size, flavor):
+    domain = MockDomain.build(flavor, clusters=1, nodes=1)
+    instances = [dict(name=f"bulk{i}", nodeagent='node0', portbase=28000 + i * 100) for i in range(size)]
+    return domain, 'gf_manage_instances_in_clusters', 'admin_port', dict(
+        cluster_name='cluster0', instances=instances, max_workers=8)
+
+
+def scenario_instances_detached(size, flavor):
+    domain, module_name, style, args = scenario_instances_bulk(size, flavor)
+    return domain, module_name, style, dict(args, detached=True, poll_interval=0.05)
+
+
+def scenario_instances_restart_serial(size, flavor):
+    # Restart de uma instancia por vez, como no script manual
+    domain = MockDomain.build(flavor, clusters=1, instances=size, nodes=1)
+    return domain, 'gf_manage_instances_in_clusters', 'admin_port', dict(
+        cluster_name='cluster0', state='restarted', batch_size=1, poll_interval=0.05)
+
+
+def scenario_instances_restart_rolling(size, flavor):
+    # Lotes de 25% do cluster, mantendo pelo menos metade das instancias no ar
+    domain, module_name, style, args = scenario_instances_restart_serial(size, flavor)
+    args = dict(args, batch_percent=25, min_available=size // 2, max_workers=8)
+    del args['batch_size']
+    return domain, module_name, style, args
+
+
+def scenario_node_present(size, flavor):
+    domain = MockDomain.build(flavor, nodes=size)
+    return domain, 'gf_manage_nodes', 'admin_port', dict(
+        node_name='new-node', node_sshuser_name='glassfish', node_path='/opt/glassfish/nodes',
+        node_path_keyssh='/home/glassfish/.ssh/id_rsa', node_host='new-node.example.com')
+
+
+def scenario_nodes_bulk(size, flavor):
+    # Metade dos nodes ja existe (um quarto com nodehost alterado), metade e nova; todos com ping
+    domain = MockDomain.build(flavor, nodes=size // 2)
+    nodes = [dict(name=f"node{n}", node_host=f"host{n}.example.com" if n % 4 else f"host{n}-new.example.com",
+                  node_sshuser_name='glassfish', node_path='/opt/glassfish/nodes', node_path_keyssh='')
+             for n in range(size)]
+    return domain, 'gf_manage_nodes', 'admin_port', dict(nodes=nodes, ping=True, max_workers=8)
+
+
+def scenario_system_properties(size, flavor):
+    domain = MockDomain.build(flavor, clusters=1, properties=size)
+    return domain, 'gf_manage_cluster_systemproperties', 'base_port', dict(
+        target='cluster', server_name='cluster0', systemproperties=[dict(name='prop0', value='changed')])
+
+
+def scenario_system_properties_delta(size, flavor):
+    # Mesma mudanca de scenario_system_properties, enviando so a diferenca
+    domain, module_name, style, args = scenario_system_properties(size, flavor)
+    return domain, module_name, style, dict(args, write_mode='delta')
+
+
+def scenario_system_properties_fleet(size, flavor):
+    # Uma propriedade empurrada para 'size' clusters; metade ja tem o valor
+    domain = MockDomain.build(flavor, clusters=size, properties=5)
+    for c in range(0, size, 2):
+        domain.clusters[f"cluster{c}"]['system_properties']['prop0'] = dict(value='changed', default_value=None)
+    targets = [dict(target='cluster', server_name=f"cluster{c}") for c in range(size)]
+    return domain, 'gf_manage_cluster_systemproperties', 'base_port', dict(
+        targets=targets, systemproperties=[dict(name='prop0', value='changed')], max_workers=8)
+
+
+def scenario_jms_host(size, flavor):
+    domain = MockDomain.build(flavor, clusters=1, jms_hosts=size)
+    return domain, 'gf_jms_host', 'admin_port', dict(
+        target='cluster0', jms_host_name='jms0', jms_host='mq-changed.example.com', port=7676)
+
+
+def scenario_jms_hosts_bulk(size, flavor):
+    domain = MockDomain.build(flavor, clusters=1, jms_hosts=size)
+    # Metade dos hosts muda de endereco, metade fica igual; mais um host novo
+    jms_hosts = [dict(name=f"jms{h}", jms_host=f"mq{h}.example.com" if h % 2 else f"mq{h}-changed.example.com",
+                      port=7676) for h in range(size)]
+    jms_hosts.append(dict(name='jms-new', jms_host='mq-new.example.com', port=7676))
+    return domain, 'gf_jms_host', 'admin_port', dict(target='cluster0', jms_hosts=jms_hosts, max_workers=8)
+
+
+def scenario_domain_facts(size, flavor):
+    clusters = max(1, size // 10)
+    domain = MockDomain.build(flavor, clusters=clusters, instances=max(1, size // clusters), nodes=min(size, 10),
+                              properties=5, jms_hosts=1)
+    return domain, 'gf_domain_facts', 'admin_port', dict(type=flavor, max_workers=8)
+
+
+def scenario_domain_topology(size, flavor):
+    clusters = max(1, size // 10)
+    domain = MockDomain.build(flavor, nodes=1)
+    desired = [dict(name=f"cluster{c}", instances=[dict(name=f"cluster{c}-i{i}", nodeagent='node0', portbase=28000 + i * 100)
+                                                  for i in range(max(1, size // clusters))])
+               for c in range(clusters)]
+    return domain, 'gf_domain_topology', 'admin_port', dict(type=flavor, clusters=desired, max_workers=8)
+
+
+def scenario_domain_topology_converged(size, flavor):
+    # Mesma topologia, medida na segunda execucao (dominio ja convergido)
+    return scenario_domain_topology(size, flavor)
+
+
+def scenario_domain_topology_noop(size, flavor):
+    domain, module_name, style, args = scenario_domain_topology(size, flavor)
+    return domain, module_name, style, dict(args, noop_probe=True, cache_dir=tempfile.mkdtemp(prefix='gf-bench-'), cache_ttl=0)
+
+
+def scenario_domain_topology_apply(size, flavor):
+    domain, module_name, style, args = scenario_domain_topology(size, flavor)
+    return domain, module_name, style, dict(args, plan_file=os.path.join(tempfile.mkdtemp(prefix='gf-bench-'), 'plan.json'))
+
+
+def scenario_jms_hosts_bulk_apply(size, flavor):
+    domain, module_name, style, args = scenario_jms_hosts_bulk(size, flavor)
+    return domain, module_name, style, dict(args, plan_file=os.path.join(tempfile.mkdtemp(prefix='gf-bench-'), 'plan.json'))
+
+
+# Cenarios com varios DAS: 'domain' e uma lista de dominios, um mock para cada.
+# O loop executa o modulo uma vez por DAS, como um loop do Ansible sobre os DAS;
+# o fan-out executa uma vez so com das_hosts. Um dos DAS responde 10x mais
+# devagar que os demais.
+FANOUT_DAS = 10
+
+
+def scenario_jms_host_das_loop(size, flavor):
+    domains = [MockDomain.build(flavor, clusters=1, jms_hosts=size) for _ in range(FANOUT_DAS)]
+    return domains, 'gf_jms_host', 'admin_port', dict(
+        target='cluster0', jms_host_name='jms0', jms_host='mq-changed.example.com', port=7676)
+
+
+def scenario_jms_host_das_fanout(size, flavor):
+    domains, module_name, style, args = scenario_jms_host_das_loop(size, flavor)
+    return domains, module_name, style, dict(args, das_hosts=[])
+
+
+# Cenarios medidos numa segunda execucao: a primeira prepara o dominio (e o
+# registro do noop_probe) e nao entra na medicao
+WARMUP = ('domain_topology_converged', 'domain_topology_noop')
+
+# Cenarios medidos na execucao com apply_plan: a execucao em check mode que
+# grava o plano nao entra na medicao
+PLANNED = ('domain_topology_apply', 'jms_hosts_bulk_apply')
+
+
+SCENARIOS = dict(
+    clusters_present=scenario_clusters_present,
+    clusters_noop=scenario_clusters_noop,
+    instance_present=scenario_instance_present,
+    instances_bulk=scenario_instances_bulk,
+    instances_detached=scenario_instances_detached,
+    instances_restart_serial=scenario_instances_restart_serial,
+    instances_restart_rolling=scenario_instances_restart_rolling,
+    node_present=scenario_node_present,
+    nodes_bulk=scenario_nodes_bulk,
+    system_properties=scenario_system_properties,
+    system_properties_delta=scenario_system_properties_delta,
+    system_properties_fleet=scenario_system_properties_fleet,
+    jms_host=scenario_jms_host,
+    jms_hosts_bulk=scenario_jms_hosts_bulk,
+    domain_facts=scenario_domain_facts,
+    domain_topology=scenario_domain_topology,
+    domain_topology_converged=scenario_domain_topology_converged,
+    domain_topology_noop=scenario_domain_topology_noop,
+    domain_topology_apply=scenario_domain_topology_apply,
+    jms_hosts_bulk_apply=scenario_jms_hosts_bulk_apply,
+    jms_host_das_loop=scenario_jms_host_das_loop,
+    jms_host_das_fanout=scenario_jms_host_das_fanout,
+)
+
+
+# Estado final esperado de cada cenario, conferido no dominio do mock depois da
+# execucao medida. Cada verificacao recebe o dominio (uma vez por DAS), os
+# argumentos do modulo e o tamanho, e devolve as diferencas encontradas.
+
+def jms_hosts_of(domain, target='cluster0'):
+    return domain.configs[f"{target}-config"]['jms_hosts']
+
+
+def check_clusters_present(domain, args, size):
+    if args['cluster_name'] not in domain.clusters:
+        yield f"cluster {args['cluster_name']} was not created"
+
+
+def check_instances_present(domain, args, size):
+    instances = args['instances'] if args.get('instances') is not None else [dict(name=args['instance_name'])]
+    existing = set(domain.clusters[args['cluster_name']]['instances'])
+    missing = [instance['name'] for instance in instances if instance['name'] not in existing]
+    if missing:
+        yield f"{len(missing)} instances missing in {args['cluster_name']}: {', '.join(missing[:5])}"
+
+
+def check_instances_restarted(domain, args, size):
+    # boot_instance marca ready_at: toda instancia reiniciada passou por ele
+    names = domain.clusters[args['cluster_name']]['instances']
+    pending = [name for name in names if domain.servers[name]['status'] != 'RUNNING' or 'ready_at' not in domain.servers[name]]
+    if pending:
+        yield f"{len(pending)} of {len(names)} instances not restarted: {', '.join(pending[:5])}"
+
+
+def check_nodes_present(domain, args, size):
+    nodes = args['nodes'] if args.get('nodes') is not None else [dict(name=args['node_name'], node_host=args['node_host'])]
+    wrong = [node['name'] for node in nodes
+             if domain.nodes.get(node['name'], {}).get('nodeHost') != node['node_host']]
+    if wrong:
+        yield f"{len(wrong)} nodes missing or with a different nodehost: {', '.join(wrong[:5])}"
+
+
+def check_system_properties(domain, args, size):
+    targets = args.get('targets') or [dict(server_name=args['server_name'])]
+    for target in targets:
+        properties = domain.clusters[target['server_name']]['system_properties']
+        for prop in args['systemproperties']:
+            if properties.get(prop['name'], {}).get('value') != prop['value']:
+                yield f"{target['server_name']}: {prop['name']} is {properties.get(prop['name'])}"
+    # A mudanca de uma propriedade nao pode apagar as demais
+    if 'server_name' in args and len(domain.clusters[args['server_name']]['system_properties']) != size:
+        yield f"{args['server_name']}: {len(domain.clusters[args['server_name']]['system_properties'])} properties, expected {size}"
+
+
+def check_jms_hosts(domain, args, size):
+    jms_hosts = args.get('jms_hosts') or [dict(name=args['jms_host_name'], jms_host=args['jms_host'], port=args['port'])]
+    existing = jms_hosts_of(domain, args['target'])
+    wrong = [host['name'] for host in jms_hosts
+             if existing.get(host['name'], {}).get('host') != host['jms_host']
+             or existing[host['name']].get('port') != str(host['port'])]
+    if wrong:
+        yield f"{len(wrong)} JMS hosts missing or different: {', '.join(wrong[:5])}"
+
+
+def check_domain_topology(domain, args, size):
+    for cluster in args['clusters']:
+        if cluster['name'] not in domain.clusters:
+            yield f"cluster {cluster['name']} was not created"
+            continue
+        existing = set(domain.clusters[cluster['name']]['instances'])
+        missing = [instance['name'] for instance in cluster['instances'] if instance['name'] not in existing]
+        if missing:
+            yield f"{len(missing)} instances missing in {cluster['name']}: {', '.join(missing[:5])}"
+
+
+def check_nothing(domain, args, size):
+    return []
+
+
+CHECKS = dict(
+    clusters_present=check_clusters_present,
+    clusters_noop=check_clusters_present,
+    instance_present=check_instances_present,
+    instances_bulk=check_instances_present,
+    instances_detached=check_instances_present,
+    instances_restart_serial=check_instances_restarted,
+    instances_restart_rolling=check_instances_restarted,
+    node_present=check_nodes_present,
+    nodes_bulk=check_nodes_present,
+    system_properties=check_system_properties,
+    system_properties_delta=check_system_properties,
+    system_properties_fleet=check_system_properties,
+    jms_host=check_jms_hosts,
+    jms_hosts_bulk=check_jms_hosts,
+    domain_facts=check_nothing,
+    domain_topology=check_domain_topology,
+    domain_topology_converged=check_domain_topology,
+    domain_topology_noop=check_domain_topology,
+    domain_topology_apply=check_domain_topology,
+    jms_hosts_bulk_apply=check_jms_hosts,
+    jms_host_das_loop=check_jms_hosts,
+    jms_host_das_fanout=check_jms_hosts,
+)
+
+# Cenarios em que o dominio ja esta no estado pedido: nenhuma escrita aceita
+NOOP = ('clusters_noop', 'domain_facts', 'domain_topology_converged', 'domain_topology_noop')
+
+
+def run_scenario(name, size, flavor, latency, job_duration, modules, startup_time=0.0, http_backend='builtin',
+                 compression=False):
+    domain, module_name, style, args = SCENARIOS[name](size, flavor)
+    domains = domain if isinstance(domain, list) else [domain]
+    servers = [MockDASServer(domain, latency=latency * (10 if index == 0 and len(domains) > 1 else 1),
+                             job_duration=job_duration, startup_time=startup_time,
+                             compression=compression).start()
+               for index, domain in enumerate(domains)]
+    try:
+        if module_name not in modules:
+            modules[module_name] = load_module(module_name)
+        args = dict(connection(servers[0].port, style), http_backend=http_backend, **args)
+        if 'das_hosts' in args:
+            args['das_hosts'] = [dict(host='127.0.0.1', port=server.port) for server in servers]
+            runs = [args]
+        else:
+            runs = [dict(args, **connection(server.port, style)) for server in servers]
+
+        if name in WARMUP:
+            run_main(modules[module_name], args)
+
+        # Execucao em check mode antes da medida (nos cenarios PLANNED e ela que
+        # grava o plano): nao pode mudar a configuracao de nenhum DAS
+        problems = []
+        versions = [domain.version for domain in domains]
+        for run_args in runs:
+            result = run_main(modules[module_name], dict(run_args, _ansible_check_mode=True))
+            if result.get('failed'):
+                problems.append(f"check mode failed: {result.get('msg')}")
+                break
+        check_writes = sum(domain.version - version for domain, version in zip(domains, versions))
+        if check_writes:
+            problems.append(f"check mode made {check_writes} config writes")
+        if name in PLANNED:
+            runs = [dict(run_args, apply_plan=True) for run_args in runs]
+
+        for server in servers:
+            server.reset_counters()
+        versions = [domain.version for domain in domains]
+        tracemalloc.start()
+        started = time.perf_counter()
+        for run_args in runs:
+            result = run_main(modules[module_name], run_args)
+            if result.get('failed'):
+                break
+        wall = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        config_writes = sum(domain.version - version for domain, version in zip(domains, versions))
+        if not result.get('failed'):
+            if name in NOOP and config_writes:
+                problems.append(f"{config_writes} config writes on an unchanged domain")
+            for domain in domains:
+                problems.extend(CHECKS[name](domain, args, size))
+
+        return dict(
+            scenario=name,
+            module=module_name,
+            size=size,
+            wall=round(wall, 4),
+            round_trips=sum(server.requests for server in servers),
+            by_method=merge_counts(server.requests_by_method for server in servers),
+            bytes=sum(server.bytes for server in servers),
+            basic_auths=sum(server.basic_auths for server in servers),
+            # Regravacoes do domain.xml (escritas aceitas pelo DAS)
+            config_writes=config_writes,
+            peak_memory_kb=round(peak / 1024, 1),
+            failed=bool(result.get('failed') or problems),
+            changed=result.get('changed'),
+            msg=result.get('msg') if result.get('failed') else '; '.join(problems) or None
+        )
+    finally:
+        for server in servers:
+            server.stop()
+
+
+def merge_counts(counts):
+    merged = {}
+    for count in counts:
+        for key, value in count.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the gf_* modules against a mock DAS")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--scenario', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--flavor', default='payara', choices=['payara', 'glassfish3'])
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added by the mock to every request")
+    parser.add_argument('--job-duration', type=float, default=0.2, help="seconds a detached job stays RUNNING in the mock")
+    parser.add_argument('--startup-time', type=float, default=0.1, help="seconds a started instance takes to be RUNNING in the mock")
+    parser.add_argument('--http-backend', default='builtin', choices=['builtin', 'requests'])
+    parser.add_argument('--compression', action='store_true', help="the mock gzips responses when the client accepts it")
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    setup_module_utils()
+    modules = {}
+    results = []
+    for name in args.scenario:
+        for size in args.sizes:
+            results.append(run_scenario(name, size, args.flavor, args.latency, args.job_duration, modules,
+                                        args.startup_time, args.http_backend, args.compression))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    header = f"{'scenario':<30} {'size':>6} {'wall (s)':>10} {'round trips':>12} {'bytes':>12} {'peak KiB':>10}  status"
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        status = 'FAILED: ' + str(r['msg']) if r['failed'] else ('changed' if r['changed'] else 'ok')
+        print(f"{r['scenario']:<30} {r['size']:>6} {r['wall']:>10.4f} {r['round_trips']:>12} {r['bytes']:>12} "
+              f"{r['peak_memory_kb']:>10}  {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# Custo de partida dos modulos gf_*: tempo de import do transporte HTTP em cada
+# backend, tempo de import de cada modulo e tamanho do payload AnsiballZ de
+# cada modulo. Os modulos sao medidos lado a lado com os da revisao de
+# referencia (--baseline, por padrao 8df86ae: os modulos originais, que
+# importam o requests direto), extraidos com git show.
+#
+# O tempo de import e medido em processos novos (como no host gerenciado, onde
+# cada task roda um interpretador novo), descontando o import do
+# ansible.module_utils.basic, que todo modulo paga.
+#
+#   python benchmarks/startup_benchmark.py
+#   python benchmarks/startup_benchmark.py --runs 20 --json
+#   python benchmarks/startup_benchmark.py --baseline HEAD~5   # compara com outra revisao
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.dirname(HERE)
+PLUGINS = os.path.join(REPO, 'plugins')
+BASELINE = '8df86ae'
+
+# Codigo executado em cada processo: basic e sempre importado; cada variante
+# acrescenta o que a task importa ate ter o transporte pronto
+IMPORTS = dict(
+    basic="",
+    builtin="from ansible.module_utils.gf_http import HttpClientTransport",
+    requests="from ansible.module_utils.gf_requests import RequestsTransport",
+)
+
+SNIPPET = """
+import sys, time
+import ansible.module_utils
+ansible.module_utils.__path__.append({path!r})
+import ansible.module_utils.basic
+started = time.perf_counter()
+{code}
+sys.stdout.write(str(time.perf_counter() - started))
+"""
+
+# Import do arquivo do modulo, sem executar o main()
+MODULE_IMPORT = """
+import importlib.util
+spec = importlib.util.spec_from_file_location('task_module', {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+"""
+
+
+def import_time(module_utils, code, runs):
+    samples = []
+    walls = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.check_output([sys.executable, '-c', SNIPPET.format(path=module_utils, code=code)])
+        walls.append(time.perf_counter() - started)
+        samples.append(float(output))
+    return statistics.median(samples), statistics.median(walls)
+
+
+# Extrai os modulos gf_*.py de plugins/ na revisao 'rev' para um diretorio
+# temporario
+def checkout_modules(rev):
+    names = subprocess.check_output(['git', '-C', REPO, 'ls-tree', '--name-only', f"{rev}:plugins"], text=True).split()
+    directory = tempfile.mkdtemp(prefix='gf-startup-')
+    for name in names:
+        if name.startswith('gf_') and name.endswith('.py'):
+            with open(os.path.join(directory, name), 'wb') as handle:
+                handle.write(subprocess.check_output(['git', '-C', REPO, 'show', f"{rev}:plugins/{name}"]))
+    return directory
+
+
+# Tempo de import e tamanho do AnsiballZ de cada modulo gf_*.py do diretorio
+def measure_modules(plugins, module_utils, runs, compression):
+    measures = {}
+    for module_path in sorted(glob.glob(os.path.join(plugins, 'gf_*.py'))):
+        measure = dict(bytes=payload_size(module_utils, module_path, compression))
+        try:
+            seconds, _ = import_time(module_utils, MODULE_IMPORT.format(path=module_path), runs)
+            measure['import_ms'] = round(seconds * 1000, 1)
+        except subprocess.CalledProcessError:
+            measure['import_ms'] = None
+        measures[os.path.basename(module_path)] = measure
+    return measures
+
+
+# Monta o AnsiballZ do modulo como o controller faria e devolve o tamanho
+def payload_size(module_utils, module_path, compression):
+    from ansible.plugins.loader import init_plugin_loader, module_utils_loader
+    from ansible.executor import module_common
+
+    if not getattr(payload_size, 'initialized', False):
+        init_plugin_loader()
+        module_utils_loader.add_directory(module_utils)
+        payload_size.initialized = True
+
+    # O cache do AnsiballZ e por nome de modulo: cada montagem usa um cache
+    # vazio, senao os modulos da referencia reaproveitariam os atuais
+    cache = tempfile.mkdtemp(prefix='gf-ansiballz-')
+    local_tmp, module_common.C.DEFAULT_LOCAL_TMP = module_common.C.DEFAULT_LOCAL_TMP, cache
+    try:
+        built = build_module(module_common, module_path, compression)
+    finally:
+        module_common.C.DEFAULT_LOCAL_TMP = local_tmp
+        shutil.rmtree(cache)
+    data = built.b_module_data if hasattr(built, 'b_module_data') else built[0]
+    return len(data)
+
+
+def build_module(module_common, module_path, compression):
+    from ansible.parsing.dataloader import DataLoader
+    from ansible.template import Templar
+
+    name = os.path.splitext(os.path.basename(module_path))[0]
+    return module_common.modify_module(module_name=name, module_path=module_path, module_args={},
+                                        templar=Templar(loader=DataLoader()),
+                                        task_vars={'ansible_python_interpreter': sys.executable},
+                                        module_compression=compression)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and AnsiballZ payload size of the gf_* modules")
+    parser.add_argument('--plugins', default=PLUGINS, help="plugins directory to measure (default: this checkout)")
+    parser.add_argument('--baseline', default=BASELINE,
+                        help=f"git revision whose modules are measured side by side (default: {BASELINE}, empty to skip)")
+    parser.add_argument('--runs', type=int, default=10, help="processes started per import variant")
+    parser.add_argument('--compression', default='ZIP_DEFLATED', choices=['ZIP_DEFLATED', 'ZIP_STORED'])
+    parser.add_argument('--json', action='store_true', help="print results as JSON")
+    args = parser.parse_args()
+
+    plugins = os.path.abspath(args.plugins)
+    module_utils = os.path.join(plugins, 'module_utils')
+
+    imports = []
+    for variant, code in IMPORTS.items():
+        if variant != 'basic' and not os.path.exists(os.path.join(module_utils, code.split()[1].rsplit('.', 1)[1] + '.py')):
+            continue
+        try:
+            seconds, wall = import_time(module_utils, code, args.runs)
+        except subprocess.CalledProcessError:
+            imports.append(dict(variant=variant, failed=True))
+            continue
+        imports.append(dict(variant=variant, import_ms=round(seconds * 1000, 1), process_ms=round(wall * 1000, 1)))
+
+    current = measure_modules(plugins, module_utils, args.runs, args.compression)
+    baseline = {}
+    if args.baseline:
+        directory = checkout_modules(args.baseline)
+        try:
+            baseline = measure_modules(directory, module_utils, args.runs, args.compression)
+        finally:
+            shutil.rmtree(directory)
+
+    modules = [dict(module=name, baseline=baseline.get(name), current=current.get(name))
+               for name in sorted(set(current) | set(baseline))]
+
+    if args.json:
+        print(json.dumps(dict(baseline=args.baseline or None, imports=imports, modules=modules), indent=2))
+        return
+
+    header = f"{'transport import':<24} {'import (ms)':>12} {'process (ms)':>13}"
+    print(header)
+    print('-' * len(header))
+    for r in imports:
+        if r.get('failed'):
+            print(f"{r['variant']:<24} {'FAILED':>12}")
+        else:
+            print(f"{r['variant']:<24} {r['import_ms']:>12} {r['process_ms']:>13}")
+
+    def column(measure, key):
+        return '-' if measure is None or measure[key] is None else measure[key]
+
+    print()
+    header = (f"{'module':<40} {'import base (ms)':>17} {'import now (ms)':>16} "
+              f"{'AnsiballZ base':>15} {'AnsiballZ now':>14}")
+    print(header)
+    print('-' * len(header))
+    for r in modules:
+        print(f"{r['module']:<40} {column(r['baseline'], 'import_ms'):>17} {column(r['current'], 'import_ms'):>16} "
+              f"{column(r['baseline'], 'bytes'):>15} {column(r['current'], 'bytes'):>14}")
+    if args.baseline:
+        print(f"\nbase: modules at {args.baseline}; now: {plugins}")
+
+
+if __name__ == '__main__':
+    main()
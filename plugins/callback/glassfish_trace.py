@@ -0,0 +1,110 @@
+# Callback que agrega o arquivo de trace gravado pelos modulos gf_* (opcao
+# trace_file / variavel GLASSFISH_TRACE_FILE) e mostra, no fim da play, os
+# endpoints do DAS que mais consumiram tempo.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    name: glassfish_trace
+    type: aggregate
+    short_description: Reports the slowest GlassFish REST endpoints at the end of the play
+    description:
+      - Reads the JSON-lines trace file written by the gf_* modules and prints the endpoints
+        with the highest total time, with round trips, connect/TTFB/total times and bytes.
+    requirements:
+      - enable in configuration
+    options:
+      trace_file:
+        description: Trace file written by the gf_* modules (same value as their trace_file option).
+        env:
+          - name: GLASSFISH_TRACE_FILE
+        ini:
+          - section: callback_glassfish_trace
+            key: trace_file
+        type: path
+      top:
+        description: Number of endpoints to show.
+        default: 10
+        env:
+          - name: GLASSFISH_TRACE_TOP
+        ini:
+          - section: callback_glassfish_trace
+            key: top
+        type: int
+'''
+
+import json
+import os
+
+from ansible.plugins.callback import CallbackBase
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'glassfish_trace'
+    CALLBACK_NEEDS_ENABLED = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.trace_file = None
+        self.offset = 0
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+        self.trace_file = self.get_option('trace_file')
+
+    def v2_playbook_on_start(self, playbook):
+        # Considera apenas as linhas gravadas a partir do inicio desta execucao
+        if self.trace_file and os.path.exists(self.trace_file):
+            self.offset = os.path.getsize(self.trace_file)
+
+    def read_records(self):
+        records = []
+        with open(self.trace_file) as f:
+            f.seek(self.offset)
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        return records
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.trace_file or not os.path.exists(self.trace_file):
+            return
+
+        endpoints = {}
+        for record in self.read_records():
+            key = (record.get('das'), record.get('method'), record.get('endpoint'))
+            agg = endpoints.setdefault(key, dict(round_trips=0, retries=0, connect=0.0, ttfb=0.0, total=0.0,
+                                                 max=0.0, bytes_in=0, bytes_out=0))
+            agg['round_trips'] += 1
+            if record.get('attempt', 1) > 1:
+                agg['retries'] += 1
+            agg['connect'] += record.get('connect', 0.0)
+            agg['ttfb'] += record.get('ttfb', 0.0)
+            agg['total'] += record.get('total', 0.0)
+            agg['max'] = max(agg['max'], record.get('total', 0.0))
+            agg['bytes_in'] += record.get('bytes_in', 0)
+            agg['bytes_out'] += record.get('bytes_out', 0)
+
+        if not endpoints:
+            return
+
+        self._display.banner("GLASSFISH SLOWEST ENDPOINTS")
+        ranking = sorted(endpoints.items(), key=lambda item: item[1]['total'], reverse=True)
+        for (das, method, endpoint), agg in ranking[:self.get_option('top')]:
+            count = agg['round_trips']
+            self._display.display(
+                f"{agg['total']:8.3f}s  {method} {endpoint} [{das}] "
+                f"round_trips={count} retries={agg['retries']} "
+                f"avg_connect={agg['connect'] / count:.3f}s avg_ttfb={agg['ttfb'] / count:.3f}s "
+                f"avg_total={agg['total'] / count:.3f}s max={agg['max']:.3f}s "
+                f"bytes_in={agg['bytes_in']} bytes_out={agg['bytes_out']}"
+            )
+
+        total_round_trips = sum(agg['round_trips'] for agg in endpoints.values())
+        total_time = sum(agg['total'] for agg in endpoints.values())
+        self._display.display(f"Total: {total_round_trips} round trips, {total_time:.3f}s on the DAS")
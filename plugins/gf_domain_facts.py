@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, DEFAULT_MAX_WORKERS, DEFAULT_POOL_MAXSIZE, run_concurrently
+from ansible.module_utils.gf_domain import (
+    get_jms_host, get_node, get_system_properties, list_cluster_names, list_configs, list_instances,
+    list_jms_hosts, list_nodes, read_node_ssh, system_properties_url
+)
+
+SUBSETS = ['clusters', 'instances', 'system_properties', 'nodes', 'configs', 'jms_hosts']
+
+# Resolve o gather_subset: 'all' coleta tudo, '!x' exclui um subset, e
+# instances/system_properties dependem de clusters, jms_hosts depende de configs
+def resolve_subset(gather_subset):
+    subset = set()
+    excluded = set()
+    for item in gather_subset:
+        if item == 'all':
+            subset.update(SUBSETS)
+        elif item.startswith('!'):
+            excluded.add(item[1:])
+        else:
+            subset.add(item)
+    subset -= excluded
+
+    if subset & {'instances', 'system_properties'}:
+        subset.add('clusters')
+    if 'jms_hosts' in subset:
+        subset.add('configs')
+    return sorted(subset)
+
+# Mantem do host JMS so os atributos comparados pelo gf_jms_host. A senha de
+# admin nunca vai para os fatos: quem usa o snapshot nao a compara
+def compact_jms_host(entity):
+    return {key: entity[key] for key in ('host', 'port', 'adminUserName') if key in entity}
+
+# Normaliza o node (entidade mais atributos do ssh-connector) para os campos
+# usados pelos outros modulos
+def compact_node(entity):
+    node = dict(
+        node_host=entity.get('nodeHost'),
+        node_dir=entity.get('nodeDir'),
+        install_dir=entity.get('installDir'),
+        type=entity.get('type')
+    )
+    for key, fact in (('sshPort', 'ssh_port'), ('sshUser', 'ssh_user'), ('sshKeyFile', 'ssh_key_file')):
+        if key in entity:
+            node[fact] = entity[key]
+    return node
+
+def compact_instance(instance):
+    return {key: value for key, value in instance.items() if key != 'name'}
+
+# Executa uma leitura do dominio. Cada item e uma tupla (tipo, nomes...)
+def fetch(client, gf_type, item):
+    kind = item[0]
+    if kind == 'clusters':
+        return list_cluster_names(client, gf_type)
+    if kind == 'nodes':
+        return list_nodes(client)
+    if kind == 'configs':
+        return list_configs(client)
+    if kind == 'instances':
+        return {instance['name']: compact_instance(instance) for instance in list_instances(client, item[1])}
+    if kind == 'system_properties':
+        return get_system_properties(client, system_properties_url(client, 'cluster', item[1]))
+    if kind == 'node':
+        return compact_node(dict(get_node(client, item[1]), **read_node_ssh(client, item[1])))
+    if kind == 'jms_hosts':
+        return list(list_jms_hosts(client, item[1][:-len('-config')]).keys())
+    if kind == 'jms_host':
+        return compact_jms_host(get_jms_host(client, item[1][:-len('-config')], item[2]))
+    raise ValueError(f"Unknown fact kind {kind}")
+
+# Percorre o dominio em niveis: listagens do topo, depois os filhos de cada
+# recurso, todos buscados em paralelo dentro de cada nivel
+def gather_domain_facts(client, gf_type, subset, max_workers):
+    facts = dict(gather_subset=subset)
+    errors = []
+
+    def run(items):
+        results = []
+        for item, result, error in run_concurrently(lambda item: fetch(client, gf_type, item), items, max_workers):
+            if error is not None:
+                errors.append(f"{'/'.join(item)}: {str(error)}")
+            else:
+                results.append((item, result))
+        return results
+
+    top_level = [(kind,) for kind in ('clusters', 'nodes', 'configs') if kind in subset]
+    children = []
+    for item, result in run(top_level):
+        kind = item[0]
+        facts[kind] = {name: {} for name in result}
+        for name in result:
+            if kind == 'clusters':
+                children.extend((child, name) for child in ('instances', 'system_properties') if child in subset)
+            elif kind == 'nodes':
+                children.append(('node', name))
+            elif kind == 'configs' and 'jms_hosts' in subset:
+                # Configs sem jms-service (ex.: default-config em algumas versoes) ficam sem hosts
+                if name.endswith('-config'):
+                    children.append(('jms_hosts', name))
+
+    grandchildren = []
+    for item, result in run(children):
+        kind, name = item
+        if kind in ('instances', 'system_properties'):
+            facts['clusters'][name][kind] = result
+        elif kind == 'node':
+            facts['nodes'][name] = result
+        elif kind == 'jms_hosts':
+            facts['configs'][name]['jms_hosts'] = {}
+            grandchildren.extend(('jms_host', name, host) for host in result)
+
+    for item, result in run(grandchildren):
+        kind, config, host = item
+        facts['configs'][config]['jms_hosts'][host] = result
+
+    return facts, errors
+
+def main():
+    module_args = dict(
+        host=dict(type='str'),
+        admin_user=dict(type='str'),
+        admin_pass=dict(type='str', no_log=True),
+        admin_port=dict(type='int'),
+        protocol=dict(type='str', default='https', choices=['http', 'https']),
+        validate_certs=dict(type='bool', default=False),
+        type=dict(type='str', default='glassfish3'),
+        gather_subset=dict(type='list', elements='str', default=['all']),
+        max_workers=dict(type='int', default=DEFAULT_MAX_WORKERS),
+    )
+    module_args.update(glassfish_argument_spec())
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    host = module.params['host']
+    admin_user = module.params['admin_user']
+    admin_pass = module.params['admin_pass']
+    admin_port = module.params['admin_port']
+    protocol = module.params['protocol']
+    validate_certs = module.params['validate_certs']
+    gf_type = module.params['type']
+    max_workers = module.params['max_workers']
+
+    invalid = [item for item in module.params['gather_subset'] if item.lstrip('!') not in SUBSETS + ['all']]
+    if invalid:
+        module.fail_json(msg=f"Invalid gather_subset entries: {', '.join(invalid)}. Valid values: all, {', '.join(SUBSETS)}")
+
+    subset = resolve_subset(module.params['gather_subset'])
+
+    client = GlassfishClient(module, host, admin_port, admin_user, admin_pass, protocol, validate_certs,
+                             pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+
+    facts, errors = gather_domain_facts(client, gf_type, subset, max_workers)
+    if errors:
+        client.fail_json(msg=f"Failed to gather domain facts: {'; '.join(errors)}")
+
+    client.exit_json(changed=False, ansible_facts=dict(glassfish_domain=facts))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/python
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, GlassfishRequestError, DEFAULT_MAX_WORKERS, DEFAULT_POOL_MAXSIZE, run_concurrently
+from ansible.module_utils.gf_fanout import fanout_argument_spec, run_on_das_hosts
+from ansible.module_utils.gf_domain import (
+    create_cluster, create_instance, create_jms_host, create_node_ssh, delete_jms_host, diff_jms_host,
+    diff_system_properties, get_jms_host, get_system_properties, list_cluster_names, list_instances,
+    list_nodes, read_jms_hosts, run_operations, set_system_properties, snapshot_cluster_names, snapshot_instances,
+    snapshot_jms_hosts, snapshot_node_names, snapshot_system_properties, system_properties_url, update_jms_host
+)
+
+# Le o estado de um cluster que ja existe no dominio. O que estiver no snapshot
+# do gf_domain_facts nao e lido de novo.
+def read_cluster(client, cluster, facts):
+    name = cluster['name']
+    current = dict(instances=set(), system_properties=None, jms_hosts={})
+
+    instances = snapshot_instances(facts, name)
+    if instances is None:
+        instances = list_instances(client, name)
+    current['instances'] = {instance['name'] for instance in instances}
+
+    if cluster['systemproperties']:
+        current['system_properties'] = snapshot_system_properties(facts, 'cluster', name)
+        if current['system_properties'] is None:
+            current['system_properties'] = get_system_properties(client, system_properties_url(client, 'cluster', name))
+
+    if cluster['jms_hosts']:
+        existing_hosts = snapshot_jms_hosts(facts, name)
+        if existing_hosts is None:
+            existing_hosts = read_jms_hosts(client, name, [jms_host['name'] for jms_host in cluster['jms_hosts']], 1)
+        for jms_host in cluster['jms_hosts']:
+            if jms_host['name'] in existing_hosts:
+                existing = existing_hosts[jms_host['name']]
+                if not isinstance(existing, dict):
+                    existing = get_jms_host(client, name, jms_host['name'])
+                current['jms_hosts'][jms_host['name']] = existing
+
+    return current
+
+# Le o estado atual do dominio uma unica vez: nodes, clusters e, para cada
+# cluster desejado que ja existe, instancias, system properties e hosts JMS
+def read_domain(client, gf_type, clusters, facts, max_workers):
+    nodes = snapshot_node_names(facts)
+    if nodes is None:
+        nodes = list_nodes(client)
+    cluster_names = snapshot_cluster_names(facts)
+    if cluster_names is None:
+        cluster_names = list_cluster_names(client, gf_type)
+
+    nodes = set(nodes)
+    cluster_names = set(cluster_names)
+
+    existing_clusters = [cluster for cluster in clusters if cluster['name'] in cluster_names]
+    current_clusters = {}
+    for cluster, current, error in run_concurrently(lambda cluster: read_cluster(client, cluster, facts), existing_clusters, max_workers):
+        if error is not None:
+            raise error
+        current_clusters[cluster['name']] = current
+
+    return dict(nodes=nodes, clusters=current_clusters)
+
+def system_properties_operation(client, cluster, current_properties):
+    url = system_properties_url(client, 'cluster', cluster['name'])
+
+    def apply():
+        properties = current_properties
+        if properties is None:
+            # Cluster criado nesta execucao, le as propriedades que ele recebeu
+            properties = get_system_properties(client, url)
+        changed, all_properties_to_update = diff_system_properties(properties, cluster['systemproperties'])
+        if changed:
+            set_system_properties(client, url, all_properties_to_update)
+        return changed
+
+    return apply
+
+def jms_host_operation(client, cluster, jms_host, existing_jms_host, new_cluster):
+    name = cluster['name']
+
+    def apply():
+        existing = existing_jms_host
+        if new_cluster:
+            # Cluster criado nesta execucao, o host pode ter vindo da config padrao
+            existing = read_jms_hosts(client, name, [jms_host['name']], 1).get(jms_host['name'])
+        return reconcile_jms_host(client, name, jms_host, existing)
+
+    return apply
+
+def reconcile_jms_host(client, target, jms_host, existing):
+    if jms_host['state'] == 'absent':
+        if existing is None:
+            return False
+        delete_jms_host(client, target, jms_host['name'])
+        return True
+
+    if existing is None:
+        create_jms_host(client, target, {
+            "name": jms_host['name'],
+            "host": jms_host['jms_host'],
+            "port": jms_host['port'],
+            "adminUserName": jms_host['jms_admin_user'],
+            "adminPassword": jms_host['jms_admin_pass'],
+            "target": target
+        })
+        return True
+
+    update_body = diff_jms_host(existing, jms_host['jms_host'], jms_host['port'],
+                                jms_host['jms_admin_user'], jms_host['jms_admin_pass'])
+    if not update_body:
+        return False
+    update_jms_host(client, target, jms_host['name'], update_body)
+    return True
+
+# Operacao de escrita simples, que sempre resulta em mudanca
+def write_operation(func, client, body):
+    def apply():
+        func(client, body)
+        return True
+    return apply
+
+# Calcula as operacoes necessarias, ja ordenadas por dependencia:
+# nodes e clusters primeiro, depois instancias, system properties e hosts JMS
+def plan_operations(client, nodes, clusters, current):
+    operations = []
+
+    for node in nodes:
+        if node['name'] in current['nodes']:
+            continue
+        body = {
+            "id": node['name'],
+            "nodedir": node['node_path'],
+            "nodehost": node['node_host'],
+            "sshport": str(node['node_port_ssh']),
+            "sshuser": node['node_sshuser_name'],
+            "sshkeyfile": node['node_path_keyssh']
+        }
+        operations.append(dict(key=f"node:{node['name']}", depends_on=[],
+                               func=write_operation(create_node_ssh, client, body),
+                               msg=f"Node {node['name']} created."))
+
+    for cluster in clusters:
+        name = cluster['name']
+        cluster_key = f"cluster:{name}"
+        cluster_current = current['clusters'].get(name)
+        new_cluster = cluster_current is None
+
+        if new_cluster:
+            operations.append(dict(key=cluster_key, depends_on=[],
+                                   func=write_operation(create_cluster, client, {'id': name}),
+                                   msg=f"Cluster '{name}' foi adicionado."))
+            cluster_current = dict(instances=set(), system_properties=None, jms_hosts={})
+
+        for instance in cluster['instances']:
+            if instance['name'] in cluster_current['instances']:
+                continue
+            body = {
+                'id': instance['name'],
+                'cluster': name,
+                'nodeagent': instance['nodeagent'],
+                'portbase': instance['portbase'],
+                'systemproperties': instance['systemproperties']
+            }
+            operations.append(dict(key=f"instance:{name}/{instance['name']}",
+                                   depends_on=[cluster_key, f"node:{instance['nodeagent']}"],
+                                   func=write_operation(create_instance, client, body),
+                                   msg=f"Instance '{instance['name']}' foi adicionada ao cluster."))
+
+        if cluster['systemproperties']:
+            current_properties = cluster_current['system_properties']
+            if current_properties is None or diff_system_properties(current_properties, cluster['systemproperties'])[0]:
+                operations.append(dict(key=f"system-properties:{name}", depends_on=[cluster_key],
+                                       deferred=current_properties is None,
+                                       func=system_properties_operation(client, cluster, current_properties),
+                                       msg=f"System properties of cluster '{name}' updated."))
+
+        for jms_host in cluster['jms_hosts']:
+            existing = cluster_current['jms_hosts'].get(jms_host['name'])
+            if not new_cluster:
+                if jms_host['state'] == 'absent' and existing is None:
+                    continue
+                if jms_host['state'] == 'present' and existing is not None and not diff_jms_host(
+                        existing, jms_host['jms_host'], jms_host['port'], jms_host['jms_admin_user'], jms_host['jms_admin_pass']):
+                    continue
+            operations.append(dict(key=f"jms-host:{name}/{jms_host['name']}", depends_on=[cluster_key],
+                                   deferred=new_cluster, func=jms_host_operation(client, cluster, jms_host, existing, new_cluster),
+                                   msg=f"JMS Host {jms_host['name']} of cluster '{name}' reconciled."))
+
+    return operations
+
+def duplicated_names(names):
+    return sorted(set(name for name in names if names.count(name) > 1))
+
+# Cada recurso recebe uma unica operacao: nomes repetidos gerariam chaves de
+# operacao iguais, comparadas com a mesma leitura e aplicadas em paralelo
+def check_unique_names(client, nodes, clusters):
+    duplicated = duplicated_names([node['name'] for node in nodes])
+    if duplicated:
+        client.fail_json(msg=f"Nodes listed more than once in nodes: {', '.join(duplicated)}")
+    duplicated = duplicated_names([cluster['name'] for cluster in clusters])
+    if duplicated:
+        client.fail_json(msg=f"Clusters listed more than once in clusters: {', '.join(duplicated)}")
+    # Nomes de instancia sao unicos no dominio, nao so no cluster
+    duplicated = duplicated_names([instance['name'] for cluster in clusters for instance in cluster['instances']])
+    if duplicated:
+        client.fail_json(msg=f"Instances listed more than once in clusters: {', '.join(duplicated)}")
+    for cluster in clusters:
+        duplicated = duplicated_names([jms_host['name'] for jms_host in cluster['jms_hosts']])
+        if duplicated:
+            client.fail_json(msg=f"JMS Hosts listed more than once in jms_hosts of cluster {cluster['name']}: {', '.join(duplicated)}")
+
+# Le o dominio do DAS do client, aplica as operacoes planejadas e encerra a task
+def reconcile(module, client):
+    gf_type = module.params['type']
+    nodes = module.params['nodes']
+    clusters = module.params['clusters']
+    max_workers = module.params['max_workers']
+
+    client.begin()
+
+    check_unique_names(client, nodes, clusters)
+
+    try:
+        current = read_domain(client, gf_type, clusters, module.params['domain_facts'], max_workers)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to read domain topology. Error: {str(e)}")
+
+    operations = plan_operations(client, nodes, clusters, current)
+
+    if module.check_mode:
+        # As escritas vao para o plano. Operacoes que leem um cluster criado
+        # nesta execucao so podem ser calculadas depois da criacao e deixam o
+        # plano incompleto.
+        deferred = [op['key'] for op in operations if op.get('deferred')]
+        run_operations([op for op in operations if not op.get('deferred')], max_workers)
+        client.defer_plan(deferred)
+        results = [dict(operation=op['key'], status='planned', changed=True, msg=op['msg']) for op in operations]
+        client.exit_json(changed=bool(operations), results=results, msg=f"{len(operations)} operations planned.")
+
+    outcomes = run_operations(operations, max_workers)
+
+    results = []
+    for op in operations:
+        status, value = outcomes[op['key']]
+        if status == 'ok':
+            results.append(dict(operation=op['key'], status=status, changed=bool(value),
+                                msg=op['msg'] if value else "No changes required."))
+        else:
+            results.append(dict(operation=op['key'], status=status, changed=False, msg=str(value)))
+
+    changed = any(result['changed'] for result in results)
+    failed = [result['operation'] for result in results if result['status'] != 'ok']
+    if failed:
+        client.fail_json(msg=f"Failed to apply domain topology: {', '.join(failed)}", changed=changed, results=results)
+
+    client.exit_json(changed=changed, results=results, msg=f"{len(operations)} operations applied.")
+
+def main():
+    node_options = dict(
+        name=dict(type='str', required=True),
+        node_sshuser_name=dict(type='str', required=True),
+        node_path=dict(type='str', required=True),
+        node_path_keyssh=dict(type='str', required=True),
+        node_host=dict(type='str', required=True),
+        node_port_ssh=dict(type='int', default=22),
+    )
+    instance_options = dict(
+        name=dict(type='str', required=True),
+        nodeagent=dict(type='str', required=True),
+        portbase=dict(type='int', required=True),
+        systemproperties=dict(type='str', default=''),
+    )
+    systemproperty_options = dict(
+        name=dict(type='str', required=True),
+        value=dict(type='str'),
+        state=dict(type='str', default='present', choices=['present', 'absent']),
+    )
+    jms_host_options = dict(
+        name=dict(type='str', required=True),
+        jms_host=dict(type='str', required=True),
+        port=dict(type='int', required=True),
+        jms_admin_user=dict(type='str', default='admin'),
+        jms_admin_pass=dict(type='str', default='admin', no_log=True),
+        state=dict(type='str', default='present', choices=['present', 'absent']),
+    )
+    cluster_options = dict(
+        name=dict(type='str', required=True),
+        instances=dict(type='list', elements='dict', default=[], options=instance_options),
+        systemproperties=dict(type='list', elements='dict', default=[], options=systemproperty_options),
+        jms_hosts=dict(type='list', elements='dict', default=[], options=jms_host_options),
+    )
+    module_args = dict(
+        host=dict(type='str'),
+        admin_user=dict(type='str'),
+        admin_pass=dict(type='str', no_log=True),
+        admin_port=dict(type='int'),
+        protocol=dict(type='str', default='https', choices=['http', 'https']),
+        validate_certs=dict(type='bool', default=False),
+        type=dict(type='str', default='glassfish3'),
+        nodes=dict(type='list', elements='dict', default=[], options=node_options),
+        clusters=dict(type='list', elements='dict', default=[], options=cluster_options),
+        max_workers=dict(type='int', default=DEFAULT_MAX_WORKERS),
+        domain_facts=dict(type='dict'),
+    )
+
+    module_args.update(glassfish_argument_spec())
+    module_args.update(fanout_argument_spec())
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        supports_check_mode=True
+    )
+
+    host = module.params['host']
+    admin_user = module.params['admin_user']
+    admin_pass = module.params['admin_pass']
+    admin_port = module.params['admin_port']
+    protocol = module.params['protocol']
+    validate_certs = module.params['validate_certs']
+    max_workers = module.params['max_workers']
+
+    if module.params['das_hosts'] is not None:
+        run_on_das_hosts(module, lambda client: reconcile(module, client), admin_port, admin_user, admin_pass, protocol,
+                         validate_certs, pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+
+    client = GlassfishClient(module, host, admin_port, admin_user, admin_pass, protocol, validate_certs,
+                             pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+    reconcile(module, client)
+
+if __name__ == '__main__':
+    main()
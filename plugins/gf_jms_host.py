@@ -1,135 +1,168 @@
 #!/usr/bin/python
 
-import requests
-from requests.auth import HTTPBasicAuth
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, GlassfishHTTPError, GlassfishRequestError, DEFAULT_MAX_WORKERS, DEFAULT_POOL_MAXSIZE, debug, run_concurrently
+from ansible.module_utils.gf_fanout import fanout_argument_spec, run_on_das_hosts
+from ansible.module_utils import gf_domain
+from ansible.module_utils.gf_domain import diff_jms_host, read_jms_hosts, snapshot_jms_hosts
 
-# Funcao para realizar o GET
-def get_jms_host(module, url, auth, headers):
+# Le os hosts JMS do target numa unica requisicao (filhos expandidos). O
+# snapshot do gf_domain_facts, quando informado, dispensa a leitura.
+def discover_jms_hosts(module, client, target, names, max_workers):
+    existing_hosts = snapshot_jms_hosts(module.params['domain_facts'], target)
+    if existing_hosts is not None:
+        return existing_hosts
     try:
-        response = requests.get(url, auth=auth, headers=headers, verify=module.params['validate_certs'])
-        response.raise_for_status()
-        module.debug(f"GET response URL: {url}")
-        module.debug(f"GET response body: {response.text}")
-        return response.json().get('extraProperties', {}).get('entity', {})
-    except requests.HTTPError as e:
-        module.fail_json(msg=f"Failed to retrieve JMS Host. Status code: {response.status_code}, Response: {response.text}")
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Request failed for JMS Host. Error: {str(e)}")
+        existing_hosts = read_jms_hosts(client, target, names, max_workers)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Request failed for JMS Host listing. Error: {str(e)}")
+    debug(module, lambda: f"JMS Hosts of {target}: {existing_hosts}")
+    return existing_hosts
 
 # Funcao para criar ou atualizar o host JMS
-def update_jms_host(module, url, auth, headers, body):
+def update_jms_host(module, client, url, body, idempotent=False):
     try:
-        module.debug(f"POST/PUT URL: {url}")
-        module.debug(f"POST/PUT body: {body}")
-        response = requests.post(url, json=body, auth=auth, headers=headers, verify=module.params['validate_certs'])
-        module.debug(f"POST/PUT response status: {response.status_code}")
-        module.debug(f"POST/PUT response body: {response.text}")
+        debug(module, lambda: f"POST/PUT URL: {url}")
+        debug(module, lambda: f"POST/PUT body: {body}")
+        response = client.post(url, json=body, idempotent=idempotent)
+        debug(module, lambda: f"POST/PUT response status: {response.status_code}")
+        debug(module, lambda: f"POST/PUT response body: {response.text}")
         response.raise_for_status()
         return True, "JMS Host updated successfully."
-    except requests.HTTPError as e:
-        module.fail_json(msg=f"Failed to update JMS Host. Status code: {response.status_code}, Response: {response.text}")
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Request failed for JMS Host. Error: {str(e)}")
+    except GlassfishHTTPError as e:
+        client.fail_json(msg=f"Failed to update JMS Host. Status code: {response.status_code}, Response: {response.text}")
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Request failed for JMS Host. Error: {str(e)}")
 
 # Funcao para deletar o host JMS
-def delete_jms_host(module, url, auth, headers, target):
+def delete_jms_host(module, client, url, target):
     try:
         body = {"target": target}
-        module.debug(f"DELETE URL: {url}")
-        module.debug(f"DELETE body: {body}")
-        response = requests.delete(url, json=body, auth=auth, headers=headers, verify=module.params['validate_certs'])
-        module.debug(f"DELETE response status: {response.status_code}")
-        module.debug(f"DELETE response body: {response.text}")
+        debug(module, lambda: f"DELETE URL: {url}")
+        debug(module, lambda: f"DELETE body: {body}")
+        response = client.delete(url, json=body)
+        debug(module, lambda: f"DELETE response status: {response.status_code}")
+        debug(module, lambda: f"DELETE response body: {response.text}")
         response.raise_for_status()
         return True, "JMS Host deleted successfully."
-    except requests.HTTPError as e:
-        module.fail_json(msg=f"Failed to delete JMS Host. Status code: {response.status_code}, Response: {response.text}")
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Request failed for JMS Host deletion. Error: {str(e)}")
-        
-# Funcao principal
-def main():
-    module_args = dict(
-        host=dict(type='str', required=True),
-        admin_user=dict(type='str', required=True),
-        admin_pass=dict(type='str', required=True, no_log=True),
-        admin_port=dict(type='int', required=True),
-        protocol=dict(type='str', default='https', choices=['http', 'https']),
-        target=dict(type='str', required=True),
-        jms_admin_user=dict(type='str', default='admin'),
-        jms_admin_pass=dict(type='str', default='admin'),
-        jms_host_name=dict(type='str', required=True),
-        jms_host=dict(type='str', required=True),
-        port=dict(type='int', required=True),
-        validate_certs=dict(type='bool', default=False),
-        state=dict(type='str', default='present', choices=['present', 'absent']),
-    )
+    except GlassfishHTTPError as e:
+        client.fail_json(msg=f"Failed to delete JMS Host. Status code: {response.status_code}, Response: {response.text}")
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Request failed for JMS Host deletion. Error: {str(e)}")
 
-    module = AnsibleModule(
-        argument_spec=module_args,
-        supports_check_mode=True
-    )
+# Reconcilia a lista jms_hosts contra uma unica leitura da colecao. Criacoes,
+# atualizacoes (so com os atributos que mudaram) e remocoes de hosts
+# diferentes sao enviadas em paralelo.
+def ensure_jms_hosts(module, client, target, jms_hosts, max_workers):
+    # Cada host recebe uma unica escrita: duas entradas com o mesmo nome
+    # seriam comparadas com a mesma leitura e enviadas em paralelo
+    names = [jms_host['name'] for jms_host in jms_hosts]
+    duplicated = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicated:
+        client.fail_json(msg=f"JMS Hosts listed more than once in jms_hosts: {', '.join(duplicated)}")
 
-    host = module.params['host']
-    admin_user = module.params['admin_user']
-    admin_pass = module.params['admin_pass']
-    admin_port = module.params['admin_port']
-    protocol = module.params['protocol']
+    existing_hosts = discover_jms_hosts(module, client, target, [jms_host['name'] for jms_host in jms_hosts], max_workers)
+
+    results = []
+    actions = []
+    for jms_host in jms_hosts:
+        name = jms_host['name']
+        if jms_host['state'] == 'absent':
+            if name in existing_hosts:
+                actions.append((jms_host, 'delete', None))
+            else:
+                results.append(dict(name=name, changed=False, failed=False, msg=f"JMS Host {name} does not exist, nothing to delete."))
+        elif name in existing_hosts:
+            update_body = diff_jms_host(existing_hosts[name], jms_host['jms_host'], jms_host['port'],
+                                        jms_host['jms_admin_user'], jms_host['jms_admin_pass'])
+            if update_body:
+                actions.append((jms_host, 'update', update_body))
+            else:
+                results.append(dict(name=name, changed=False, failed=False, msg="No changes required."))
+        else:
+            actions.append((jms_host, 'create', {
+                "name": name,
+                "host": jms_host['jms_host'],
+                "port": jms_host['port'],
+                "adminUserName": jms_host['jms_admin_user'],
+                "adminPassword": jms_host['jms_admin_pass'],
+                "target": target
+            }))
+
+    def apply(action):
+        jms_host, kind, body = action
+        if kind == 'delete':
+            gf_domain.delete_jms_host(client, target, jms_host['name'])
+            return "JMS Host deleted successfully."
+        if kind == 'update':
+            gf_domain.update_jms_host(client, target, jms_host['name'], body)
+            return "JMS Host updated successfully."
+        gf_domain.create_jms_host(client, target, body)
+        return "JMS Host created successfully."
+
+    for (jms_host, kind, body), msg, error in run_concurrently(apply, actions, max_workers):
+        result = dict(name=jms_host['name'], changed=error is None, failed=error is not None,
+                      msg=str(error) if error is not None else msg)
+        if kind == 'update':
+            result['update_body'] = body
+        results.append(result)
+
+    # Resultados na mesma ordem da lista jms_hosts
+    order = {jms_host['name']: index for index, jms_host in enumerate(jms_hosts)}
+    return sorted(results, key=lambda result: order[result['name']])
+
+# Reconcilia os hosts JMS no DAS do client e encerra a task
+def reconcile(module, client):
     target = module.params['target']
     jms_host_name = module.params['jms_host_name']
     jms_host = module.params['jms_host']
     port = module.params['port']
-    validate_certs = module.params['validate_certs']
     state = module.params['state']
+    jms_hosts = module.params['jms_hosts']
+    max_workers = module.params['max_workers']
 
-    auth = HTTPBasicAuth(admin_user, admin_pass)
-    headers = {
-        "Accept": "application/json",
-        "X-Requested-By": "GlassFish REST HTML interface"
-    }
+    client.begin()
+
+    if jms_hosts is not None:
+        results = ensure_jms_hosts(module, client, target, jms_hosts, max_workers)
+        changed = any(result['changed'] for result in results)
+        failed = [result['name'] for result in results if result['failed']]
+        if failed:
+            client.fail_json(msg=f"Failed to reconcile JMS Hosts: {', '.join(failed)}", changed=changed, results=results)
+        client.exit_json(changed=changed, results=results, msg=f"{len(results)} JMS Hosts reconciled.")
 
     # URL para verificar se o host existe
-    list_jms_hosts_url = f"{protocol}://{host}:{admin_port}/management/domain/configs/config/{target}-config/jms-service/jms-host"
-    module.debug(f"List JMS Hosts URL: {list_jms_hosts_url}")
+    list_jms_hosts_url = client.url(f"configs/config/{target}-config/jms-service/jms-host")
+    debug(module, lambda: f"List JMS Hosts URL: {list_jms_hosts_url}")
 
-    response = requests.get(list_jms_hosts_url, auth=auth, headers=headers, verify=validate_certs)
-    module.debug(f"List JMS Hosts response: {response.text}")
-    existing_hosts = response.json().get('extraProperties', {}).get('childResources', {})
+    existing_hosts = discover_jms_hosts(module, client, target, [jms_host_name], max_workers)
 
      # Se o state for 'absent', deletar o host
     if state == 'absent':
         if jms_host_name in existing_hosts:
             # Se o host existir, deletar
             jms_host_url = f"{list_jms_hosts_url}/{jms_host_name}"
-            changed, msg = delete_jms_host(module, jms_host_url, auth, headers, target)
-            module.exit_json(changed=changed, msg=msg)
+            changed, msg = delete_jms_host(module, client, jms_host_url, target)
+            client.exit_json(changed=changed, msg=msg)
         else:
             # Se o host nao existir, nada a ser feito
-            module.exit_json(changed=False, msg=f"JMS Host {jms_host_name} does not exist, nothing to delete.")
+            client.exit_json(changed=False, msg=f"JMS Host {jms_host_name} does not exist, nothing to delete.")
 
     # Verifica se o host já existe
     if jms_host_name in existing_hosts:
-        # Se existir, obter detalhes do host
+        # Os atributos do host ja vieram na leitura expandida da colecao
         jms_host_url = f"{list_jms_hosts_url}/{jms_host_name}"
-        existing_jms_host = get_jms_host(module, jms_host_url, auth, headers)
+        existing_jms_host = existing_hosts[jms_host_name]
 
         # Monta o body apenas com os parametros que mudaram
-        update_body = {}
-        if existing_jms_host.get('host') != jms_host:
-            update_body['host'] = jms_host
-        if int(existing_jms_host.get('port', 0)) != int(port):
-            update_body['port'] = port
-        if existing_jms_host.get('adminUserName') != module.params['jms_admin_user']:
-            update_body['adminUserName'] = module.params['jms_admin_user']
-        if existing_jms_host.get('adminPassword') != module.params['jms_admin_pass']:
-            update_body['adminPassword'] = module.params['jms_admin_pass']
+        update_body = diff_jms_host(existing_jms_host, jms_host, port,
+                                    module.params['jms_admin_user'], module.params['jms_admin_pass'])
 
         if update_body:
-            changed, msg = update_jms_host(module, jms_host_url, auth, headers, update_body)
-            module.exit_json(changed=changed, msg=msg, update_body=update_body)
+            changed, msg = update_jms_host(module, client, jms_host_url, update_body, idempotent=True)
+            client.exit_json(changed=changed, msg=msg, update_body=update_body)
         else:
-            module.exit_json(changed=False, msg="No changes required.")
+            client.exit_json(changed=False, msg="No changes required.")
     else:
         # Se o host nao existir, cria um novo
         body = {
@@ -141,8 +174,63 @@ def main():
             "target": target
         }
         create_url = list_jms_hosts_url
-        changed, msg = update_jms_host(module, create_url, auth, headers, body)
-        module.exit_json(changed=changed, msg=msg)
+        changed, msg = update_jms_host(module, client, create_url, body)
+        client.exit_json(changed=changed, msg=msg)
+
+# Funcao principal
+def main():
+    module_args = dict(
+        host=dict(type='str'),
+        admin_user=dict(type='str'),
+        admin_pass=dict(type='str', no_log=True),
+        admin_port=dict(type='int'),
+        protocol=dict(type='str', default='https', choices=['http', 'https']),
+        target=dict(type='str', required=True),
+        jms_admin_user=dict(type='str', default='admin'),
+        jms_admin_pass=dict(type='str', default='admin'),
+        jms_host_name=dict(type='str'),
+        jms_host=dict(type='str'),
+        port=dict(type='int'),
+        jms_hosts=dict(type='list', elements='dict', no_log=False, options=dict(
+            name=dict(type='str', required=True),
+            jms_host=dict(type='str'),
+            port=dict(type='int'),
+            jms_admin_user=dict(type='str', default='admin'),
+            jms_admin_pass=dict(type='str', default='admin', no_log=True),
+            state=dict(type='str', default='present', choices=['present', 'absent'])
+        ), required_if=[('state', 'present', ('jms_host', 'port'))]),
+        max_workers=dict(type='int', default=DEFAULT_MAX_WORKERS),
+        validate_certs=dict(type='bool', default=False),
+        state=dict(type='str', default='present', choices=['present', 'absent']),
+        domain_facts=dict(type='dict'),
+    )
+
+    module_args.update(glassfish_argument_spec())
+    module_args.update(fanout_argument_spec())
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=[('jms_host_name', 'jms_hosts')],
+        required_one_of=[('jms_host_name', 'jms_hosts')],
+        required_by=dict(jms_host_name=('jms_host', 'port')),
+        supports_check_mode=True
+    )
+
+    host = module.params['host']
+    admin_user = module.params['admin_user']
+    admin_pass = module.params['admin_pass']
+    admin_port = module.params['admin_port']
+    protocol = module.params['protocol']
+    validate_certs = module.params['validate_certs']
+    max_workers = module.params['max_workers']
+
+    if module.params['das_hosts'] is not None:
+        run_on_das_hosts(module, lambda client: reconcile(module, client), admin_port, admin_user, admin_pass, protocol,
+                         validate_certs, pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+
+    client = GlassfishClient(module, host, admin_port, admin_user, admin_pass, protocol, validate_certs,
+                             pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+    reconcile(module, client)
 
 if __name__ == '__main__':
     main()
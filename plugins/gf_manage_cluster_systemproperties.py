@@ -1,86 +1,177 @@
 #!/usr/bin/python
 
 from ansible.module_utils.basic import AnsibleModule
-import requests
-from requests.auth import HTTPBasicAuth
-
-def get_system_properties(module, url, auth, headers):
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, GlassfishRequestError, DEFAULT_MAX_WORKERS, DEFAULT_POOL_MAXSIZE, debug, run_concurrently
+from ansible.module_utils.gf_fanout import fanout_argument_spec, run_on_das_hosts
+from ansible.module_utils import gf_domain
+from ansible.module_utils.gf_domain import (
+    diff_system_properties, diff_system_properties_delta, snapshot_system_properties, system_properties_url,
+    write_system_properties_delta
+)
+
+def get_system_properties(module, client, url):
     try:
-        response = requests.get(url + f"system-properties", auth=auth, headers=headers, verify=module.params['validate_certs'])
-        response.raise_for_status()
-        data = response.json()
-
-        properties = {}
-        for prop in data.get('extraProperties', {}).get('systemProperties', []):
-            name = prop.get('name')
-            value = prop.get('value')
-            default_value = prop.get('defaultValue')
-
-            properties[name] = {
-                "value": value,
-                "default_value": default_value
-            }
-
-        return properties
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Failed to get system properties. Error: {str(e)}")
-
-def ensure_system_properties(module, url, auth, headers, systemproperties):
-    changed = False
-    current_properties = get_system_properties(module, url, auth, headers)
-
-    # Cria um dicionário de todas as propriedades que serão enviadas no POST
-    all_properties_to_update = {name: info['value'] if info['value'] is not None else info['default_value'] for name, info in current_properties.items()}
-
-    # Atualiza o dicionário com as propriedades que precisam ser alteradas ou criadas, ou removidas
-    for prop in systemproperties:
-        name = prop.get('name')
-        desired_value = prop.get('value')
-        state = prop.get('state', 'present')
-
-        if state == 'absent':
-            # Remove a propriedade se ela estiver marcada como 'absent'
-            if name in all_properties_to_update:
-                del all_properties_to_update[name]
-                changed = True
-        else:
-            if name in current_properties:
-                current_value = current_properties[name].get('value')
-                default_value = current_properties[name].get('default_value')
-
-                # Se o valor atual ou o valor padrão for igual ao valor desejado, não precisa alterar
-                if current_value == desired_value or default_value == desired_value:
-                    continue
-
-            # Atualiza ou adiciona a propriedade com o novo valor
-            all_properties_to_update[name] = desired_value
-            changed = True
+        # Le as propriedades item a item, sem montar a arvore JSON da resposta
+        return gf_domain.get_system_properties(client, url)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to get system properties. Error: {str(e)}")
+
+def ensure_system_properties(module, client, url, systemproperties):
+    # Usa o snapshot do gf_domain_facts quando informado, evitando o GET de descoberta
+    current_properties = snapshot_system_properties(module.params['domain_facts'], module.params['target'], module.params['server_name'])
+    if current_properties is None:
+        current_properties = get_system_properties(module, client, url)
+
+    if module.params['write_mode'] == 'delta':
+        # Envia apenas as propriedades novas/alteradas e remove as ausentes
+        changed, to_set, to_delete = diff_system_properties_delta(current_properties, systemproperties)
+        if changed:
+            try:
+                write_system_properties_delta(client, url, module.params['server_name'], to_set, to_delete,
+                                              module.params['max_workers'])
+            except GlassfishRequestError as e:
+                client.fail_json(msg=f"Failed to update system properties. Error: {str(e)}")
+            debug(module, lambda: f"Updated system properties: {to_set}, removed: {to_delete}")
+        return changed
+
+    changed, all_properties_to_update = diff_system_properties(current_properties, systemproperties)
 
     # Faz um único POST com todas as propriedades, garantindo que nenhuma seja removida ou alterada indevidamente
     if changed:
-        response = requests.post(url + f"system-properties", json=all_properties_to_update, auth=auth, headers=headers, verify=module.params['validate_certs'])
+        try:
+            response = client.post(url + "system-properties", json=all_properties_to_update, idempotent=True)
+        except GlassfishRequestError as e:
+            client.fail_json(msg=f"Failed to update system properties. Error: {str(e)}")
         if response.status_code == 200:
-            module.debug(msg=f"Updated system properties: {all_properties_to_update}")
+            debug(module, lambda: f"Updated system properties: {all_properties_to_update}")
         else:
-            module.fail_json(msg=f"Failed to update system properties. Status code: {response.status_code}, Response: {response.text}")
+            client.fail_json(msg=f"Failed to update system properties. Status code: {response.status_code}, Response: {response.text}")
 
     return changed
 
+# Modo 'targets': le as system properties de todos os targets em paralelo,
+# calcula o diff de cada um e grava apenas os que mudaram, tambem em paralelo
+def ensure_targets_system_properties(module, client, targets, max_workers):
+    def read(entry):
+        # Usa o snapshot do gf_domain_facts quando informado, evitando o GET de descoberta
+        current = snapshot_system_properties(module.params['domain_facts'], entry['target'], entry['server_name'])
+        if current is None:
+            current = gf_domain.get_system_properties(client, system_properties_url(client, entry['target'], entry['server_name']))
+        return current
+
+    delta = module.params['write_mode'] == 'delta'
+
+    results = []
+    writes = []
+    for entry, current, error in run_concurrently(read, targets, max_workers):
+        result = dict(target=entry['target'], server_name=entry['server_name'], changed=False, failed=False)
+        if error is not None:
+            results.append(dict(result, failed=True, msg=str(error)))
+            continue
+        if delta:
+            changed, to_set, to_delete = diff_system_properties_delta(current, entry['systemproperties'])
+            properties = (to_set, to_delete)
+        else:
+            changed, properties = diff_system_properties(current, entry['systemproperties'])
+        if changed:
+            writes.append((entry, properties))
+        else:
+            results.append(dict(result, msg="System properties already up to date."))
+
+    def write(item):
+        entry, properties = item
+        url = system_properties_url(client, entry['target'], entry['server_name'])
+        if delta:
+            # As remocoes de cada target ficam em sequencia: o paralelismo ja e entre targets
+            write_system_properties_delta(client, url, entry['server_name'], properties[0], properties[1], 1)
+        else:
+            gf_domain.set_system_properties(client, url, properties)
+
+    for (entry, properties), _, error in run_concurrently(write, writes, max_workers):
+        result = dict(target=entry['target'], server_name=entry['server_name'])
+        if error is not None:
+            results.append(dict(result, changed=False, failed=True, msg=str(error)))
+        else:
+            debug(module, lambda: f"Updated system properties of {entry['target']} {entry['server_name']}: {properties}")
+            results.append(dict(result, changed=True, failed=False, msg="System properties updated."))
+
+    # Resultados na mesma ordem da lista targets
+    order = {(entry['target'], entry['server_name']): index for index, entry in enumerate(targets)}
+    return sorted(results, key=lambda result: order[(result['target'], result['server_name'])])
+
+# Aplica as system properties aos targets no DAS do client e encerra a task
+def reconcile(module, client):
+    server_name = module.params['server_name']
+    systemproperties = module.params['systemproperties']
+    target = module.params['target']
+    targets = module.params['targets']
+    max_workers = module.params['max_workers']
+
+    client.begin()
+
+    if targets is not None:
+        # Cada target usa a sua lista de propriedades ou, sem ela, a lista geral.
+        # A lista resolvida e uma copia: module.params fica como foi recebido
+        seen = set()
+        resolved = []
+        for entry in targets:
+            key = (entry['target'], entry['server_name'])
+            if key in seen:
+                client.fail_json(msg=f"Target {entry['target']} '{entry['server_name']}' is listed more than once in targets.")
+            seen.add(key)
+            if entry['systemproperties'] is None:
+                if systemproperties is None:
+                    client.fail_json(msg=f"No systemproperties given for {entry['target']} '{entry['server_name']}'.")
+                entry = dict(entry, systemproperties=systemproperties)
+            resolved.append(entry)
+        targets = resolved
+
+        results = ensure_targets_system_properties(module, client, targets, max_workers)
+        changed = any(result['changed'] for result in results)
+        failed = [f"{result['target']} {result['server_name']}" for result in results if result['failed']]
+        if failed:
+            client.fail_json(msg=f"Failed to manage system properties of: {', '.join(failed)}", changed=changed, results=results)
+        client.exit_json(changed=changed, results=results,
+                         msg=f"System properties managed on {len(results)} targets, {sum(1 for result in results if result['changed'])} changed.")
+
+    if target == 'cluster':
+        url = client.url(f"clusters/cluster/{server_name}/")
+    else:
+        url = client.url(f"servers/server/{server_name}/")
+
+    changed = ensure_system_properties(module, client, url, systemproperties)
+
+    client.exit_json(changed=changed, msg="System properties managed.")
+
 def main():
     module_args = dict(
-        target=dict(type='str', required=True, choices=['cluster', 'instance', 'server']),
-        host=dict(type='str', required=True),
-        base_port=dict(type='int', required=True),
-        user=dict(type='str', required=True),
-        password=dict(type='str', required=True, no_log=True),
-        server_name=dict(type='str', required=True),
+        target=dict(type='str', choices=['cluster', 'instance', 'server']),
+        host=dict(type='str'),
+        base_port=dict(type='int'),
+        user=dict(type='str'),
+        password=dict(type='str', no_log=True),
+        server_name=dict(type='str'),
+        targets=dict(type='list', elements='dict', options=dict(
+            target=dict(type='str', required=True, choices=['cluster', 'instance', 'server']),
+            server_name=dict(type='str', required=True),
+            systemproperties=dict(type='list', elements='dict')
+        )),
+        max_workers=dict(type='int', default=DEFAULT_MAX_WORKERS),
+        write_mode=dict(type='str', default='full', choices=['full', 'delta']),
         validate_certs=dict(type='bool', default=False),
         protocol=dict(type='str', default='https', choices=['http', 'https']),
-        systemproperties=dict(type='list', required=True, elements='dict')
+        systemproperties=dict(type='list', elements='dict'),
+        domain_facts=dict(type='dict')
     )
 
+    module_args.update(glassfish_argument_spec())
+    module_args.update(fanout_argument_spec())
+
     module = AnsibleModule(
         argument_spec=module_args,
+        mutually_exclusive=[('server_name', 'targets')],
+        required_one_of=[('server_name', 'targets')],
+        required_by=dict(server_name=('target', 'systemproperties')),
         supports_check_mode=True
     )
 
@@ -88,25 +179,17 @@ def main():
     base_port = module.params['base_port']
     user = module.params['user']
     password = module.params['password']
-    server_name = module.params['server_name']
     validate_certs = module.params['validate_certs']
     protocol = module.params['protocol']
-    systemproperties = module.params['systemproperties']
-    target = module.params['target']
-
-    if target == 'cluster':
-        url = f"{protocol}://{host}:{base_port}/management/domain/clusters/cluster/{server_name}/"
-    else:
-        url = f"{protocol}://{host}:{base_port}/management/domain/servers/server/{server_name}/"
-    auth = HTTPBasicAuth(user, password)
-    headers = {
-        "Accept": "application/json",
-        "X-Requested-By": "GlassFish REST HTML interface"
-    }
+    max_workers = module.params['max_workers']
 
-    changed = ensure_system_properties(module, url, auth, headers, systemproperties)
+    if module.params['das_hosts'] is not None:
+        run_on_das_hosts(module, lambda client: reconcile(module, client), base_port, user, password, protocol,
+                         validate_certs, pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
 
-    module.exit_json(changed=changed, msg="System properties managed.")
+    client = GlassfishClient(module, host, base_port, user, password, protocol, validate_certs,
+                             pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+    reconcile(module, client)
 
 if __name__ == '__main__':
     main()
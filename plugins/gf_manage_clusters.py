@@ -1,111 +1,131 @@
 #!/usr/bin/python
 
 from ansible.module_utils.basic import AnsibleModule
-import requests
-from requests.auth import HTTPBasicAuth
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, GlassfishRequestError, debug
+from ansible.module_utils.gf_fanout import fanout_argument_spec, run_on_das_hosts
+from ansible.module_utils.gf_domain import cluster_exists, read_cluster_names, snapshot_cluster_names
 
-def list_clusters(module, url, auth, headers):
+def list_clusters(module, client, url):
     try:
         # Adiciona mais informacoes para depuracao
-        module.debug(msg=f"Attempting GET request to {url}list-clusters with SSL verification {'disabled' if not module.params['validate_certs'] else 'enabled'}")
+        debug(module, lambda: f"Attempting GET request to {url}list-clusters with SSL verification {'disabled' if not module.params['validate_certs'] else 'enabled'}")
         
-        # Configura a verificacao SSL como False
-        response = requests.get(url + "list-clusters", auth=auth, headers=headers, verify=False)
+        response = client.get(url + "list-clusters")
         # Levanta um erro para códigos de status HTTP não-200
         response.raise_for_status()
         
-        # Imprime o response.text para depuracao
-        module.debug(msg=f"Response from GET request: {response.text}")
+        # Imprime o response.text para depuracao (montado so com debug ligado)
+        debug(module, lambda: f"Response from GET request: {response.text}")
         
-        data = response.json()
-        # Verifica se 'clusterNames' esta na resposta e retorna como lista
-        # Quando type for glassfish3
-        if module.params['type'] == 'glassfish3':
-            cluster_names = list(data.get('properties', {}).keys())
-            return cluster_names
-        # Quando type nao glassfish3 vai ser Payara
-        else:
-            cluster_names = data.get('extraProperties', {}).get('clusterNames', [])
+        # Extrai so os nomes: 'properties' quando type for glassfish3,
+        # 'clusterNames' no Payara
+        return read_cluster_names(response, module.params['type'])
     
-    except requests.RequestException as error_retorno:
-        module.fail_json(msg=f"Failed to list clusters. Error: {str(error_retorno)}")
+    except GlassfishRequestError as error_retorno:
+        client.fail_json(msg=f"Failed to list clusters. Error: {str(error_retorno)}")
 
-def ensure_cluster_present(module, url, auth, headers, cluster_name, body):
-    cluster_names = list_clusters(module, url, auth, headers)
-    if cluster_name in cluster_names:
-        return False, cluster_names, f"Cluster '{cluster_name}' já existe."
+# Testa a existencia do cluster com um GET direto em clusters/cluster/{name},
+# sem baixar o list-clusters. O snapshot do gf_domain_facts, quando informado,
+# dispensa o GET; DAS sem o caminho direto caem na listagem.
+def cluster_present(module, client, cluster_name):
+    cluster_names = snapshot_cluster_names(module.params['domain_facts'])
+    if cluster_names is not None:
+        return cluster_name in cluster_names
+    try:
+        return cluster_exists(client, cluster_name, module.params['type'])
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to check cluster. Error: {str(e)}")
+
+def ensure_cluster_present(module, client, url, cluster_name, body):
+    if cluster_present(module, client, cluster_name):
+        return False, f"Cluster '{cluster_name}' já existe."
 
     # Adiciona o cluster usando o body fornecido
-    response = requests.post(url + "cluster", json=body, auth=auth, headers=headers, verify=False)
+    try:
+        response = client.post(url + "cluster", json=body)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to add cluster. Error: {str(e)}")
     if response.status_code == 200:
-        # Atualiza a lista após a adicao
-        cluster_names = list_clusters(module, url, auth, headers)
-        return True, cluster_names, f"Cluster '{cluster_name}' foi adicionado."
+        return True, f"Cluster '{cluster_name}' foi adicionado."
     else:
-        module.fail_json(msg=f"Failed to add cluster. Status code: {response.status_code}, Response: {response.text}")
+        client.fail_json(msg=f"Failed to add cluster. Status code: {response.status_code}, Response: {response.text}")
 
-def ensure_cluster_absent(module, url, auth, headers, cluster_name):
-    cluster_names = list_clusters(module, url, auth, headers)
-    if cluster_name not in cluster_names:
-        return False, cluster_names, f"Cluster '{cluster_name}' não existe."
+def ensure_cluster_absent(module, client, url, cluster_name):
+    if not cluster_present(module, client, cluster_name):
+        return False, f"Cluster '{cluster_name}' não existe."
     
     # Remove o cluster
-    response = requests.delete(url + f"cluster/{cluster_name}", auth=auth, headers=headers, verify=False)
+    try:
+        response = client.delete(url + f"cluster/{cluster_name}")
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to remove cluster. Error: {str(e)}")
     if response.status_code == 200:
-        # Atualiza a lista apos a remocao
-        cluster_names = list_clusters(module, url, auth, headers)
-        return True, cluster_names, f"Cluster '{cluster_name}' foi removido."
+        return True, f"Cluster '{cluster_name}' foi removido."
     else:
-        module.fail_json(msg=f"Failed to remove cluster. Status code: {response.status_code}, Response: {response.text}")
+        client.fail_json(msg=f"Failed to remove cluster. Status code: {response.status_code}, Response: {response.text}")
+
+# Aplica o estado pedido ao cluster no DAS do client e encerra a task
+def reconcile(module, client):
+    state = module.params['state']
+    cluster_name = module.params['cluster_name']
+
+    # O inventario e lido a cada execucao: o caminho rapido do noop_probe
+    # terminaria a task sem ele
+    client.begin(noop_probe=not module.params['return_inventory'])
+    url = client.url("clusters/")
+
+    body = {
+        'id': cluster_name,
+        'systemproperties': module.params['systemproperties']
+    }
+
+    if state == 'present':
+        changed, message = ensure_cluster_present(module, client, url, cluster_name, body)
+    elif state == 'absent':
+        changed, message = ensure_cluster_absent(module, client, url, cluster_name)
+
+    if module.params['return_inventory']:
+        # A listagem completa dos clusters so e feita quando pedida
+        client.exit_json(changed=changed, clusters=list_clusters(module, client, url), msg=message)
+    client.exit_json(changed=changed, msg=message)
 
 def main():
     module_args = dict(
         state=dict(type='str', default='present', choices=['present', 'absent']),
-        host=dict(type='str', required=True),
-        base_port=dict(type='int', required=True),
-        user=dict(type='str', required=True),
-        password=dict(type='str', required=True, no_log=True),
+        host=dict(type='str'),
+        base_port=dict(type='int'),
+        user=dict(type='str'),
+        password=dict(type='str', no_log=True),
         cluster_name=dict(type='str', required=True),
         validate_certs=dict(type='bool', default=False),
         protocol=dict(type='str', default='https', choices=['http', 'https']),
         type=dict(type='str', default='glassfish3'),
-        systemproperties=dict(type='str', default='')
+        systemproperties=dict(type='str', default=''),
+        return_inventory=dict(type='bool', default=False),
+        domain_facts=dict(type='dict')
     )
 
+    module_args.update(glassfish_argument_spec())
+    module_args.update(fanout_argument_spec())
+
     module = AnsibleModule(
         argument_spec=module_args,
         supports_check_mode=True
     )
 
-    state = module.params['state']
     host = module.params['host']
     base_port = module.params['base_port']
     user = module.params['user']
     password = module.params['password']
-    cluster_name = module.params['cluster_name']
     validate_certs = module.params['validate_certs']
     protocol = module.params['protocol']
-    type = module.params['type']
-    systemproperties = module.params['systemproperties']
-
-    url = f"{protocol}://{host}:{base_port}/management/domain/clusters/"
-    auth = HTTPBasicAuth(user, password)
-    headers = {
-        "Accept": "application/json",
-        "X-Requested-By": "GlassFish REST HTML interface"
-    }
 
-    body = {
-        'id': cluster_name,
-        'systemproperties': systemproperties
-    }
-
-    if state == 'present':
-        changed, cluster_names, message = ensure_cluster_present(module, url, auth, headers, cluster_name, body)
-    elif state == 'absent':
-        changed, cluster_names, message = ensure_cluster_absent(module, url, auth, headers, cluster_name)
+    if module.params['das_hosts'] is not None:
+        run_on_das_hosts(module, lambda client: reconcile(module, client), base_port, user, password, protocol,
+                         validate_certs)
 
-    module.exit_json(changed=changed, clusters=cluster_names, msg=message)
+    client = GlassfishClient(module, host, base_port, user, password, protocol, validate_certs)
+    reconcile(module, client)
 
 if __name__ == '__main__':
     main()
@@ -1,94 +1,265 @@
 #!/usr/bin/python
 
 from ansible.module_utils.basic import AnsibleModule
-import requests
-from requests.auth import HTTPBasicAuth
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, GlassfishRequestError, DEFAULT_MAX_WORKERS, DEFAULT_POOL_MAXSIZE, debug, run_concurrently
+from ansible.module_utils.gf_fanout import fanout_argument_spec, run_on_das_hosts
+from ansible.module_utils.gf_domain import delete_instance, find_instance, read_json_array, snapshot_instances
+from ansible.module_utils.gf_jobs import job_argument_spec, submit_detached, use_detached, wait_for_jobs
+from ansible.module_utils.gf_rolling import LIFECYCLE_STATES, list_instance_status, plan_batches, rolling_argument_spec, rolling_time, run_rolling
 
-def list_instances(module, url, auth, headers):
+def list_instances(module, client, url):
     try:
         # Realiza a requisicao GET para listar as instancias
-        response = requests.get(url, auth=auth, headers=headers, verify=False)
+        response = client.get(url)
         response.raise_for_status()
 
-        data = response.json()
+        # Logar a resposta completa para depuracao (montada so com debug ligado)
+        debug(module, lambda: f"Response from list instances: {response.text}")
 
-        # Logar a resposta completa para depuracao
-        module.debug(msg=f"Response from list instances: {data}")
-
-        # Retorna a lista de nomes das instancias
-        instances = data.get('extraProperties', {}).get('instanceList', [])
-        instance_names = [instance['name'] for instance in instances if 'name' in instance]
+        # Retorna a lista de nomes das instancias, lidos item a item do instanceList
+        instance_names = [instance['name'] for instance in read_json_array(response, 'instanceList') if 'name' in instance]
 
         return instance_names
 
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Failed to list instances. Error: {str(e)}")
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to list instances. Error: {str(e)}")
+
+# Usa o snapshot do gf_domain_facts quando informado, evitando o GET de descoberta
+def discover_instances(module, client, list_instances_url):
+    instances = snapshot_instances(module.params['domain_facts'], module.params['cluster_name'])
+    if instances is None:
+        return list_instances(module, client, list_instances_url)
+    return [instance['name'] for instance in instances]
+
+# Testa a existencia da instancia com um GET direto em servers/server/{name},
+# sem baixar o instanceList do cluster. O snapshot do gf_domain_facts, quando
+# informado, dispensa o GET.
+def instance_exists(module, client, cluster_name, instance_name):
+    instances = snapshot_instances(module.params['domain_facts'], cluster_name)
+    if instances is not None:
+        return instance_name in set(instance['name'] for instance in instances)
+
+    try:
+        entity = find_instance(client, instance_name, cluster_name)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to check instance. Error: {str(e)}")
 
-def ensure_instance_present(module, list_instances_url, create_instance_url, auth, headers, instance_name, body):
-    instance_names = list_instances(module, list_instances_url, auth, headers)
+    debug(module, lambda: f"Instance lookup for '{instance_name}': {entity}")
+    if entity is None:
+        return False
 
-    # Logando a lista de instancias para debug
-    module.debug(msg=f"Current instances: {instance_names}")
+    # O nome da instancia e unico no dominio: se ela pertence a outro cluster
+    # o create-instance falharia de qualquer forma
+    config_ref = entity.get('configRef')
+    if config_ref and config_ref != f"{cluster_name}-config":
+        client.fail_json(msg=f"Instance '{instance_name}' already exists outside cluster '{cluster_name}' (configRef: {config_ref}).")
+    return True
 
-    if instance_name in instance_names:
-        return False, instance_names, f"Instance '{instance_name}' já existe no cluster."
+def ensure_instance_present(module, client, cluster_name, create_instance_url, instance_name, body):
+    if instance_exists(module, client, cluster_name, instance_name):
+        return False, f"Instance '{instance_name}' já existe no cluster.", []
+
+    if use_detached(module):
+        # Envia o create-instance como job e acompanha o job no DAS
+        try:
+            job = submit_detached(client, create_instance_url, body, instance_name)
+        except GlassfishRequestError as e:
+            client.fail_json(msg=f"Failed to add instance. Error: {str(e)}")
+        if module.params['job_timeout'] <= 0:
+            return True, f"Instance '{instance_name}' submitted as job {job['id']}.", [job]
+        job = wait_for_jobs(client, [job], module.params['job_timeout'], 1, module.params['poll_interval'])[0]
+        if job['failed']:
+            client.fail_json(msg=f"Failed to add instance. Job {job['id']} ended with {job['state']}: {job['message']}",
+                             changed=True, jobs=[job])
+        return True, f"Instance '{instance_name}' foi adicionada ao cluster.", [job]
 
     # Se a instancia não existe, tentamos criar
-    response = requests.post(create_instance_url, json=body, auth=auth, headers=headers, verify=False)
+    try:
+        response = client.post(create_instance_url, json=body)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to add instance. Error: {str(e)}")
 
     # Logar a resposta de criacao
-    module.debug(msg=f"Response from create instance: {response.status_code} - {response.text}")
+    debug(module, lambda: f"Response from create instance: {response.status_code} - {response.text}")
 
     if response.status_code == 200:
-        # Atualiza a lista apos a adicao
-        instance_names = list_instances(module, list_instances_url, auth, headers)
-        return True, instance_names, f"Instance '{instance_name}' foi adicionada ao cluster."
+        return True, f"Instance '{instance_name}' foi adicionada ao cluster.", []
     else:
-        module.fail_json(msg=f"Failed to add instance. Status code: {response.status_code}, Response: {response.text}")
+        client.fail_json(msg=f"Failed to add instance. Status code: {response.status_code}, Response: {response.text}")
 
-def main():
-    module_args = dict(
-        state=dict(type='str', default='present', choices=['present', 'absent']),
-        host=dict(type='str', required=True),
-        admin_port=dict(type='int', required=True),
-        admin_user=dict(type='str', required=True),
-        admin_pass=dict(type='str', required=True, no_log=True),
-        cluster_name=dict(type='str', required=True),
-        instance_name=dict(type='str', required=True),
-        nodeagent=dict(type='str', required=True),
-        portbase=dict(type='int', required=True),
-        validate_certs=dict(type='bool', default=False),
-        protocol=dict(type='str', default='https', choices=['http', 'https']),
-        systemproperties=dict(type='str', default='')
-    )
+# Remove a instancia do cluster. Como no asadmin, o DAS recusa remover uma
+# instancia em execucao: ela deve ser parada antes (state: stopped).
+def ensure_instance_absent(module, client, cluster_name, instance_name):
+    if not instance_exists(module, client, cluster_name, instance_name):
+        return False, f"Instance '{instance_name}' não existe no cluster.", []
 
-    module = AnsibleModule(
-        argument_spec=module_args,
-        supports_check_mode=True
-    )
+    try:
+        delete_instance(client, instance_name)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to delete instance. Error: {str(e)}")
+    return True, f"Instance '{instance_name}' foi removida do cluster.", []
+
+# Cria uma instancia sem chamar fail_json, para poder rodar dentro do pool de threads
+def create_instance(client, create_instance_url, body):
+    response = client.post(create_instance_url, json=body)
+    if response.status_code != 200:
+        raise GlassfishRequestError(f"Status code: {response.status_code}, Response: {response.text}")
+
+def ensure_instances_present(module, client, list_instances_url, create_instance_url, cluster_name, instances, max_workers):
+    # Nomes repetidos disparariam dois create-instance concorrentes da mesma instancia
+    names = [instance['name'] for instance in instances]
+    duplicated = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicated:
+        client.fail_json(msg=f"Instances listed more than once in instances: {', '.join(duplicated)}")
+
+    # Uma unica listagem para descobrir quais instancias ainda faltam
+    instance_names = discover_instances(module, client, list_instances_url)
+    debug(module, lambda: f"Current instances: {instance_names}")
+
+    existing = set(instance_names)
+    missing = [instance for instance in instances if instance['name'] not in existing]
+
+    results = []
+    for instance in instances:
+        if instance['name'] in existing:
+            results.append(dict(name=instance['name'], changed=False, failed=False,
+                                msg=f"Instance '{instance['name']}' já existe no cluster."))
+
+    def create(instance):
+        body = {
+            'id': instance['name'],
+            'cluster': cluster_name,
+            'nodeagent': instance['nodeagent'],
+            'portbase': instance['portbase'],
+            'systemproperties': instance['systemproperties']
+        }
+        if use_detached(module):
+            return submit_detached(client, create_instance_url, body, instance['name'])
+        create_instance(client, create_instance_url, body)
+
+    jobs = []
+    for instance, job, error in run_concurrently(create, missing, max_workers):
+        if error is not None:
+            results.append(dict(name=instance['name'], changed=False, failed=True,
+                                msg=f"Failed to add instance '{instance['name']}'. Error: {str(error)}"))
+        elif job is not None:
+            jobs.append(job)
+        else:
+            results.append(dict(name=instance['name'], changed=True, failed=False,
+                                msg=f"Instance '{instance['name']}' foi adicionada ao cluster."))
+
+    # Jobs detached: todos os jobs pendentes sao consultados juntos
+    if jobs and module.params['job_timeout'] > 0:
+        jobs = wait_for_jobs(client, jobs, module.params['job_timeout'], max_workers, module.params['poll_interval'])
+    for job in jobs:
+        if job.get('failed'):
+            results.append(dict(name=job['name'], changed=True, failed=True, job=job,
+                                msg=f"Failed to add instance '{job['name']}'. Job {job['id']} ended with {job['state']}: {job['message']}"))
+        elif 'state' in job:
+            results.append(dict(name=job['name'], changed=True, failed=False, job=job,
+                                msg=f"Instance '{job['name']}' foi adicionada ao cluster."))
+        else:
+            results.append(dict(name=job['name'], changed=True, failed=False, job=job,
+                                msg=f"Instance '{job['name']}' submitted as job {job['id']}."))
+
+    changed = any(result['changed'] for result in results)
+    if changed and module.params['return_inventory']:
+        # Listagem final com o estado do cluster, apenas quando pedida
+        instance_names = list_instances(module, client, list_instances_url)
+
+    return changed, instance_names, results
+
+# started/stopped/restarted: aplica o estado a todas as instancias do cluster
+# em lotes, com health gate entre os lotes (gf_rolling)
+def ensure_instances_lifecycle(module, client, cluster_name, state, max_workers):
+    try:
+        statuses = list_instance_status(client, cluster_name)
+        batches = plan_batches(state, statuses, module.params['batch_size'], module.params['batch_percent'],
+                               module.params['min_available'])
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Failed to plan the rolling {state}. Error: {str(e)}")
+
+    debug(module, lambda: f"Rolling {state} batches: {batches}")
+    planned = [[name for name, _ in batch] for batch in batches]
+
+    if not batches:
+        client.exit_json(changed=False, batches=[], results=[], msg=f"All instances of cluster '{cluster_name}' already {state}.")
+
+    # O rolling inteiro precisa caber no deadline: sem deadline explicito o
+    # prazo e estendido; com ele, a task falha antes do primeiro lote em vez de
+    # parar no meio com o cluster parcialmente reiniciado
+    needed = rolling_time(batches, module.params['health_timeout'], module.params['detached'], module.params['job_timeout'])
+    if not client.reserve_time(needed):
+        client.fail_json(msg=f"Rolling {state} may take up to {needed}s ({len(batches)} batches), more than the "
+                             f"{max(0, client.remaining_time()):.0f}s left of deadline; raise deadline, batch_size or "
+                             f"batch_percent, or lower health_timeout.", batches=planned)
+
+    if module.check_mode:
+        results = [dict(name=name, command=command, batch=index, changed=True, failed=False, status='planned',
+                        msg=f"{command} planned.")
+                   for index, batch in enumerate(batches) for name, command in batch]
+        client.exit_json(changed=True, batches=planned, results=results,
+                         msg=f"{len(results)} instances to be {state} in {len(batches)} batches.")
+
+    try:
+        results, halted = run_rolling(client, cluster_name, state, batches, statuses, max_workers,
+                                      module.params['max_failures'], module.params['min_available'],
+                                      module.params['health_timeout'], module.params['detached'],
+                                      module.params['job_timeout'], module.params['poll_interval'])
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Rolling {state} failed. Error: {str(e)}", changed=True)
 
+    failed = [result['name'] for result in results if result['failed']]
+    result = dict(changed=any(result['changed'] for result in results), batches=planned, results=results,
+                  failed_instances=failed)
+    if halted:
+        client.fail_json(msg=f"Rolling {state} halted after {len(failed)} failures (max_failures={module.params['max_failures']}).",
+                         **result)
+    client.exit_json(msg=f"{len(results) - len(failed)} of {len(results)} instances {state}.", **result)
+
+# Aplica o estado pedido as instancias do cluster no DAS do client e encerra a task
+def reconcile(module, client):
     state = module.params['state']
-    host = module.params['host']
-    admin_port = module.params['admin_port']
-    admin_user = module.params['admin_user']
-    admin_pass = module.params['admin_pass']
     cluster_name = module.params['cluster_name']
     instance_name = module.params['instance_name']
     nodeagent = module.params['nodeagent']
     portbase = module.params['portbase']
-    validate_certs = module.params['validate_certs']
-    protocol = module.params['protocol']
     systemproperties = module.params['systemproperties']
+    instances = module.params['instances']
+    max_workers = module.params['max_workers']
+    return_inventory = module.params['return_inventory']
+
+    # nodeagent e portbase so sao usados na criacao
+    if state == 'present' and instance_name is not None and (nodeagent is None or portbase is None):
+        client.fail_json(msg="instance_name with state=present requires 'nodeagent' and 'portbase'.")
+
+    # O estado das instancias em execucao nao aparece na versao da configuracao
+    # e os lotes do rolling dependem dele: sem noop_probe e sem plano. Com
+    # return_inventory o inventario e lido a cada execucao, tambem sem noop_probe
+    client.begin(noop_probe=state not in LIFECYCLE_STATES and not return_inventory, plan=state not in LIFECYCLE_STATES)
 
     # URL para listar as instancias
-    list_instances_url = f"{protocol}://{host}:{admin_port}/management/domain/clusters/cluster/{cluster_name}/list-instances"
+    list_instances_url = client.url(f"clusters/cluster/{cluster_name}/list-instances")
     # URL para adicionar a instancia
-    create_instance_url = f"{protocol}://{host}:{admin_port}/management/domain/create-instance"
-    auth = HTTPBasicAuth(admin_user, admin_pass)
-    headers = {
-        "Accept": "application/json",
-        "X-Requested-By": "GlassFish REST HTML interface"
-    }
+    create_instance_url = client.url("create-instance")
+
+    if state in LIFECYCLE_STATES:
+        if instance_name is not None or instances is not None:
+            client.fail_json(msg=f"state={state} applies to the whole cluster; do not set 'instance_name' or 'instances'.")
+        ensure_instances_lifecycle(module, client, cluster_name, state, max_workers)
+
+    if instances is not None:
+        if state != 'present':
+            client.fail_json(msg="The 'instances' list only supports state=present.")
+        changed, instance_names, results = ensure_instances_present(module, client, list_instances_url, create_instance_url,
+                                                                    cluster_name, instances, max_workers)
+        failed = [result['name'] for result in results if result['failed']]
+        result = dict(changed=changed, results=results)
+        if return_inventory:
+            result['instances'] = instance_names
+        if failed:
+            client.fail_json(msg=f"Failed to add instances: {', '.join(failed)}", **result)
+        client.exit_json(msg=f"{len(results) - len(failed)} of {len(results)} instances present in cluster.", **result)
 
     body = {
         'id': instance_name,
@@ -99,9 +270,73 @@ def main():
     }
 
     if state == 'present':
-        changed, instance_names, message = ensure_instance_present(module, list_instances_url, create_instance_url, auth, headers, instance_name, body)
+        changed, message, jobs = ensure_instance_present(module, client, cluster_name, create_instance_url, instance_name, body)
+    else:
+        changed, message, jobs = ensure_instance_absent(module, client, cluster_name, instance_name)
+
+    result = dict(changed=changed, msg=message)
+    if jobs:
+        result['jobs'] = jobs
+    if return_inventory:
+        # A listagem completa do cluster so e feita quando pedida
+        result['instances'] = list_instances(module, client, list_instances_url)
+    client.exit_json(**result)
+
+def main():
+    module_args = dict(
+        state=dict(type='str', default='present', choices=['present', 'absent'] + list(LIFECYCLE_STATES)),
+        host=dict(type='str'),
+        admin_port=dict(type='int'),
+        admin_user=dict(type='str'),
+        admin_pass=dict(type='str', no_log=True),
+        cluster_name=dict(type='str', required=True),
+        instance_name=dict(type='str'),
+        nodeagent=dict(type='str'),
+        portbase=dict(type='int'),
+        instances=dict(type='list', elements='dict', options=dict(
+            name=dict(type='str', required=True),
+            nodeagent=dict(type='str', required=True),
+            portbase=dict(type='int', required=True),
+            systemproperties=dict(type='str', default='')
+        )),
+        max_workers=dict(type='int', default=DEFAULT_MAX_WORKERS),
+        validate_certs=dict(type='bool', default=False),
+        protocol=dict(type='str', default='https', choices=['http', 'https']),
+        systemproperties=dict(type='str', default=''),
+        return_inventory=dict(type='bool', default=False),
+        domain_facts=dict(type='dict')
+    )
+
+    module_args.update(glassfish_argument_spec())
+    module_args.update(fanout_argument_spec())
+    module_args.update(job_argument_spec())
+    module_args.update(rolling_argument_spec())
+
+    module = AnsibleModule(
+        argument_spec=module_args,
+        mutually_exclusive=[('instance_name', 'instances'), ('batch_size', 'batch_percent')],
+        required_if=[
+            ('state', 'present', ('instance_name', 'instances'), True),
+            ('state', 'absent', ('instance_name', 'instances'), True)
+        ],
+        supports_check_mode=True
+    )
+
+    host = module.params['host']
+    admin_port = module.params['admin_port']
+    admin_user = module.params['admin_user']
+    admin_pass = module.params['admin_pass']
+    validate_certs = module.params['validate_certs']
+    protocol = module.params['protocol']
+    max_workers = module.params['max_workers']
+
+    if module.params['das_hosts'] is not None:
+        run_on_das_hosts(module, lambda client: reconcile(module, client), admin_port, admin_user, admin_pass, protocol,
+                         validate_certs, pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
 
-    module.exit_json(changed=changed, instances=instance_names, msg=message)
+    client = GlassfishClient(module, host, admin_port, admin_user, admin_pass, protocol, validate_certs,
+                             pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+    reconcile(module, client)
 
 if __name__ == '__main__':
     main()
@@ -1,44 +1,276 @@
 #!/usr/bin/python
 
-import requests
-from requests.auth import HTTPBasicAuth
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.gf_rest import GlassfishClient, glassfish_argument_spec, GlassfishHTTPError, GlassfishRequestError, DEFAULT_MAX_WORKERS, DEFAULT_POOL_MAXSIZE, debug, run_concurrently
+from ansible.module_utils.gf_fanout import fanout_argument_spec, run_on_das_hosts
+from ansible.module_utils import gf_domain
+from ansible.module_utils.gf_domain import diff_node, ping_node_ssh, read_node_ssh, read_nodes, snapshot_node_names, snapshot_nodes
+from ansible.module_utils.gf_jobs import job_argument_spec, submit_detached, use_detached, wait_for_jobs
+
+def node_body(name, node_host, node_path, node_sshuser_name, node_path_keyssh, node_port_ssh):
+    return {
+        "id": name,
+        "nodedir": node_path,
+        "nodehost": node_host,
+        "sshport": str(node_port_ssh),
+        "sshuser": node_sshuser_name,
+        "sshkeyfile": node_path_keyssh
+    }
 
 # Funcao para criar o node
-def create_node(module, url, auth, headers, body):
+def create_node(module, client, url, body):
     try:
-        module.debug(f"POST URL: {url}")
-        module.debug(f"POST body: {body}")
-        response = requests.post(url, json=body, auth=auth, headers=headers, verify=module.params['validate_certs'])
-        module.debug(f"POST response status: {response.status_code}")
-        module.debug(f"POST response body: {response.text}")
+        debug(module, lambda: f"POST URL: {url}")
+        debug(module, lambda: f"POST body: {body}")
+        response = client.post(url, json=body)
+        debug(module, lambda: f"POST response status: {response.status_code}")
+        debug(module, lambda: f"POST response body: {response.text}")
         response.raise_for_status()
         return True, "Node created successfully."
-    except requests.HTTPError as e:
-        module.fail_json(msg=f"Failed to create node. Status code: {response.status_code}, Response: {response.text}")
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Request failed for node creation. Error: {str(e)}")
+    except GlassfishHTTPError as e:
+        client.fail_json(msg=f"Failed to create node. Status code: {response.status_code}, Response: {response.text}")
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Request failed for node creation. Error: {str(e)}")
+
+# Cria o node e encerra o modulo. Em modo detached o create-node-ssh vira um
+# job no DAS, acompanhado ate terminar ou ate job_timeout
+def create_node_and_exit(module, client, url, body):
+    if not use_detached(module):
+        changed, msg = create_node(module, client, url, body)
+        client.exit_json(changed=changed, msg=msg, request_body=body)
+
+    try:
+        job = submit_detached(client, url, body, body['id'])
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Request failed for node creation. Error: {str(e)}")
+    if module.params['job_timeout'] <= 0:
+        client.exit_json(changed=True, msg=f"Node creation submitted as job {job['id']}.", request_body=body, job=job)
+
+    job = wait_for_jobs(client, [job], module.params['job_timeout'], 1, module.params['poll_interval'])[0]
+    if job['failed']:
+        client.fail_json(msg=f"Failed to create node. Job {job['id']} ended with {job['state']}: {job['message']}",
+                         changed=True, request_body=body, job=job)
+    client.exit_json(changed=True, msg="Node created successfully.", request_body=body, job=job)
+
+# Atualiza ou remove o node e encerra o modulo
+def update_node_and_exit(module, client, name, existing_node, body):
+    update_body = diff_node(existing_node, body)
+    if not update_body:
+        client.exit_json(changed=False, msg=f"Node {name} already exists.")
+    try:
+        gf_domain.update_node_ssh(client, name, update_body)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=str(e))
+    client.exit_json(changed=True, msg="Node updated successfully.", update_body=update_body)
+
+def delete_node_and_exit(module, client, name):
+    try:
+        gf_domain.delete_node_ssh(client, name)
+    except GlassfishRequestError as e:
+        client.fail_json(msg=str(e))
+    client.exit_json(changed=True, msg="Node deleted successfully.")
+
+# Reconcilia a lista nodes contra uma unica leitura da colecao (filhos
+# expandidos). Criacoes, atualizacoes (so com os atributos que mudaram) e
+# remocoes saem em paralelo; com ping, o DAS testa a conexao SSH de cada node
+# presente, tambem em paralelo.
+def ensure_nodes(module, client, nodes, max_workers):
+    # Cada node recebe uma unica operacao: nomes repetidos disparariam
+    # criacoes/atualizacoes/remocoes concorrentes do mesmo node
+    names = [node['name'] for node in nodes]
+    duplicated = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicated:
+        client.fail_json(msg=f"Nodes listed more than once in nodes: {', '.join(duplicated)}")
+
+    existing_nodes = snapshot_nodes(module.params['domain_facts'])
+    if existing_nodes is None:
+        try:
+            existing_nodes = read_nodes(client, [node['name'] for node in nodes if node['state'] == 'present'], max_workers)
+        except GlassfishRequestError as e:
+            client.fail_json(msg=f"Request failed for node listing. Error: {str(e)}")
+    debug(module, lambda: f"Current nodes: {existing_nodes}")
+
+    results = {}
+    actions = []
+    for node in nodes:
+        name = node['name']
+        if node['state'] == 'absent':
+            if name in existing_nodes:
+                actions.append((node, 'delete', None))
+            else:
+                results[name] = dict(name=name, changed=False, failed=False, msg=f"Node {name} does not exist, nothing to delete.")
+            continue
+        body = node_body(name, node['node_host'], node['node_path'], node['node_sshuser_name'],
+                         node['node_path_keyssh'], node['node_port_ssh'])
+        if name in existing_nodes:
+            update_body = diff_node(existing_nodes[name] or {}, body)
+            if update_body:
+                actions.append((node, 'update', update_body))
+            else:
+                results[name] = dict(name=name, changed=False, failed=False, msg=f"Node {name} already exists.")
+        else:
+            actions.append((node, 'create', body))
+
+    def apply(action):
+        node, kind, body = action
+        if kind == 'delete':
+            gf_domain.delete_node_ssh(client, node['name'])
+            return "Node deleted successfully."
+        if kind == 'update':
+            gf_domain.update_node_ssh(client, node['name'], body)
+            return "Node updated successfully."
+        if use_detached(module):
+            return submit_detached(client, client.url("nodes/create-node-ssh"), body, node['name'])
+        gf_domain.create_node_ssh(client, body)
+        return "Node created successfully."
+
+    jobs = []
+    for (node, kind, body), outcome, error in run_concurrently(apply, actions, max_workers):
+        result = dict(name=node['name'], changed=error is None, failed=error is not None,
+                      msg=str(error) if error is not None else outcome)
+        if kind == 'update':
+            result['update_body'] = body
+        if isinstance(outcome, dict):
+            jobs.append(outcome)
+            result.update(job=outcome, msg=f"Node creation submitted as job {outcome['id']}.")
+        results[node['name']] = result
+
+    # Jobs detached: todos os jobs pendentes sao consultados juntos
+    if jobs and module.params['job_timeout'] > 0:
+        for job in wait_for_jobs(client, jobs, module.params['job_timeout'], max_workers, module.params['poll_interval']):
+            result = results[job['name']]
+            result['job'] = job
+            if job['failed']:
+                result.update(failed=True, msg=f"Failed to create node. Job {job['id']} ended with {job['state']}: {job['message']}")
+            else:
+                result['msg'] = "Node created successfully."
+
+    if module.params['ping']:
+        # Nodes com job ainda pendente (job_timeout: 0) ficam de fora. Em check
+        # mode, nodes criados ou alterados so no plano nao sao testados: o DAS
+        # ainda nao os conhece (ou conhece os atributos antigos).
+        planned = set(node['name'] for node, _, _ in actions) if client.planning else set()
+        for name in planned:
+            if name in results and not results[name]['failed']:
+                results[name]['ping'] = dict(ok=None, checked=False, msg="Not checked: the node change is only planned (check mode).")
+        to_ping = [node['name'] for node in nodes if node['state'] == 'present' and not results[node['name']]['failed']
+                   and node['name'] not in planned
+                   and results[node['name']].get('job', {}).get('state', 'COMPLETED') == 'COMPLETED']
+        for name, message, error in run_concurrently(lambda name: ping_node_ssh(client, name), to_ping, max_workers):
+            if error is not None:
+                results[name].update(failed=True, msg=f"{results[name]['msg']} {str(error)}", ping=dict(ok=False, msg=str(error)))
+            else:
+                results[name]['ping'] = dict(ok=True, msg=message)
+
+    # Resultados na mesma ordem da lista nodes
+    return [results[node['name']] for node in nodes]
+
+# Reconcilia os nodes no DAS do client e encerra a task
+def reconcile(module, client):
+    node_name = module.params['node_name']
+    node_sshuser_name = module.params['node_sshuser_name']
+    node_path = module.params['node_path']
+    node_path_keyssh = module.params['node_path_keyssh']
+    node_host = module.params['node_host']
+    node_port_ssh = module.params['node_port_ssh']
+    state = module.params['state']
+    nodes = module.params['nodes']
+    max_workers = module.params['max_workers']
+
+    # O teste de SSH verifica os hosts a cada execucao
+    client.begin(noop_probe=not module.params['ping'])
+
+    if nodes is not None:
+        results = ensure_nodes(module, client, nodes, max_workers)
+        failed = [result['name'] for result in results if result['failed']]
+        result = dict(changed=any(result['changed'] for result in results), results=results)
+        if failed:
+            client.fail_json(msg=f"Failed to manage nodes: {', '.join(failed)}", **result)
+        client.exit_json(msg=f"{len(results)} nodes managed, {sum(1 for r in results if r['changed'])} changed.", **result)
+
+    # URL para verificar se o node existe
+    node_url = client.url(f"nodes/node/{node_name}")
+    create_node_url = client.url("nodes/create-node-ssh")
+    debug(module, lambda: f"Node URL: {node_url}")
+    debug(module, lambda: f"Node URL Create: {create_node_url}")
+
+    body = node_body(node_name, node_host, node_path, node_sshuser_name, node_path_keyssh, node_port_ssh)
+
+    # Usa o snapshot do gf_domain_facts quando informado, evitando o GET de descoberta
+    node_names = snapshot_node_names(module.params['domain_facts'])
+    if node_names is not None:
+        if node_name in node_names:
+            if state == 'absent':
+                delete_node_and_exit(module, client, node_name)
+            update_node_and_exit(module, client, node_name, snapshot_nodes(module.params['domain_facts'])[node_name], body)
+        if state == 'absent':
+            client.exit_json(changed=False, msg=f"Node {node_name} does not exist, nothing to delete.")
+        create_node_and_exit(module, client, create_node_url, body)
+
+    # Verifica se o node existe
+    try:
+        response = client.get(node_url)
+        debug(module, lambda: f"GET response status: {response.status_code}")
+        debug(module, lambda: f"GET response body: {response.text}")
+
+        if response.status_code == 200:
+            # Se o node existir, remove ou atualiza apenas os atributos que mudaram
+            if state == 'absent':
+                delete_node_and_exit(module, client, node_name)
+            existing_node = response.json().get('extraProperties', {}).get('entity', {})
+            existing_node = dict(existing_node, **read_node_ssh(client, node_name))
+            update_node_and_exit(module, client, node_name, existing_node, body)
+        elif response.status_code == 404:
+            if state == 'absent':
+                client.exit_json(changed=False, msg=f"Node {node_name} does not exist, nothing to delete.")
+            # Se o node nao existir, criar node
+            create_node_and_exit(module, client, create_node_url, body)
+        else:
+            client.fail_json(msg=f"Unexpected response code: {response.status_code}, Response: {response.text}")
+
+    except GlassfishHTTPError as e:
+        client.fail_json(msg=f"Failed to check if node exists. Status code: {response.status_code}, Response: {response.text}")
+    except GlassfishRequestError as e:
+        client.fail_json(msg=f"Request failed for node check. Error: {str(e)}")
 
 # Funcao principal
 def main():
     module_args = dict(
-        host=dict(type='str', required=True),
-        admin_user=dict(type='str', required=True),
-        admin_pass=dict(type='str', required=True, no_log=True),
-        admin_port=dict(type='int', required=True),
+        host=dict(type='str'),
+        admin_user=dict(type='str'),
+        admin_pass=dict(type='str', no_log=True),
+        admin_port=dict(type='int'),
         protocol=dict(type='str', default='https', choices=['http', 'https']),
-        node_name=dict(type='str', required=True),
-        node_sshuser_name=dict(type='str', required=True),
-        node_path=dict(type='str', required=True),
-        node_path_keyssh=dict(type='str', required=True),
-        node_host=dict(type='str', required=True),
+        node_name=dict(type='str'),
+        node_sshuser_name=dict(type='str'),
+        node_path=dict(type='str'),
+        node_path_keyssh=dict(type='str'),
+        node_host=dict(type='str'),
         node_port_ssh=dict(type='int', default=22),
+        nodes=dict(type='list', elements='dict', options=dict(
+            name=dict(type='str', required=True),
+            node_sshuser_name=dict(type='str'),
+            node_path=dict(type='str'),
+            node_path_keyssh=dict(type='str', no_log=False),
+            node_host=dict(type='str'),
+            node_port_ssh=dict(type='int', default=22),
+            state=dict(type='str', default='present', choices=['present', 'absent'])
+        ), required_if=[('state', 'present', ('node_sshuser_name', 'node_path', 'node_path_keyssh', 'node_host'))]),
+        max_workers=dict(type='int', default=DEFAULT_MAX_WORKERS),
+        ping=dict(type='bool', default=False),
         validate_certs=dict(type='bool', default=False),
         state=dict(type='str', default='present', choices=['present', 'absent']),
+        domain_facts=dict(type='dict'),
     )
 
+    module_args.update(glassfish_argument_spec())
+    module_args.update(fanout_argument_spec())
+    module_args.update(job_argument_spec())
+
     module = AnsibleModule(
         argument_spec=module_args,
+        mutually_exclusive=[('node_name', 'nodes')],
+        required_one_of=[('node_name', 'nodes')],
         supports_check_mode=True
     )
 
@@ -49,54 +281,22 @@ def main():
     admin_port = module.params['admin_port']
     protocol = module.params['protocol']
     node_name = module.params['node_name']
-    node_sshuser_name = module.params['node_sshuser_name']
-    node_path = module.params['node_path']
-    node_path_keyssh = module.params['node_path_keyssh']
-    node_host = module.params['node_host']
-    node_port_ssh = module.params['node_port_ssh']
     validate_certs = module.params['validate_certs']
     state = module.params['state']
+    max_workers = module.params['max_workers']
 
-    auth = HTTPBasicAuth(admin_user, admin_pass)
-    headers = {
-        "Accept": "application/json",
-        "X-Requested-By": "GlassFish REST HTML interface"
-    }
-
-    # URL para verificar se o node existe
-    node_url = f"{protocol}://{host}:{admin_port}/management/domain/nodes/node/{node_name}"
-    create_node_url = f"{protocol}://{host}:{admin_port}/management/domain/nodes/create-node-ssh"
-    module.debug(f"Node URL: {node_url}")
-    module.debug(f"Node URL Create: {create_node_url}")
-
-    # Verifica se o node existe
-    try:
-        response = requests.get(node_url, auth=auth, headers=headers, verify=validate_certs)
-        module.debug(f"GET response status: {response.status_code}")
-        module.debug(f"GET response body: {response.text}")
+    if node_name is not None and state == 'present':
+        missing = [name for name in ('node_sshuser_name', 'node_path', 'node_path_keyssh', 'node_host') if module.params[name] is None]
+        if missing:
+            module.fail_json(msg=f"state is present but the following are missing: {', '.join(missing)}")
 
-        if response.status_code == 200:
-            # Se o node existir, nao faz nada
-            module.exit_json(changed=False, msg=f"Node {node_name} already exists.")
-        elif response.status_code == 404:
-            # Se o node nao existir, criar node
-            body = {
-                "id": node_name,
-                "nodedir": node_path,
-                "nodehost": node_host,
-                "sshport": str(node_port_ssh),
-                "sshuser": node_sshuser_name,
-                "sshkeyfile": node_path_keyssh
-            }
-            changed, msg = create_node(module, create_node_url, auth, headers, body)
-            module.exit_json(changed=changed, msg=msg, request_body=body)
-        else:
-            module.fail_json(msg=f"Unexpected response code: {response.status_code}, Response: {response.text}")
+    if module.params['das_hosts'] is not None:
+        run_on_das_hosts(module, lambda client: reconcile(module, client), admin_port, admin_user, admin_pass, protocol,
+                         validate_certs, pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
 
-    except requests.HTTPError as e:
-        module.fail_json(msg=f"Failed to check if node exists. Status code: {response.status_code}, Response: {response.text}")
-    except requests.RequestException as e:
-        module.fail_json(msg=f"Request failed for node check. Error: {str(e)}")
+    client = GlassfishClient(module, host, admin_port, admin_user, admin_pass, protocol, validate_certs,
+                             pool_maxsize=max(DEFAULT_POOL_MAXSIZE, max_workers))
+    reconcile(module, client)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
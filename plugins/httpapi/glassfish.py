@@ -0,0 +1,106 @@
+# Plugin httpapi para a API REST de administracao do DAS do GlassFish/Payara.
+#
+# Com connection: httpapi e ansible_network_os: glassfish o Ansible mantem um
+# processo de conexao persistente por DAS, com uma conexao keep-alive ja
+# autenticada que atende todas as tasks da play. Os modulos gf_* chamam
+# send_request por RPC (ver module_utils/gf_httpapi.py).
+#
+# A autenticacao e feita uma vez por play em /management/sessions; o token
+# (cookie gfresttoken) segue nas demais requisicoes, um 401 dispara um novo
+# login e o token e descartado no DAS quando a conexao e encerrada.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    name: glassfish
+    short_description: HttpApi plugin for the GlassFish/Payara DAS REST API
+    description:
+      - Keeps one authenticated keep-alive connection to the DAS (/management/domain)
+        open for the whole play and lets the gf_* modules send their REST calls through it.
+      - Uses ansible_host, ansible_httpapi_port, ansible_user, ansible_httpapi_password,
+        ansible_httpapi_use_ssl and ansible_httpapi_validate_certs from the httpapi connection.
+    requirements:
+      - ansible.netcommon collection
+'''
+
+import base64
+import json
+
+from ansible.module_utils.common.text.converters import to_bytes, to_text
+from ansible_collections.ansible.netcommon.plugins.plugin_utils.httpapi_base import HttpApiBase
+
+SESSIONS_PATH = '/management/sessions'
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "X-Requested-By": "GlassFish REST HTML interface"
+}
+
+
+class HttpApi(HttpApiBase):
+    def __init__(self, connection):
+        super(HttpApi, self).__init__(connection)
+        self.token = None
+        self.relogin_attempted = False
+
+    def login(self, username, password):
+        if not (username and password):
+            return
+        credentials = base64.b64encode(to_bytes(f"{username}:{password}")).decode('ascii')
+        basic_auth = {'Authorization': f"Basic {credentials}"}
+
+        # Sem token (DAS sem o recurso de sessoes, por exemplo) a conexao segue
+        # enviando o Basic auth em toda requisicao
+        self.token = None
+        self.connection._auth = None
+        headers = dict(DEFAULT_HEADERS, **basic_auth)
+        headers['Content-Type'] = 'application/json'
+        response, response_data = self.connection.send(SESSIONS_PATH, '{}', method='POST', headers=headers)
+        if response.getcode() == 200:
+            try:
+                data = json.loads(to_text(response_data.getvalue()))
+                self.token = data.get('extraProperties', {}).get('token')
+            except ValueError:
+                self.token = None
+
+        if self.token:
+            self.connection._auth = {'Cookie': f"gfresttoken={self.token}"}
+        else:
+            self.connection._auth = basic_auth
+
+    def logout(self):
+        if not self.token:
+            return
+        token = self.token
+        self.token = None
+        self.connection.send(f"{SESSIONS_PATH}/{token}", None, method='DELETE', headers=dict(DEFAULT_HEADERS))
+        self.connection._auth = None
+
+    def handle_httperror(self, exc):
+        # Token vencido no DAS: um novo login e a requisicao e repetida uma vez
+        if exc.code == 401 and self.token and not self.relogin_attempted:
+            self.relogin_attempted = True
+            self.login(self.connection.get_option('remote_user'), self.connection.get_option('password'))
+            return True
+        # Os demais status de erro (404 de recurso inexistente, 4xx/5xx de
+        # comandos) voltam ao modulo como respostas normais
+        return exc
+
+    def send_request(self, method, path, data=None, headers=None, timeout=None):
+        request_headers = dict(DEFAULT_HEADERS)
+        if data is not None:
+            request_headers['Content-Type'] = 'application/json'
+        request_headers.update(headers or {})
+
+        kwargs = dict(method=method, headers=request_headers)
+        if timeout:
+            kwargs['timeout'] = timeout
+        self.relogin_attempted = False
+        response, response_data = self.connection.send(path, data, **kwargs)
+
+        return dict(
+            status=response.getcode(),
+            headers=dict(response.headers.items()),
+            body=to_text(response_data.getvalue(), errors='surrogate_or_strict')
+        )
@@ -0,0 +1,191 @@
+# Cache em disco das respostas de GET da API REST do DAS.
+#
+# Cada entrada e um arquivo JSON com a URL, o usuario que fez a leitura, os
+# validadores (ETag e Last-Modified) e o corpo da resposta. Usuarios diferentes
+# nao compartilham entradas: o DAS pode responder a cada um de um jeito. Dentro do TTL a entrada e usada sem
+# ir ao DAS; depois dele a leitura vira um GET condicional e um 304 reaproveita
+# o corpo guardado. O arquivo menos usado recentemente (mtime) e removido
+# quando o numero de entradas passa de max_entries.
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_CACHE_TTL = 60
+DEFAULT_CACHE_MAX_ENTRIES = 256
+
+
+class ResponseCache(object):
+    def __init__(self, cache_dir, ttl=DEFAULT_CACHE_TTL, max_entries=DEFAULT_CACHE_MAX_ENTRIES, user=None):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.user = user or ''
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def _path(self, url):
+        key = f"{self.user} {url}"
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def lookup(self, url):
+        path = self._path(url)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('url') != url or entry.get('user') != self.user:
+            return None
+        # Marca a entrada como usada recentemente para o LRU
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry.get('stored_at', 0) < self.ttl
+
+    def store(self, url, etag, last_modified, content):
+        entry = dict(
+            url=url,
+            user=self.user,
+            etag=etag,
+            last_modified=last_modified,
+            stored_at=time.time(),
+            body=content.decode('utf-8', errors='replace')
+        )
+        # Grava num arquivo temporario e renomeia, para que outra task lendo o
+        # cache ao mesmo tempo nunca veja um arquivo pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(url))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+        self.evict()
+
+    def refresh(self, url, entry):
+        self.store(url, entry.get('etag'), entry.get('last_modified'), entry['body'].encode('utf-8'))
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return []
+        return [os.path.join(self.cache_dir, name) for name in names if name.endswith('.json')]
+
+    # Remove todas as entradas cuja URL comeca com o prefixo informado
+    def invalidate(self, prefix):
+        for path in self._entries():
+            try:
+                with open(path) as f:
+                    url = json.load(f).get('url', '')
+            except (OSError, ValueError):
+                url = ''
+            if not url or url.startswith(prefix):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def evict(self):
+        paths = self._entries()
+        if len(paths) <= self.max_entries:
+            return
+        by_mtime = []
+        for path in paths:
+            try:
+                by_mtime.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        by_mtime.sort()
+        for mtime, path in by_mtime[:len(by_mtime) - self.max_entries]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+# Tokens de sessao REST guardados no controller, um arquivo por DAS e usuario
+# dentro de <cache_dir>/sessions, legivel apenas pelo dono. Cada entrada vale
+# ate expires_at; depois disso o cliente faz um novo login.
+class SessionTokenCache(object):
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.join(os.path.expanduser(cache_dir), 'sessions')
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def lookup(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key or entry.get('expires_at', 0) <= time.time():
+            return None
+        return entry.get('token')
+
+    def store(self, key, token, ttl):
+        entry = dict(key=key, token=token, expires_at=time.time() + ttl)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def discard(self, key):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+
+# Versao da configuracao do DAS registrada apos a ultima execucao bem-sucedida
+# de cada entrada desejada (impressao digital dos parametros da task), em
+# <cache_dir>/fingerprints. Se a versao atual do DAS for a mesma registrada,
+# a task ja convergiu e nao ha o que mudar.
+class FingerprintStore(object):
+    def __init__(self, cache_dir):
+        self.cache_dir = os.path.join(os.path.expanduser(cache_dir), 'fingerprints')
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def lookup(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        return entry.get('version')
+
+    def store(self, key, version):
+        entry = dict(key=key, version=version, stored_at=time.time())
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,529 @@
+# Leituras e escritas de recursos do dominio (nodes, clusters, instancias,
+# system properties e hosts JMS) compartilhadas entre os modulos gf_*.
+#
+# As funcoes deste arquivo nunca chamam module.fail_json: erros sao lancados
+# como GlassfishRequestError, o que permite executa-las dentro de pools de
+# threads e deixar a decisao de falhar a task para o modulo.
+
+import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ansible.module_utils.gf_rest import (GlassfishRequestError, DEFAULT_MAX_WORKERS, current_write_step, run_concurrently,
+                                          set_write_step, step_task)
+
+try:
+    from urllib.parse import quote
+except ImportError:
+    from urllib import quote
+
+
+def check_response(response, action):
+    if not response.ok:
+        raise GlassfishRequestError(f"Failed to {action}. Status code: {response.status_code}, Response: {response.text}")
+    return response
+
+
+def get_json(client, url, action, params=None):
+    response = check_response(client.get(url, params=params), action)
+    return response.json()
+
+
+# Testa a existencia de um recurso com um GET direto no seu caminho, sem
+# listar a colecao inteira. Retorna (True, entidade) com 200, (False, None)
+# com 404 e (None, None) com qualquer outro status (DAS GlassFish 3 sem o
+# caminho direto, por exemplo), caso em que o chamador cai na listagem.
+def probe_resource(client, path):
+    response = client.get(client.url(path))
+    if response.status_code == 200:
+        return True, response.json().get('extraProperties', {}).get('entity', {})
+    if response.status_code == 404:
+        return False, None
+    return None, None
+
+
+# Nodes
+
+def list_nodes(client):
+    data = get_json(client, client.url("nodes/node"), "list nodes")
+    return list(data.get('extraProperties', {}).get('childResources', {}).keys())
+
+
+def get_node(client, name):
+    data = get_json(client, client.url(f"nodes/node/{name}"), f"retrieve node '{name}'")
+    return data.get('extraProperties', {}).get('entity', {})
+
+
+def create_node_ssh(client, body):
+    check_response(client.post(client.url("nodes/create-node-ssh"), json=body), f"create node '{body['id']}'")
+
+
+# Porta, usuario e chave SSH nao ficam na entidade do node: no domain.xml
+# estao em <ssh-connector ssh-port> e <ssh-auth user-name keyfile>, filhos do
+# node. Devolve esses atributos com as chaves de NODE_ATTRIBUTES; um node sem
+# ssh-connector (tipo CONFIG) devolve {}. A senha do ssh-auth nunca e lida
+# para fora daqui.
+def read_node_ssh(client, name):
+    exists, connector = probe_resource(client, f"nodes/node/{name}/ssh-connector")
+    if not exists:
+        return {}
+    ssh = {}
+    if 'sshPort' in connector:
+        ssh['sshPort'] = connector['sshPort']
+    exists, auth = probe_resource(client, f"nodes/node/{name}/ssh-connector/ssh-auth")
+    for key, entity_key in (('userName', 'sshUser'), ('keyfile', 'sshKeyFile')):
+        if exists and key in auth:
+            ssh[entity_key] = auth[key]
+    return ssh
+
+
+# Le a colecao de nodes com os filhos expandidos (expandLevel=1). Os nodes em
+# 'names' que nao vieram expandidos sao lidos um a um; os atributos SSH dos
+# nodes em 'names' que existem vem do ssh-connector de cada um. Tudo em paralelo.
+def read_nodes(client, names, max_workers=DEFAULT_MAX_WORKERS):
+    data = get_json(client, client.url("nodes/node"), "list nodes", params={'expandLevel': 1})
+    nodes = {}
+    for name, child in data.get('extraProperties', {}).get('childResources', {}).items():
+        if isinstance(child, dict):
+            nodes[name] = child.get('extraProperties', {}).get('entity') or child.get('entity') or child
+        else:
+            nodes[name] = None
+    missing = [name for name in names if name in nodes and nodes[name] is None]
+    for name, entity, error in run_concurrently(lambda name: get_node(client, name), missing, max_workers):
+        if error is not None:
+            raise error
+        nodes[name] = entity
+    present = [name for name in names if name in nodes]
+    for name, ssh, error in run_concurrently(lambda name: read_node_ssh(client, name), present, max_workers):
+        if error is not None:
+            raise error
+        nodes[name] = dict(nodes[name], **ssh)
+    return nodes
+
+
+# Atributos do node comparados no diff: (chave da entidade, parametro do
+# create-node-ssh/update-node-ssh). Porta, usuario e chave SSH vem de
+# read_node_ssh; atributos que o DAS nao devolve nao entram no diff.
+NODE_ATTRIBUTES = (
+    ('nodeHost', 'nodehost'),
+    ('nodeDir', 'nodedir'),
+    ('sshPort', 'sshport'),
+    ('sshUser', 'sshuser'),
+    ('sshKeyFile', 'sshkeyfile'),
+)
+
+
+# Monta o body do update-node-ssh apenas com os atributos que mudaram
+def diff_node(existing_node, body):
+    update_body = {}
+    for entity_key, param in NODE_ATTRIBUTES:
+        if entity_key in existing_node and param in body and str(existing_node[entity_key] or '') != str(body[param] or ''):
+            update_body[param] = body[param]
+    return update_body
+
+
+def update_node_ssh(client, name, body):
+    check_response(client.post(client.url(f"nodes/node/{name}/update-node-ssh"), json=body, idempotent=True),
+                   f"update node '{name}'")
+
+
+def delete_node_ssh(client, name):
+    check_response(client.delete(client.url(f"nodes/node/{name}/delete-node-ssh")), f"delete node '{name}'")
+
+
+# Teste de conexao SSH feito pelo proprio DAS ate o host do node
+def ping_node_ssh(client, name):
+    response = check_response(client.get(client.url(f"nodes/node/{name}/ping-node-ssh"), cache=False),
+                              f"ping node '{name}'")
+    try:
+        data = response.json()
+    except ValueError:
+        return response.text
+    # O comando pode falhar com status 200 e exit_code FAILURE
+    if str(data.get('exit_code', '')).upper() == 'FAILURE':
+        raise GlassfishRequestError(f"Failed to ping node '{name}'. Response: {data.get('message', response.text)}")
+    return data.get('message', '')
+
+
+# Clusters
+
+def parse_cluster_names(data, gf_type):
+    # Quando type for glassfish3 os nomes vem em 'properties'
+    if gf_type == 'glassfish3':
+        return list(data.get('properties', {}).keys())
+    # Quando type nao glassfish3 vai ser Payara
+    return data.get('extraProperties', {}).get('clusterNames', [])
+
+
+# Nomes dos clusters de uma resposta do list-clusters. No Payara o array
+# clusterNames e lido direto do texto, sem montar a arvore JSON.
+def read_cluster_names(response, gf_type):
+    if gf_type == 'glassfish3':
+        return parse_cluster_names(response.json(), gf_type)
+    return list(read_json_array(response, 'clusterNames'))
+
+
+def list_cluster_names(client, gf_type):
+    response = check_response(client.get(client.url("clusters/list-clusters")), "list clusters")
+    return read_cluster_names(response, gf_type)
+
+
+def cluster_exists(client, name, gf_type):
+    exists, _ = probe_resource(client, f"clusters/cluster/{name}")
+    if exists is None:
+        exists = name in set(list_cluster_names(client, gf_type))
+    return exists
+
+
+def create_cluster(client, body):
+    check_response(client.post(client.url("clusters/cluster"), json=body), f"add cluster '{body['id']}'")
+
+
+# Instancias
+
+def list_instances(client, cluster_name):
+    response = check_response(client.get(client.url(f"clusters/cluster/{cluster_name}/list-instances")), "list instances")
+    return [instance for instance in read_json_array(response, 'instanceList') if 'name' in instance]
+
+
+# Procura a instancia pelo recurso servers/server/{name}. Retorna a entidade
+# (com configRef quando o DAS informa) ou None quando ela nao existe.
+def find_instance(client, name, cluster_name):
+    exists, entity = probe_resource(client, f"servers/server/{name}")
+    if exists is None:
+        instances = {instance['name']: instance for instance in list_instances(client, cluster_name)}
+        return instances.get(name)
+    return entity if exists else None
+
+
+def create_instance(client, body):
+    check_response(client.post(client.url("create-instance"), json=body), f"add instance '{body['id']}'")
+
+
+def delete_instance(client, name):
+    check_response(client.delete(client.url(f"servers/server/{name}/delete-instance")), f"delete instance '{name}'")
+
+
+# System properties
+
+def system_properties_url(client, target, name):
+    if target == 'cluster':
+        return client.url(f"clusters/cluster/{name}/")
+    return client.url(f"servers/server/{name}/")
+
+
+# Percorre o array name de extraProperties ("systemProperties",
+# "instanceList", "clusterNames") direto no texto da resposta, decodificando um
+# item por vez, sem montar a arvore JSON inteira (relevante com milhares de
+# itens). Se o formato nao for o esperado, cai no json.loads completo.
+def iter_json_array(text, name):
+    decoder = json.JSONDecoder()
+    key = text.find(f'"{name}"')
+    position = key + len(name) + 2
+    while key >= 0 and position < len(text) and text[position] in ' \t\r\n:':
+        position += 1
+    if key < 0 or position >= len(text) or text[position] != '[':
+        data = json.loads(text)
+        for item in data.get('extraProperties', {}).get(name, []):
+            yield item
+        return
+
+    position += 1
+    while True:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(text):
+            raise ValueError(f"Unterminated {name} array")
+        if text[position] == ']':
+            return
+        item, position = decoder.raw_decode(text, position)
+        yield item
+
+
+def iter_system_properties(text):
+    return iter_json_array(text, 'systemProperties')
+
+
+# Itens do array name da resposta. O corpo em bytes e liberado assim que e
+# decodificado; do texto so sobram os itens extraidos.
+def read_json_array(response, name):
+    return iter_json_array(response.take_text(), name)
+
+
+def get_system_properties(client, url):
+    response = check_response(client.get(url + "system-properties"), "get system properties")
+
+    properties = {}
+    for prop in iter_system_properties(response.take_text()):
+        properties[prop.get('name')] = {
+            "value": prop.get('value'),
+            "default_value": prop.get('defaultValue')
+        }
+    return properties
+
+
+# Compara as propriedades atuais com as desejadas. Retorna (changed, mapa
+# completo de propriedades a enviar no POST).
+def diff_system_properties(current_properties, systemproperties):
+    changed = False
+
+    # Cria um dicionário de todas as propriedades que serão enviadas no POST
+    all_properties_to_update = {name: info['value'] if info['value'] is not None else info['default_value'] for name, info in current_properties.items()}
+
+    # Atualiza o dicionário com as propriedades que precisam ser alteradas ou criadas, ou removidas
+    for prop in systemproperties:
+        name = prop.get('name')
+        desired_value = prop.get('value')
+        state = prop.get('state', 'present')
+
+        if state == 'absent':
+            # Remove a propriedade se ela estiver marcada como 'absent'
+            if name in all_properties_to_update:
+                del all_properties_to_update[name]
+                changed = True
+        else:
+            if name in current_properties:
+                current_value = current_properties[name].get('value')
+                default_value = current_properties[name].get('default_value')
+
+                # Se o valor atual ou o valor padrão for igual ao valor desejado, não precisa alterar
+                if current_value == desired_value or default_value == desired_value:
+                    continue
+
+            # Atualiza ou adiciona a propriedade com o novo valor
+            all_properties_to_update[name] = desired_value
+            changed = True
+
+    return changed, all_properties_to_update
+
+
+def set_system_properties(client, url, properties):
+    check_response(client.post(url + "system-properties", json=properties, idempotent=True), "update system properties")
+
+
+# Diff para escrita parcial: mesmas regras do diff_system_properties, mas
+# retorna apenas as propriedades novas ou alteradas e as que devem ser
+# removidas. Retorna (changed, {nome: valor}, [nomes a remover]).
+def diff_system_properties_delta(current_properties, systemproperties):
+    to_set = {}
+    to_delete = []
+    for prop in systemproperties:
+        name = prop.get('name')
+        desired_value = prop.get('value')
+
+        if prop.get('state', 'present') == 'absent':
+            if name in current_properties:
+                to_delete.append(name)
+            continue
+
+        if name in current_properties:
+            current_value = current_properties[name].get('value')
+            default_value = current_properties[name].get('default_value')
+            if current_value == desired_value or default_value == desired_value:
+                continue
+        to_set[name] = desired_value
+
+    return bool(to_set or to_delete), to_set, to_delete
+
+
+# No create-system-properties ':' separa as propriedades e '=' separa nome e
+# valor; os dois precisam de escape com barra invertida
+def escape_system_property(text):
+    return str(text if text is not None else '').replace('\\', '\\\\').replace(':', '\\:').replace('=', '\\=')
+
+
+# Escrita parcial: create-system-properties cria ou altera apenas as
+# propriedades informadas, sem reescrever as demais; as removidas saem uma a
+# uma pelo recurso da propriedade, em paralelo
+def write_system_properties_delta(client, url, target_name, to_set, to_delete, max_workers=DEFAULT_MAX_WORKERS):
+    if to_set:
+        body = {
+            "id": ':'.join(f"{escape_system_property(name)}={escape_system_property(value)}" for name, value in to_set.items()),
+            "target": target_name
+        }
+        check_response(client.post(client.url("create-system-properties"), json=body, idempotent=True),
+                       f"create system properties on '{target_name}'")
+
+    def delete(name):
+        check_response(client.delete(f"{url}system-properties/{quote(name, safe='')}"), f"delete system property '{name}'")
+
+    for name, _, error in run_concurrently(delete, to_delete, max_workers):
+        if error is not None:
+            raise error
+
+
+# Configs
+
+def list_configs(client):
+    data = get_json(client, client.url("configs/config"), "list configs")
+    return list(data.get('extraProperties', {}).get('childResources', {}).keys())
+
+
+# Hosts JMS
+
+def jms_hosts_url(client, target):
+    return client.url(f"configs/config/{target}-config/jms-service/jms-host")
+
+
+def list_jms_hosts(client, target):
+    data = get_json(client, jms_hosts_url(client, target), "list JMS Hosts")
+    return data.get('extraProperties', {}).get('childResources', {})
+
+
+def get_jms_host(client, target, name):
+    data = get_json(client, f"{jms_hosts_url(client, target)}/{name}", f"retrieve JMS Host '{name}'")
+    return data.get('extraProperties', {}).get('entity', {})
+
+
+# Le a colecao com os filhos expandidos (expandLevel=1): uma unica requisicao
+# traz os atributos de todos os hosts. Retorna nome -> entidade; hosts que o
+# DAS devolveu apenas como URL (versoes que ignoram expandLevel) ficam None.
+def list_jms_hosts_expanded(client, target):
+    data = get_json(client, jms_hosts_url(client, target), "list JMS Hosts", params={'expandLevel': 1})
+    hosts = {}
+    for name, child in data.get('extraProperties', {}).get('childResources', {}).items():
+        if isinstance(child, dict):
+            hosts[name] = child.get('extraProperties', {}).get('entity') or child.get('entity') or child
+        else:
+            hosts[name] = None
+    return hosts
+
+
+# Hosts JMS de um target com os atributos dos hosts em 'names'. Os que nao
+# vieram expandidos sao lidos um a um, em paralelo.
+def read_jms_hosts(client, target, names, max_workers=DEFAULT_MAX_WORKERS):
+    hosts = list_jms_hosts_expanded(client, target)
+    missing = [name for name in names if name in hosts and hosts[name] is None]
+    for name, entity, error in run_concurrently(lambda name: get_jms_host(client, target, name), missing, max_workers):
+        if error is not None:
+            raise error
+        hosts[name] = entity
+    return hosts
+
+
+# Monta o body apenas com os parametros que mudaram. A senha so e comparada
+# quando a entidade a traz: o snapshot do gf_domain_facts nao a guarda
+def diff_jms_host(existing_jms_host, jms_host, port, admin_user, admin_pass):
+    update_body = {}
+    if existing_jms_host.get('host') != jms_host:
+        update_body['host'] = jms_host
+    if int(existing_jms_host.get('port', 0)) != int(port):
+        update_body['port'] = port
+    if existing_jms_host.get('adminUserName') != admin_user:
+        update_body['adminUserName'] = admin_user
+    if 'adminPassword' in existing_jms_host and existing_jms_host['adminPassword'] != admin_pass:
+        update_body['adminPassword'] = admin_pass
+    return update_body
+
+
+def create_jms_host(client, target, body):
+    check_response(client.post(jms_hosts_url(client, target), json=body), f"create JMS Host '{body['name']}'")
+
+
+def update_jms_host(client, target, name, body):
+    check_response(client.post(f"{jms_hosts_url(client, target)}/{name}", json=body, idempotent=True), f"update JMS Host '{name}'")
+
+
+def delete_jms_host(client, target, name):
+    check_response(client.delete(f"{jms_hosts_url(client, target)}/{name}", json={"target": target}),
+                   f"delete JMS Host '{name}'")
+
+
+# Leitura do snapshot gerado pelo gf_domain_facts
+#
+# Cada funcao retorna None quando o snapshot nao tem a informacao (subset nao
+# coletado), e o modulo deve fazer a sua propria leitura no DAS.
+
+def snapshot_cluster_names(facts):
+    if not facts or 'clusters' not in facts:
+        return None
+    return list(facts['clusters'].keys())
+
+
+def snapshot_instances(facts, cluster_name):
+    cluster = (facts or {}).get('clusters', {}).get(cluster_name)
+    if cluster is None or 'instances' not in cluster:
+        return None
+    return [dict(info, name=name) for name, info in cluster['instances'].items()]
+
+
+def snapshot_node_names(facts):
+    if not facts or 'nodes' not in facts:
+        return None
+    return list(facts['nodes'].keys())
+
+
+# Nodes do snapshot com os atributos no formato da entidade do DAS
+def snapshot_nodes(facts):
+    if not facts or 'nodes' not in facts:
+        return None
+    nodes = {}
+    for name, info in facts['nodes'].items():
+        nodes[name] = {key: info[fact] for key, fact in (('nodeHost', 'node_host'), ('nodeDir', 'node_dir'), ('sshPort', 'ssh_port'),
+                                                         ('sshUser', 'ssh_user'), ('sshKeyFile', 'ssh_key_file')) if fact in info}
+    return nodes
+
+
+def snapshot_system_properties(facts, target, name):
+    if target != 'cluster':
+        return None
+    cluster = (facts or {}).get('clusters', {}).get(name)
+    if cluster is None or 'system_properties' not in cluster:
+        return None
+    return cluster['system_properties']
+
+
+def snapshot_jms_hosts(facts, target):
+    config = (facts or {}).get('configs', {}).get(f"{target}-config")
+    if config is None or 'jms_hosts' not in config:
+        return None
+    return config['jms_hosts']
+
+
+# Execucao de operacoes com dependencias
+#
+# Cada operacao e um dict com 'key', 'depends_on' (chaves de outras operacoes)
+# e 'func'. Operacoes cujas dependencias ja terminaram rodam em paralelo, ate
+# max_workers de cada vez. Dependencias que nao estao na lista sao consideradas
+# satisfeitas. Se uma dependencia falha, as operacoes que dependem dela sao
+# marcadas como 'skipped' sem serem executadas.
+#
+# Retorna um dict key -> (status, resultado ou erro), com status 'ok',
+# 'failed' ou 'skipped'.
+def run_operations(operations, max_workers=DEFAULT_MAX_WORKERS):
+    pending = {op['key']: op for op in operations}
+    results = {}
+    # Passo de escrita do plano (check mode): uma operacao comeca depois das
+    # escritas de todas as operacoes ja concluidas, inclusive as dependencias
+    steps = [current_write_step()]
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        running = {}
+        while pending or running:
+            for key, op in list(pending.items()):
+                deps = [dep for dep in op.get('depends_on', ()) if dep in pending or dep in results or dep in running.values()]
+                if any(dep in results and results[dep][0] != 'ok' for dep in deps):
+                    failed_deps = [dep for dep in deps if dep in results and results[dep][0] != 'ok']
+                    results[key] = ('skipped', f"Skipped because {', '.join(failed_deps)} did not complete.")
+                    del pending[key]
+                elif all(dep in results for dep in deps):
+                    running[executor.submit(step_task(op['func'], max(steps), steps.append))] = key
+                    del pending[key]
+
+            if not running:
+                # Sobraram apenas operacoes com dependencias circulares
+                for key in list(pending):
+                    results[key] = ('skipped', "Skipped because of a circular dependency.")
+                    del pending[key]
+                continue
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                key = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    results[key] = ('ok', future.result())
+                else:
+                    results[key] = ('failed', error)
+
+    set_write_step(max(steps))
+    return results
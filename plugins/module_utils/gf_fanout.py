@@ -0,0 +1,102 @@
+# Modo multi-DAS (das_hosts): a mesma task aplicada a varios dominios
+# independentes, cada um com o seu DAS, numa unica execucao do modulo.
+#
+# Cada DAS recebe o seu proprio GlassfishClient (pool de conexoes, sessao REST,
+# cache, metricas e rate_limit proprios) e a reconciliacao do modulo roda para
+# todos eles em paralelo, com no maximo das_max_workers DAS ao mesmo tempo. Um
+# DAS lento ou fora do ar ocupa apenas a sua vaga: os demais seguem e o
+# resultado de cada um volta no campo 'das', indexado pelo nome do DAS.
+
+from ansible.module_utils.gf_rest import GlassfishClient, GlassfishRequestError, DEFAULT_POOL_MAXSIZE, run_concurrently
+
+DEFAULT_DAS_MAX_WORKERS = 8
+
+
+def fanout_argument_spec():
+    return dict(
+        das_hosts=dict(type='list', elements='dict', options=dict(
+            host=dict(type='str', required=True),
+            port=dict(type='int'),
+            user=dict(type='str'),
+            password=dict(type='str', no_log=True),
+            name=dict(type='str'),
+        )),
+        das_max_workers=dict(type='int', default=DEFAULT_DAS_MAX_WORKERS),
+    )
+
+
+# Resultado da reconciliacao de um DAS. Deriva de BaseException, como o
+# SystemExit de module.exit_json, para atravessar os 'except Exception' do
+# codigo do modulo e do run_concurrently ate o fim da reconciliacao do DAS.
+class DasExit(BaseException):
+    def __init__(self, result):
+        super(DasExit, self).__init__(result.get('msg'))
+        self.result = result
+
+
+# Cliente de um DAS do modo multi-DAS: exit_json/fail_json encerram apenas a
+# reconciliacao deste DAS, em vez da task inteira
+class DasClient(GlassfishClient):
+    def exit_json(self, **kwargs):
+        kwargs['failed'] = False
+        raise DasExit(self.result(kwargs))
+
+    def fail_json(self, **kwargs):
+        kwargs['failed'] = True
+        kwargs.setdefault('changed', False)
+        raise DasExit(self.result(kwargs, failed=True))
+
+
+def das_name(das):
+    return das['name'] or f"{das['host']}:{das['port']}"
+
+
+# Executa reconcile(client) em cada DAS de das_hosts e encerra a task com os
+# resultados de todos. port, user e password sao os valores dos parametros de
+# conexao do modulo, usados quando o item de das_hosts nao define os seus.
+def run_on_das_hosts(module, reconcile, port, user, password, protocol='https', validate_certs=False,
+                     pool_maxsize=DEFAULT_POOL_MAXSIZE):
+    if getattr(module, '_socket_path', None):
+        module.fail_json(msg="das_hosts cannot be used with connection: httpapi.")
+    if module.params.get('domain_facts'):
+        module.fail_json(msg="domain_facts describes a single DAS and cannot be combined with das_hosts.")
+
+    das_hosts = []
+    for das in module.params['das_hosts']:
+        das = dict(das, port=das['port'] or port, user=das['user'] or user, password=das['password'] or password)
+        if not (das['port'] and das['user'] and das['password']):
+            module.fail_json(msg=f"DAS '{das['host']}' has no port, user or password (set them in das_hosts or in the module parameters).")
+        das_hosts.append(das)
+    names = [das_name(das) for das in das_hosts]
+    duplicated = sorted(set(name for name in names if names.count(name) > 1))
+    if duplicated:
+        module.fail_json(msg=f"DAS listed more than once in das_hosts: {', '.join(duplicated)}")
+
+    # Clientes criados antes de qualquer requisicao: o deadline conta a partir
+    # do inicio da task para todos os DAS, inclusive os que esperam vaga
+    clients = [DasClient(module, das['host'], das['port'], das['user'], das['password'], protocol, validate_certs,
+                         pool_maxsize) for das in das_hosts]
+
+    def reconcile_das(client):
+        try:
+            reconcile(client)
+        except DasExit as e:
+            return e.result
+        finally:
+            client.close()
+        raise GlassfishRequestError("The module finished without a result.")
+
+    results = {}
+    for name, (client, result, error) in zip(names, run_concurrently(reconcile_das, clients,
+                                                                      module.params['das_max_workers'])):
+        if error is not None:
+            result = dict(changed=False, failed=True, msg=str(error))
+        results[name] = result
+
+    changed = any(result.get('changed') for result in results.values())
+    failed = [name for name, result in results.items() if result['failed']]
+    if failed:
+        module.fail_json(msg=f"Failed on {len(failed)} of {len(results)} DAS: {', '.join(failed)}", changed=changed,
+                         das=results)
+    module.exit_json(changed=changed, das=results,
+                     msg=f"{len(results)} DAS reconciled, {sum(1 for r in results.values() if r.get('changed'))} changed.")
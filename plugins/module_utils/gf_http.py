@@ -0,0 +1,175 @@
+# Transporte HTTP direto do modulo ate o DAS usando apenas a biblioteca padrao
+# (http.client). E o transporte padrao (http_backend: builtin): nao exige
+# requests no host e evita importar requests/urllib3/idna/charset-normalizer a
+# cada task.
+#
+# As conexoes ficam num pool keep-alive de ate pool_maxsize conexoes,
+# reaproveitadas entre as requisicoes da task e entre as threads das operacoes
+# em lote. O open_url do Ansible (module_utils.urls) nao serve aqui porque
+# abre uma conexao nova, com novo handshake TLS, a cada requisicao.
+
+import base64
+import json
+import socket
+import ssl
+import threading
+import time
+import zlib
+
+from http.client import HTTPConnection, HTTPSConnection, HTTPException, RemoteDisconnected
+from urllib.parse import urlencode, urlsplit
+
+from ansible.module_utils.gf_rest import (GlassfishConnectionError, GlassfishResponse, TokenAuthTransport,
+                                          DEFAULT_HEADERS, DEFAULT_POOL_MAXSIZE, DEFAULT_TOKEN_TTL)
+
+# Respostas grandes (list-instances, system-properties) vem comprimidas quando
+# o listener do DAS tem compression ligado; o JSON verboso encolhe varias vezes
+ACCEPT_ENCODING = 'gzip'
+
+# Erros de uma conexao reaproveitada que o DAS ja tinha fechado: a requisicao
+# e reenviada numa conexao nova
+STALE_CONNECTION_ERRORS = (RemoteDisconnected, ConnectionResetError, BrokenPipeError, ConnectionAbortedError)
+
+
+# Corpo da resposta descomprimido conforme o Content-Encoding
+def decode_content(response, content, url):
+    if not content or (response.getheader('Content-Encoding') or '').lower() != 'gzip':
+        return content
+    try:
+        return zlib.decompress(content, 16 + zlib.MAX_WBITS)
+    except zlib.error as e:
+        raise GlassfishConnectionError(f"Invalid gzip response from {url}: {str(e)}")
+
+
+class HttpClientTransport(TokenAuthTransport):
+    def __init__(self, module, base_url, user, password, protocol='https', validate_certs=False,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, auth='token', token_cache=None, token_ttl=DEFAULT_TOKEN_TTL):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = protocol == 'https'
+
+        self.ssl_context = None
+        if self.https:
+            # Um unico SSLContext para todas as conexoes do pool
+            self.ssl_context = ssl.create_default_context()
+            if not validate_certs:
+                self.ssl_context.check_hostname = False
+                self.ssl_context.verify_mode = ssl.CERT_NONE
+
+        credentials = base64.b64encode(f"{user}:{password}".encode('utf-8')).decode('ascii')
+        self.basic_header = f"Basic {credentials}"
+
+        # Conexoes livres e limite de conexoes abertas (como pool_block=True)
+        self.idle = []
+        self.idle_lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(pool_maxsize)
+        self.timing = threading.local()
+
+        self.init_auth(base_url, user, auth, token_cache, token_ttl)
+
+    def new_connection(self, timeout):
+        connect_timeout = timeout[0] if timeout else None
+        if self.https:
+            connection = HTTPSConnection(self.host, self.port, timeout=connect_timeout, context=self.ssl_context)
+        else:
+            connection = HTTPConnection(self.host, self.port, timeout=connect_timeout)
+        started = time.monotonic()
+        try:
+            connection.connect()
+        finally:
+            self.timing.elapsed = getattr(self.timing, 'elapsed', 0.0) + time.monotonic() - started
+        return connection
+
+    def release(self, connection, response):
+        if response is None or response.will_close:
+            connection.close()
+            return
+        with self.idle_lock:
+            self.idle.append(connection)
+
+    def request_headers(self, headers, body, use_auth=True):
+        request_headers = dict(DEFAULT_HEADERS, **{'Accept-Encoding': ACCEPT_ENCODING})
+        if body is not None:
+            request_headers['Content-Type'] = 'application/json'
+        if use_auth:
+            if self.token:
+                request_headers['Cookie'] = f"gfresttoken={self.token}"
+            else:
+                request_headers['Authorization'] = self.basic_header
+        request_headers.update(headers or {})
+        return request_headers
+
+    # Envia uma requisicao por uma conexao do pool. Uma conexao reaproveitada
+    # que o DAS fechou por inatividade e descartada e a requisicao vai por uma
+    # conexao nova, antes de haver qualquer resposta.
+    def perform(self, method, path, data, headers, timeout):
+        read_timeout = timeout[1] if timeout else None
+        with self.slots:
+            while True:
+                with self.idle_lock:
+                    connection = self.idle.pop() if self.idle else None
+                reused = connection is not None
+                try:
+                    if connection is None:
+                        connection = self.new_connection(timeout)
+                    connection.sock.settimeout(read_timeout)
+                    sent = time.monotonic()
+                    connection.request(method, path, body=data, headers=headers)
+                    response = connection.getresponse()
+                    ttfb = time.monotonic() - sent
+                    content = response.read()
+                except STALE_CONNECTION_ERRORS as e:
+                    if connection is not None:
+                        connection.close()
+                    if reused:
+                        continue
+                    raise GlassfishConnectionError(str(e))
+                except (socket.timeout, OSError, HTTPException) as e:
+                    if connection is not None:
+                        connection.close()
+                    raise GlassfishConnectionError(str(e) or e.__class__.__name__)
+                self.release(connection, response)
+                return response, content, ttfb
+
+    def path(self, url, params=None):
+        parts = urlsplit(url)
+        query = '&'.join(part for part in (parts.query, urlencode(params or {})) if part)
+        return f"{parts.path}?{query}" if query else parts.path
+
+    def login_request(self, timeout):
+        headers = self.request_headers({'Authorization': self.basic_header}, {}, use_auth=False)
+        try:
+            response, content, _ = self.perform('POST', self.path(self.sessions_url), b'{}', headers, timeout)
+        except GlassfishConnectionError as e:
+            raise GlassfishConnectionError(f"Login to {self.sessions_url} failed: {str(e)}")
+        return response.status, decode_content(response, content, self.sessions_url)
+
+    def logout_request(self, token):
+        headers = self.request_headers({'Authorization': self.basic_header}, None, use_auth=False)
+        self.perform('DELETE', self.path(f"{self.sessions_url}/{token}"), None, headers, self.timeout)
+
+    def send(self, method, url, body=None, params=None, headers=None, timeout=None):
+        self.timing.elapsed = 0.0
+        return super(HttpClientTransport, self).send(method, url, body, params, headers, timeout)
+
+    # Envia uma tentativa. Retorna (resposta, bytes enviados, tempo ate o
+    # primeiro byte); falhas de conexao e timeouts viram GlassfishConnectionError
+    # para o cliente decidir se tenta de novo.
+    def send_once(self, method, url, body=None, params=None, headers=None, timeout=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        response, content, ttfb = self.perform(method, self.path(url, params), data,
+                                               self.request_headers(headers, body), timeout)
+        wire_size = len(content)
+        content = decode_content(response, content, url)
+        # response.msg (HTTPMessage) ja faz busca de cabecalhos sem diferenciar maiusculas
+        return GlassfishResponse(response.status, response.msg, content, url, wire_size), len(data or b''), ttfb
+
+    def connect_time(self):
+        return getattr(self.timing, 'elapsed', 0.0)
+
+    def close_connections(self):
+        with self.idle_lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
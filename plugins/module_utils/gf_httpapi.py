@@ -0,0 +1,87 @@
+# Transporte pela conexao persistente httpapi (plugins/httpapi/glassfish.py).
+#
+# Com connection: httpapi o modulo roda no controller e cada chamada REST vira
+# um RPC para o processo de conexao persistente do Ansible, que mantem uma
+# unica conexao keep-alive ja autenticada com o DAS durante toda a play. O
+# modulo nao importa requests nem abre conexoes proprias.
+
+import json
+import time
+
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.common.text.converters import to_bytes
+from ansible.module_utils.gf_rest import GlassfishConnectionError, GlassfishResponse
+
+try:
+    from urllib.parse import urlencode, urlsplit
+except ImportError:
+    from urllib import urlencode
+    from urlparse import urlsplit
+
+
+class ResponseHeaders(dict):
+    # Cabecalhos da resposta com busca sem diferenciar maiusculas, como no requests
+    def __init__(self, headers):
+        super(ResponseHeaders, self).__init__((name.lower(), value) for name, value in headers.items())
+
+    def __getitem__(self, name):
+        return dict.__getitem__(self, name.lower())
+
+    def __contains__(self, name):
+        return dict.__contains__(self, name.lower())
+
+    def get(self, name, default=None):
+        return dict.get(self, name.lower(), default)
+
+
+class HttpApiTransport(object):
+    def __init__(self, socket_path):
+        self.connection = Connection(socket_path)
+
+    # URL base do DAS segundo as opcoes da conexao (ansible_host,
+    # ansible_httpapi_port, ansible_httpapi_use_ssl)
+    def base_url(self):
+        host = self.connection.get_option('host')
+        port = self.connection.get_option('port')
+        protocol = 'https' if self.connection.get_option('use_ssl') else 'http'
+        if port:
+            return f"{protocol}://{host}:{port}/management/domain"
+        return f"{protocol}://{host}/management/domain"
+
+    # Usuario com que a conexao autentica no DAS (ansible_user)
+    def user(self):
+        return self.connection.get_option('remote_user')
+
+    def send(self, method, url, body=None, params=None, headers=None, timeout=None):
+        # A conexao persistente ja conhece o DAS: so o caminho e a query seguem no RPC
+        parts = urlsplit(url)
+        path = parts.path
+        query = '&'.join(part for part in (parts.query, urlencode(params or {})) if part)
+        if query:
+            path = f"{path}?{query}"
+
+        data = json.dumps(body) if body is not None else None
+        # Sem timeout de leitura vale o persistent_command_timeout da conexao
+        timeout = max(timeout) if timeout and None not in timeout else None
+        sent = time.monotonic()
+        try:
+            result = self.connection.send_request(method, path, data, headers or {}, timeout)
+        except ConnectionError as e:
+            raise GlassfishConnectionError(str(e))
+        ttfb = time.monotonic() - sent
+
+        # O open_url ja devolve o corpo descomprimido: os bytes que trafegaram so
+        # sao conhecidos pelo Content-Length da resposta comprimida
+        headers = ResponseHeaders(result['headers'])
+        length = headers.get('Content-Length')
+        wire_size = int(length) if headers.get('Content-Encoding') and length and length.isdigit() else None
+        response = GlassfishResponse(result['status'], headers, to_bytes(result['body'], errors='surrogate_or_strict'),
+                                     url, wire_size)
+        return response, len(data or ''), ttfb
+
+    # O handshake acontece no processo de conexao persistente, fora do modulo
+    def connect_time(self):
+        return 0.0
+
+    def close(self):
+        pass
@@ -0,0 +1,127 @@
+# Comandos administrativos em modo detached.
+#
+# Comandos demorados (create-node-ssh, create-instance) podem ser enviados com
+# __detached=true: o DAS responde logo com o ID do job e executa o comando em
+# segundo plano. Os jobs sao acompanhados pelo recurso de jobs do DAS, com
+# intervalo de consulta crescente, e varios jobs sao consultados em paralelo.
+
+import time
+
+from ansible.module_utils.gf_rest import GlassfishRequestError, DEFAULT_MAX_WORKERS, run_concurrently
+
+DEFAULT_JOB_TIMEOUT = 600
+DEFAULT_POLL_INTERVAL = 0.5
+MAX_POLL_INTERVAL = 10
+
+# Estados finais de um job no DAS
+JOB_DONE_STATES = ('COMPLETED', 'FAILED', 'REVERTED')
+
+
+def job_argument_spec():
+    return dict(
+        detached=dict(type='bool', default=False),
+        job_timeout=dict(type='int', default=DEFAULT_JOB_TIMEOUT),
+        poll_interval=dict(type='float', default=DEFAULT_POLL_INTERVAL),
+    )
+
+
+# Em check mode os comandos entram no plano como comandos sincronos: nao ha
+# job no DAS para acompanhar
+def use_detached(module):
+    return module.params['detached'] and not module.check_mode
+
+
+def _job_id_from_location(location):
+    return location.rstrip('/').rsplit('/', 1)[-1]
+
+
+# Envia o comando em modo detached e devolve dict(id, url) do job
+def submit_detached(client, url, body, name):
+    response = client.post(url, json=body, params={'__detached': 'true'})
+    if response.status_code not in (200, 201, 202):
+        raise GlassfishRequestError(f"Failed to submit '{name}'. Status code: {response.status_code}, Response: {response.text}")
+
+    job_id = None
+    location = response.headers.get('Location')
+    if location:
+        job_id = _job_id_from_location(location)
+    else:
+        try:
+            extra = response.json().get('extraProperties', {})
+        except ValueError:
+            extra = {}
+        job_id = extra.get('jobId') or extra.get('jobID')
+
+    if not job_id:
+        raise GlassfishRequestError(f"DAS did not return a job ID for '{name}'. Response: {response.text}")
+
+    client.unfinished_jobs.add(str(job_id))
+    return dict(name=name, id=str(job_id), url=location or client.url(f"jobs/id/{job_id}"))
+
+
+# Le o estado do job. A resposta varia entre versoes: o estado pode vir no
+# proprio extraProperties, na entidade ou na lista jobsInfo do list-jobs.
+def get_job_status(client, job):
+    # Nunca usa o cache de leituras: o estado do job muda a cada consulta
+    response = client.get(job['url'], cache=False)
+    if not response.ok:
+        raise GlassfishRequestError(f"Failed to read job {job['id']}. Status code: {response.status_code}, Response: {response.text}")
+
+    data = response.json()
+    extra = data.get('extraProperties', {})
+    candidates = [extra, extra.get('entity', {})] + list(extra.get('jobsInfo', []))
+    for info in candidates:
+        state = info.get('jobState') or info.get('state')
+        if state:
+            return dict(
+                state=str(state).upper(),
+                exit_code=str(info.get('exitCode') or info.get('exit_code') or '').upper() or None,
+                message=info.get('message') or data.get('message', '')
+            )
+    raise GlassfishRequestError(f"Could not find the state of job {job['id']}. Response: {response.text}")
+
+
+def _job_result(job, status, polls):
+    failed = status['state'] != 'COMPLETED' or status['exit_code'] not in (None, 'SUCCESS', 'WARNING')
+    return dict(job, polls=polls, failed=failed, **status)
+
+
+# Espera os jobs terminarem. A cada rodada todos os jobs pendentes sao
+# consultados em paralelo; o intervalo entre rodadas cresce enquanto houver
+# jobs rodando. timeout limita a espera total.
+def wait_for_jobs(client, jobs, timeout=DEFAULT_JOB_TIMEOUT, max_workers=DEFAULT_MAX_WORKERS,
+                  poll_interval=DEFAULT_POLL_INTERVAL):
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    pending = list(jobs)
+    polls = {job['id']: 0 for job in jobs}
+    last_status = {}
+    finished = {}
+
+    while pending:
+        for job, status, error in run_concurrently(lambda job: get_job_status(client, job), pending, max_workers):
+            polls[job['id']] += 1
+            if error is not None:
+                finished[job['id']] = dict(job, state='UNKNOWN', exit_code=None, message=str(error),
+                                           failed=True, polls=polls[job['id']])
+            elif status['state'] in JOB_DONE_STATES:
+                finished[job['id']] = _job_result(job, status, polls[job['id']])
+                client.unfinished_jobs.discard(job['id'])
+            else:
+                last_status[job['id']] = status
+
+        pending = [job for job in pending if job['id'] not in finished]
+        if not pending:
+            break
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            for job in pending:
+                status = dict(last_status[job['id']], state='TIMEOUT')
+                finished[job['id']] = _job_result(job, status, polls[job['id']])
+            break
+
+        time.sleep(min(interval, remaining))
+        interval = min(MAX_POLL_INTERVAL, interval * 1.5)
+
+    return [finished[job['id']] for job in jobs]
@@ -0,0 +1,82 @@
+# Medicao das requisicoes feitas ao DAS.
+#
+# Cada tentativa enviada ao DAS (round trip) vira um registro com os tempos de
+# conexao (TCP + TLS, zero quando a conexao do pool foi reaproveitada), tempo
+# ate o primeiro byte e tempo total, alem dos bytes de corpo enviados e
+# recebidos. Os registros sao resumidos no bloco 'metrics' do resultado e,
+# opcionalmente, gravados em um arquivo JSON-lines para o callback
+# glassfish_trace agregar no fim da play.
+
+import json
+import os
+import threading
+import time
+
+
+class RequestMetrics(object):
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def record(self, method, endpoint, attempt, status, connect, ttfb, total, bytes_out, bytes_in, error=None):
+        entry = dict(
+            ts=round(time.time(), 3),
+            method=method,
+            endpoint=endpoint,
+            attempt=attempt,
+            status=status,
+            connect=round(connect, 4),
+            ttfb=round(ttfb, 4),
+            total=round(total, 4),
+            bytes_out=bytes_out,
+            bytes_in=bytes_in
+        )
+        if error is not None:
+            entry['error'] = error
+        with self.lock:
+            self.records.append(entry)
+
+    def summary(self):
+        with self.lock:
+            records = list(self.records)
+
+        endpoints = {}
+        for entry in records:
+            key = f"{entry['method']} {entry['endpoint']}"
+            stats = endpoints.setdefault(key, dict(round_trips=0, retries=0, connect=0.0, ttfb=0.0, total=0.0,
+                                                   bytes_out=0, bytes_in=0))
+            stats['round_trips'] += 1
+            if entry['attempt'] > 1:
+                stats['retries'] += 1
+            for field in ('connect', 'ttfb', 'total'):
+                stats[field] = round(stats[field] + entry[field], 4)
+            stats['bytes_out'] += entry['bytes_out']
+            stats['bytes_in'] += entry['bytes_in']
+
+        return dict(
+            round_trips=len(records),
+            retries=sum(stats['retries'] for stats in endpoints.values()),
+            connects=sum(1 for entry in records if entry['connect'] > 0),
+            bytes_out=sum(entry['bytes_out'] for entry in records),
+            bytes_in=sum(entry['bytes_in'] for entry in records),
+            total=round(sum(entry['total'] for entry in records), 4),
+            endpoints=endpoints
+        )
+
+    # Acrescenta os registros ao arquivo de trace, uma linha JSON por round trip
+    def write_trace(self, path, module_name, das):
+        with self.lock:
+            records = list(self.records)
+        if not records:
+            return
+        lines = ''.join(json.dumps(dict(entry, module=module_name, das=das)) + '\n' for entry in records)
+        path = os.path.expanduser(path)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Uma unica escrita em modo append, para nao misturar linhas de tasks paralelas
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, lines.encode('utf-8'))
+        finally:
+            os.close(fd)
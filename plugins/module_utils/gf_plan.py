@@ -0,0 +1,86 @@
+# Planos de execucao: em check mode o GlassfishClient nao envia POSTs e
+# DELETEs ao DAS, apenas os registra num plano junto com a versao da
+# configuracao (ETag/Last-Modified de /management/domain) lida antes das
+# leituras de descoberta. Com plan_file o plano e gravado em disco e uma
+# execucao posterior com apply_plan envia as escritas do plano direto, depois de
+# conferir que a versao do DAS nao mudou.
+#
+# O arquivo guarda um plano por DAS (chave: URL base da API), para que tasks
+# com varios DAS (das_hosts) ou varios hosts do inventario usem o mesmo
+# arquivo. Os corpos das escritas podem conter senhas, entao o arquivo e
+# legivel apenas pelo dono.
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+
+# Serializa as threads do mesmo processo; o flock cuida dos outros processos
+_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f).get('plans', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, plans):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(dict(plans=plans), f, indent=1)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Le, altera e grava o arquivo de planos com o lock do arquivo
+def _update(path, base_url, plan):
+    path = os.path.expanduser(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _lock:
+        lock_fd = os.open(f"{path}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            plans = _read(path)
+            if plan is None:
+                if base_url not in plans:
+                    return
+                del plans[base_url]
+            else:
+                plans[base_url] = plan
+            _write(path, plans)
+        finally:
+            os.close(lock_fd)
+
+
+def load_plan(path, base_url):
+    return _read(os.path.expanduser(path)).get(base_url)
+
+
+def save_plan(path, base_url, plan):
+    _update(path, base_url, plan)
+
+
+def discard_plan(path, base_url):
+    _update(path, base_url, None)
+
+
+# Agrupa as escritas por passo, na ordem do plano. As escritas de um passo nao
+# dependem umas das outras e podem sair em paralelo.
+def plan_steps(writes):
+    steps = {}
+    for write in writes:
+        steps.setdefault(write['step'], []).append(write)
+    return [steps[step] for step in sorted(steps)]
@@ -0,0 +1,184 @@
+# Transporte HTTP direto do modulo ate o DAS, usando requests (http_backend:
+# requests). O padrao e o transporte da biblioteca padrao (gf_http), que nao
+# exige requests no host.
+#
+# Uma unica sessao com pool de conexoes keep-alive atende todas as chamadas da
+# task, de forma que as varias requisicoes (listar, criar, listar de novo)
+# reaproveitam a mesma conexao TCP/TLS em vez de abrir um handshake novo a cada
+# requisicao. O login por token fica em TokenAuthTransport (gf_rest).
+
+import ssl
+import threading
+import time
+
+from ansible.module_utils.gf_rest import (GlassfishConnectionError, GlassfishRequestError, GlassfishResponse, TokenAuthTransport,
+                                          DEFAULT_HEADERS, DEFAULT_POOL_MAXSIZE, DEFAULT_TOKEN_TTL)
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.auth import AuthBase, HTTPBasicAuth
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+    AuthBase = HTTPAdapter = HTTPConnection = HTTPSConnection = HTTPConnectionPool = HTTPSConnectionPool = object
+
+
+# Tempo gasto abrindo conexoes (TCP + handshake TLS) na thread atual. A conexao
+# e aberta pela mesma thread que envia a requisicao, entao o transporte zera o
+# contador antes de cada tentativa e o cliente le o valor depois dela.
+connect_timing = threading.local()
+
+
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        started = time.monotonic()
+        try:
+            return super(TimedHTTPConnection, self).connect()
+        finally:
+            connect_timing.elapsed = getattr(connect_timing, 'elapsed', 0.0) + time.monotonic() - started
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        started = time.monotonic()
+        try:
+            return super(TimedHTTPSConnection, self).connect()
+        finally:
+            connect_timing.elapsed = getattr(connect_timing, 'elapsed', 0.0) + time.monotonic() - started
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class GlassfishAdapter(HTTPAdapter):
+    # Adapter que compartilha um unico SSLContext entre todas as conexoes do pool,
+    # evitando recriar o contexto TLS a cada nova conexao, e mede o tempo de
+    # abertura de cada conexao
+    def __init__(self, ssl_context=None, **kwargs):
+        self.ssl_context = ssl_context
+        super(GlassfishAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.ssl_context is not None:
+            kwargs['ssl_context'] = self.ssl_context
+        super(GlassfishAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool
+        }
+
+
+class GlassfishTokenAuth(AuthBase):
+    # Envia o token de sessao REST no cookie gfresttoken, preservando os
+    # cookies que a sessao ja tenha
+    def __init__(self, token):
+        self.token = token
+
+    def __call__(self, request):
+        cookie = request.headers.get('Cookie')
+        token_cookie = f"gfresttoken={self.token}"
+        request.headers['Cookie'] = f"{cookie}; {token_cookie}" if cookie else token_cookie
+        return request
+
+
+# Bytes recebidos antes de descomprimir: o requests devolve o corpo ja
+# descomprimido, mas o urllib3 conta o que foi lido do socket (tell). Sem ele
+# vale o Content-Length, ou o tamanho do corpo.
+def wire_size(response):
+    try:
+        size = response.raw.tell()
+    except (AttributeError, OSError):
+        size = None
+    if size:
+        return size
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit():
+        return int(length)
+    return None
+
+
+class RequestsTransport(TokenAuthTransport):
+    def __init__(self, module, base_url, user, password, protocol='https', validate_certs=False,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE, auth='token', token_cache=None, token_ttl=DEFAULT_TOKEN_TTL):
+        if not HAS_REQUESTS:
+            module.fail_json(msg="The 'requests' Python library is required by http_backend=requests.")
+
+        self.basic_auth = HTTPBasicAuth(user, password)
+        self.session = requests.Session()
+        self.session.auth = self.basic_auth
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.verify = validate_certs
+
+        ssl_context = None
+        if protocol == 'https' and not validate_certs:
+            ssl_context = ssl.create_default_context()
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+
+        adapter = GlassfishAdapter(
+            ssl_context=ssl_context,
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=0
+        )
+        self.session.mount(f"{protocol}://", adapter)
+
+        self.init_auth(base_url, user, auth, token_cache, token_ttl)
+
+    def set_token(self, token):
+        self.token = token
+        self.session.auth = GlassfishTokenAuth(token) if token else self.basic_auth
+
+    def login_request(self, timeout):
+        try:
+            response = self.session.post(self.sessions_url, json={}, auth=self.basic_auth, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise GlassfishConnectionError(f"Login to {self.sessions_url} failed: {str(e)}")
+        except requests.RequestException as e:
+            raise GlassfishRequestError(f"Login to {self.sessions_url} failed: {str(e)}")
+        return response.status_code, response.content
+
+    def logout_request(self, token):
+        try:
+            self.session.delete(f"{self.sessions_url}/{token}", timeout=self.timeout)
+        except requests.RequestException as e:
+            raise GlassfishRequestError(str(e))
+
+    def send(self, method, url, body=None, params=None, headers=None, timeout=None):
+        connect_timing.elapsed = 0.0
+        return super(RequestsTransport, self).send(method, url, body, params, headers, timeout)
+
+    # Envia uma tentativa. Retorna (resposta, bytes enviados, tempo ate o
+    # primeiro byte); falhas de conexao e timeouts viram GlassfishConnectionError
+    # para o cliente decidir se tenta de novo.
+    def send_once(self, method, url, body=None, params=None, headers=None, timeout=None):
+        sent = time.monotonic()
+        try:
+            # stream=True devolve a resposta assim que os cabecalhos chegam,
+            # o que separa o tempo ate o primeiro byte do tempo total
+            response = self.session.request(method, url, json=body, params=params, headers=headers,
+                                            timeout=timeout, stream=True)
+            ttfb = time.monotonic() - sent
+            content = response.content
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise GlassfishConnectionError(str(e))
+        except requests.RequestException as e:
+            raise GlassfishRequestError(str(e))
+
+        bytes_out = len(response.request.body or b'')
+        return GlassfishResponse(response.status_code, response.headers, content, url, wire_size(response)), bytes_out, ttfb
+
+    def connect_time(self):
+        return getattr(connect_timing, 'elapsed', 0.0)
+
+    def close_connections(self):
+        self.session.close()
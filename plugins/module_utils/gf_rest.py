@@ -0,0 +1,775 @@
+# Cliente REST compartilhado pelos modulos gf_* para falar com a API de
+# administracao do DAS (/management/domain).
+#
+# O envio das requisicoes fica a cargo de um transporte: HttpClientTransport
+# (gf_http, padrao) e RequestsTransport (gf_requests, http_backend: requests)
+# abrem um pool de conexoes keep-alive direto do modulo ate o DAS; com
+# connection: httpapi, HttpApiTransport (gf_httpapi) passa as chamadas pela
+# conexao persistente do Ansible, que sobrevive entre as tasks da play. Cache,
+# novas tentativas, prazo total e metricas sao tratados aqui, iguais para todos
+# os transportes.
+
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ansible.module_utils.basic import env_fallback
+from ansible.module_utils.gf_cache import (FingerprintStore, ResponseCache, SessionTokenCache, DEFAULT_CACHE_MAX_ENTRIES,
+                                           DEFAULT_CACHE_TTL)
+from ansible.module_utils.gf_metrics import RequestMetrics
+from ansible.module_utils.gf_plan import discard_plan, load_plan, plan_steps, save_plan
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+DEFAULT_HEADERS = {
+    "Accept": "application/json",
+    "X-Requested-By": "GlassFish REST HTML interface"
+}
+
+# Tamanho padrao do pool de conexoes mantidas abertas com o DAS
+DEFAULT_POOL_MAXSIZE = 10
+
+# Numero padrao de requisicoes simultaneas nas operacoes em lote
+DEFAULT_MAX_WORKERS = 4
+
+# Timeouts (segundos) e novas tentativas
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 10
+DEFAULT_DEADLINE = 600
+
+# Comandos administrativos sincronos que podem levar minutos no DAS (criar um
+# node ou instancia, start/stop). Sem read_timeout explicito eles esperam a
+# resposta sem limite proprio, so com o que resta do deadline.
+LONG_RUNNING_COMMANDS = ('create-instance', 'delete-instance', 'create-node-ssh', 'delete-node-ssh',
+                         'start-instance', 'stop-instance', 'restart-instance', 'start-cluster', 'stop-cluster')
+
+# Validade do token de sessao REST guardado no cache. Fica abaixo do timeout
+# de sessao padrao do DAS (30 minutos sem uso).
+DEFAULT_TOKEN_TTL = 1500
+
+# Recursos cujas entidades trazem senhas (adminPassword do host JMS, password
+# do ssh-auth de um node): as leituras deles nunca vao para o cache em disco
+SECRET_RESOURCES = ('jms-service/jms-host', 'ssh-connector/ssh-auth')
+
+# Respostas do DAS que indicam falha temporaria (ex.: ocupado gravando o domain.xml)
+RETRY_STATUS_CODES = (502, 503, 504)
+
+
+# module.debug com a mensagem montada so quando o debug do Ansible esta ligado.
+# message pode ser uma funcao sem argumentos, para que corpos de resposta e
+# estruturas grandes nao sejam formatados a toa.
+def debug(module, message):
+    if getattr(module, '_debug', False):
+        module.debug(message() if callable(message) else message)
+
+
+# Opcoes comuns a todos os modulos gf_*, tratadas pelo GlassfishClient
+def glassfish_argument_spec():
+    return dict(
+        cache_dir=dict(type='path'),
+        cache_ttl=dict(type='int', default=DEFAULT_CACHE_TTL),
+        cache_max_entries=dict(type='int', default=DEFAULT_CACHE_MAX_ENTRIES),
+        connect_timeout=dict(type='float', default=DEFAULT_CONNECT_TIMEOUT),
+        read_timeout=dict(type='float'),
+        retries=dict(type='int', default=DEFAULT_RETRIES),
+        retry_backoff=dict(type='float', default=DEFAULT_RETRY_BACKOFF),
+        deadline=dict(type='float'),
+        rate_limit=dict(type='float', default=0),
+        auth=dict(type='str', choices=['token', 'basic']),
+        http_backend=dict(type='str', default='builtin', choices=['builtin', 'requests']),
+        noop_probe=dict(type='bool', default=False),
+        plan_file=dict(type='path'),
+        apply_plan=dict(type='bool', default=False),
+        token_ttl=dict(type='int', default=DEFAULT_TOKEN_TTL),
+        metrics=dict(type='bool', default=False),
+        trace_file=dict(type='path', fallback=(env_fallback, ['GLASSFISH_TRACE_FILE'])),
+    )
+
+
+class GlassfishRequestError(Exception):
+    pass
+
+
+# Ordem das escritas registradas no plano do check mode. Cada escrita recebe
+# um passo maior que o das escritas feitas antes dela na mesma thread; uma
+# tarefa enviada a um pool de threads comeca no passo de quem a enviou. No
+# apply, as escritas de um mesmo passo saem em paralelo e os passos em ordem.
+_write_step = threading.local()
+
+
+def current_write_step():
+    return getattr(_write_step, 'step', 0)
+
+
+def set_write_step(step):
+    _write_step.step = step
+
+
+# Envolve uma tarefa de um pool de threads: as escritas dela vem depois do
+# passo floor e o passo final da tarefa e entregue a done
+def step_task(func, floor, done):
+    def call(*args):
+        set_write_step(floor)
+        try:
+            return func(*args)
+        finally:
+            done(current_write_step())
+    return call
+
+
+# Falha de conexao ou timeout: a requisicao pode ser repetida
+class GlassfishConnectionError(GlassfishRequestError):
+    pass
+
+
+class GlassfishHTTPError(GlassfishRequestError):
+    def __init__(self, msg, response):
+        super(GlassfishHTTPError, self).__init__(msg)
+        self.response = response
+
+
+class GlassfishResponse(object):
+    def __init__(self, status_code, headers, content, url, wire_size=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        # Bytes recebidos do DAS, antes de descomprimir o corpo
+        self.wire_size = wire_size if wire_size is not None else len(content or b'')
+
+    @property
+    def ok(self):
+        return 200 <= self.status_code < 400
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    # Decodifica o corpo e libera os bytes, para leituras grandes consumidas uma
+    # vez so: bytes e texto nao ficam na memoria ao mesmo tempo
+    def take_text(self):
+        text = self.text
+        self.content = b''
+        return text
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise GlassfishHTTPError(f"HTTP {self.status_code} for URL {self.url}", self)
+
+
+# Base dos transportes que falam direto com o DAS. Com auth=token o transporte
+# faz um unico login em /management/sessions e envia o token (cookie
+# gfresttoken) nas demais requisicoes, em vez de Basic auth em todas, que custa
+# uma consulta ao realm no DAS por requisicao. As subclasses implementam
+# send_once, login_request, logout_request, connect_time e close_connections.
+class TokenAuthTransport(object):
+    def init_auth(self, base_url, user, auth='token', token_cache=None, token_ttl=DEFAULT_TOKEN_TTL):
+        # Sessao REST: o login acontece na primeira requisicao
+        self.use_token = auth == 'token'
+        self.sessions_url = base_url.rsplit('/', 1)[0] + '/sessions'
+        self.token_key = f"{self.sessions_url} {user}"
+        self.token_cache = token_cache
+        self.token_ttl = token_ttl
+        self.token = None
+        self.token_lock = threading.Lock()
+        self.timeout = None
+        if self.use_token and token_cache is not None:
+            self.set_token(token_cache.lookup(self.token_key))
+
+    def set_token(self, token):
+        self.token = token
+
+    # POST /management/sessions com Basic auth. Se o DAS nao devolver um token
+    # (sem o recurso de sessoes, credenciais recusadas) o transporte passa a
+    # usar Basic auth em todas as requisicoes e o erro, se houver, aparece na
+    # propria requisicao.
+    def login(self, timeout, stale_token=None):
+        with self.token_lock:
+            if not self.use_token or (self.token is not None and self.token != stale_token):
+                # Outra thread ja fez o login (ou desistiu dele)
+                return
+            status_code, content = self.login_request(timeout)
+
+            token = None
+            if status_code == 200:
+                try:
+                    token = json.loads(content).get('extraProperties', {}).get('token')
+                except ValueError:
+                    token = None
+            if token is None:
+                self.use_token = False
+                self.set_token(None)
+                return
+
+            self.set_token(token)
+            if self.token_cache is not None:
+                self.token_cache.store(self.token_key, token, self.token_ttl)
+
+    def send(self, method, url, body=None, params=None, headers=None, timeout=None):
+        self.timeout = timeout
+        if self.use_token and self.token is None:
+            self.login(timeout)
+
+        token = self.token
+        response, bytes_out, ttfb = self.send_once(method, url, body, params, headers, timeout)
+        if response.status_code == 401 and token is not None:
+            # Token vencido ou revogado no DAS: novo login e a requisicao de novo
+            if self.token_cache is not None:
+                self.token_cache.discard(self.token_key)
+            self.login(timeout, stale_token=token)
+            response, bytes_out, ttfb = self.send_once(method, url, body, params, headers, timeout)
+        return response, bytes_out, ttfb
+
+    # Sem cache o token e descartado no fim da task (logout). Com cache ele
+    # continua valido para as proximas tasks e sua validade e renovada.
+    def close(self):
+        token = self.token
+        if token is not None:
+            if self.token_cache is not None:
+                self.token_cache.store(self.token_key, token, self.token_ttl)
+            else:
+                try:
+                    self.logout_request(token)
+                except GlassfishRequestError:
+                    pass
+            self.set_token(None)
+            self.use_token = False
+        self.close_connections()
+
+
+# Limita o inicio das requisicoes a no maximo rate por segundo, espacando-as
+# igualmente entre as threads que usam o mesmo cliente
+class RateLimiter(object):
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class GlassfishClient(object):
+    def __init__(self, module, host, port, user, password, protocol='https', validate_certs=False,
+                 pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        self.module = module
+        self.validate_certs = validate_certs
+
+        # Os transportes sao importados sob demanda: so o requests backend
+        # importa requests
+        socket_path = getattr(module, '_socket_path', None)
+        if socket_path:
+            from ansible.module_utils.gf_httpapi import HttpApiTransport
+            self.transport = HttpApiTransport(socket_path)
+            user = user or self.transport.user()
+            if host and port:
+                self.base_url = f"{protocol}://{host}:{port}/management/domain"
+            else:
+                self.base_url = self.transport.base_url()
+        else:
+            if not (host and port and user and password):
+                module.fail_json(msg="The DAS host, port, user and password are required unless the task uses connection: httpapi.")
+            if module.params.get('http_backend', 'builtin') == 'requests':
+                from ansible.module_utils.gf_requests import RequestsTransport as transport_class
+            else:
+                from ansible.module_utils.gf_http import HttpClientTransport as transport_class
+            self.base_url = f"{protocol}://{host}:{port}/management/domain"
+            # Com cache_dir o token de sessao e reaproveitado pelas proximas
+            # tasks. Sem cache, login + logout custariam dois round trips a mais
+            # por task do que o Basic auth economiza, entao o padrao e basic.
+            auth = module.params.get('auth') or ('token' if module.params.get('cache_dir') else 'basic')
+            token_cache = None
+            if module.params.get('cache_dir') and auth == 'token':
+                token_cache = SessionTokenCache(module.params['cache_dir'])
+            self.transport = transport_class(module, self.base_url, user, password, protocol, validate_certs, pool_maxsize,
+                                             auth=auth, token_cache=token_cache,
+                                             token_ttl=module.params.get('token_ttl', DEFAULT_TOKEN_TTL))
+
+        # Cache opcional de leituras, compartilhado entre as tasks da play
+        self.cache = None
+        self.reads = []
+        cache_dir = module.params.get('cache_dir')
+        if cache_dir:
+            self.cache = ResponseCache(cache_dir, module.params.get('cache_ttl', DEFAULT_CACHE_TTL),
+                                       module.params.get('cache_max_entries', DEFAULT_CACHE_MAX_ENTRIES), user=user)
+
+        # Timeouts por requisicao, novas tentativas e prazo total da execucao
+        self.connect_timeout = module.params.get('connect_timeout') or DEFAULT_CONNECT_TIMEOUT
+        self.read_timeout = module.params.get('read_timeout')
+        self.retries = max(0, module.params.get('retries', DEFAULT_RETRIES))
+        self.retry_backoff = module.params.get('retry_backoff', DEFAULT_RETRY_BACKOFF)
+        # Sem deadline explicito o prazo padrao soma as esperas do proprio
+        # modulo (job_timeout, health_timeout), que nao podem ser cortadas por ele
+        self.deadline = module.params.get('deadline')
+        self.deadline_is_default = self.deadline is None
+        if self.deadline_is_default:
+            self.deadline = DEFAULT_DEADLINE + sum(max(0, module.params.get(wait) or 0)
+                                                   for wait in ('job_timeout', 'health_timeout'))
+        self.started_at = time.monotonic()
+
+        # Requisicoes por segundo ao DAS (rate_limit: 0 desativa)
+        self.rate_limiter = None
+        if module.params.get('rate_limit'):
+            self.rate_limiter = RateLimiter(module.params['rate_limit'])
+
+        # Tentativas e tempo gasto por endpoint, exibidos quando a task falha
+        self.endpoints = {}
+        self.lock = threading.Lock()
+
+        # Tempos de cada round trip, para o bloco 'metrics' e o arquivo de trace
+        self.metrics = RequestMetrics()
+
+        # Check mode: as escritas nao vao ao DAS, entram no plano
+        self.planning = module.check_mode
+        self.plan_writes = []
+        self.plan_version = None
+        self.plan_deferred = []
+        self.plan_file = module.params.get('plan_file')
+
+        # Caminho rapido sem mudancas (noop_probe): impressao digital dos
+        # parametros e versao da configuracao do DAS, registradas em cache_dir
+        self.fingerprints = None
+        self.fingerprint = None
+        self.noop_recording = False
+        self.config_version = None
+        # Jobs detached enviados e ainda nao terminados (job_timeout: 0 ou
+        # esgotado): enquanto houver algum, a versao nao e registrada
+        self.unfinished_jobs = set()
+        if module.params.get('noop_probe'):
+            if cache_dir:
+                self.fingerprints = FingerprintStore(cache_dir)
+            else:
+                module.warn("noop_probe requires cache_dir; running without the fast no-op path.")
+
+    # Monta a URL completa a partir de um caminho relativo a /management/domain
+    def url(self, path=''):
+        path = path.lstrip('/')
+        if not path:
+            return self.base_url
+        return f"{self.base_url}/{path}"
+
+    # Tempo que ainda resta do prazo total (None sem deadline)
+    def remaining_time(self):
+        if not self.deadline:
+            return None
+        return self.deadline - (time.monotonic() - self.started_at)
+
+    # Estende o prazo padrao para uma espera longa conhecida pelo modulo (ex.:
+    # os health gates de um rolling). Com deadline explicito retorna False se
+    # a espera nao cabe no que resta do prazo.
+    def reserve_time(self, seconds):
+        remaining = self.remaining_time()
+        if remaining is None or remaining >= seconds:
+            return True
+        if not self.deadline_is_default:
+            return False
+        self.deadline += seconds - remaining
+        return True
+
+    # Timeout de leitura da requisicao: read_timeout quando informado; sem ele,
+    # nenhum para os comandos demorados e DEFAULT_READ_TIMEOUT para os demais
+    def _read_timeout(self, url):
+        if self.read_timeout:
+            return self.read_timeout
+        command = url.split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+        return None if command in LONG_RUNNING_COMMANDS else DEFAULT_READ_TIMEOUT
+
+    # Timeout da proxima tentativa, limitado pelo que resta do prazo total
+    def _timeout(self, method, url):
+        read_timeout = self._read_timeout(url)
+        remaining = self.remaining_time()
+        if remaining is None:
+            return (self.connect_timeout, read_timeout)
+        if remaining <= 0:
+            raise GlassfishRequestError(f"Deadline of {self.deadline:.0f}s exceeded before {method} {url}")
+        return (min(self.connect_timeout, remaining), min(read_timeout, remaining) if read_timeout else remaining)
+
+    # Espera antes de uma nova tentativa: backoff exponencial com jitter. Retorna
+    # False se a espera passaria do prazo total.
+    def _wait_before_retry(self, attempt):
+        delay = random.uniform(0, min(MAX_RETRY_BACKOFF, self.retry_backoff * 2 ** (attempt - 1)))
+        if self.deadline and time.monotonic() - self.started_at + delay >= self.deadline:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _endpoint(self, url):
+        if url.startswith(self.base_url):
+            return url[len(self.base_url):] or '/'
+        return url
+
+    def _record(self, method, url, attempts, elapsed, status=None, error=None):
+        endpoint = f"{method} {self._endpoint(url)}"
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, dict(requests=0, attempts=0, elapsed=0.0))
+            stats['requests'] += 1
+            stats['attempts'] += attempts
+            stats['elapsed'] = round(stats['elapsed'] + elapsed, 3)
+            stats['last_status'] = status
+            if error is not None:
+                stats['last_error'] = error
+
+    # GETs e POSTs marcados como idempotentes sao repetidos em falhas de conexao
+    # e em 502/503/504. Os demais sao enviados uma unica vez.
+    def request(self, method, url, json=None, params=None, headers=None, idempotent=None):
+        if idempotent is None:
+            idempotent = method == 'GET'
+        max_attempts = self.retries + 1 if idempotent else 1
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+            try:
+                timeout = self._timeout(method, url)
+            except GlassfishRequestError as e:
+                self._record(method, url, attempt, time.monotonic() - started, error=str(e))
+                raise
+
+            sent = time.monotonic()
+            try:
+                response, bytes_out, ttfb = self.transport.send(method, url, body=json, params=params,
+                                                                headers=headers, timeout=timeout)
+            except GlassfishConnectionError as e:
+                error = e
+                response = None
+            except GlassfishRequestError as e:
+                self._trace(method, url, attempt, None, sent, None, self._body_size(json), error=str(e))
+                self._record(method, url, attempt, time.monotonic() - started, error=str(e))
+                raise
+
+            if response is None:
+                self._trace(method, url, attempt, None, sent, None, self._body_size(json), error=str(error))
+            else:
+                self._trace(method, url, attempt, response, sent, ttfb, bytes_out)
+
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                break
+            if attempt >= max_attempts or not self._wait_before_retry(attempt):
+                break
+
+        elapsed = time.monotonic() - started
+        if response is None:
+            self._record(method, url, attempt, elapsed, error=str(error))
+            raise GlassfishRequestError(f"{str(error)} (after {attempt} attempts, {elapsed:.1f}s)")
+
+        self._record(method, url, attempt, elapsed, status=response.status_code)
+        return response
+
+    # Tamanho estimado do corpo quando a tentativa falha antes de haver resposta
+    def _body_size(self, body):
+        return len(json.dumps(body)) if body is not None else 0
+
+    def _trace(self, method, url, attempt, response, sent, ttfb, bytes_out, error=None):
+        total = time.monotonic() - sent
+        bytes_in = response.wire_size if response is not None else 0
+        self.metrics.record(method, self._endpoint(url), attempt, response.status_code if response is not None else None,
+                            self.transport.connect_time(), ttfb if ttfb is not None else total, total,
+                            bytes_out, bytes_in, error=error)
+
+    def get(self, url, params=None, cache=True):
+        if self.cache is None or not cache or any(f"/{resource}" in url for resource in SECRET_RESOURCES):
+            return self.request('GET', url, params=params)
+
+        cache_url = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+        entry = self.cache.lookup(cache_url)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.reads.append(dict(url=cache_url, source='cache'))
+            return GlassfishResponse(200, {}, entry['body'].encode('utf-8'), url)
+
+        # Entrada vencida: pergunta ao DAS se ela ainda vale
+        headers = {}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.request('GET', url, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.refresh(cache_url, entry)
+            self.reads.append(dict(url=cache_url, source='revalidated'))
+            return GlassfishResponse(200, response.headers, entry['body'].encode('utf-8'), url)
+
+        self.reads.append(dict(url=cache_url, source='network'))
+        if response.status_code == 200:
+            self.cache.store(cache_url, response.headers.get('ETag'), response.headers.get('Last-Modified'), response.content)
+        return response
+
+    def post(self, url, json=None, params=None, idempotent=False):
+        if self.planning:
+            return self._plan_write('POST', url, json, params, idempotent)
+        try:
+            return self.request('POST', url, json=json, params=params, idempotent=idempotent)
+        finally:
+            self.invalidate(url)
+
+    def delete(self, url, json=None, params=None):
+        if self.planning:
+            return self._plan_write('DELETE', url, json, params, False)
+        try:
+            return self.request('DELETE', url, json=json, params=params)
+        finally:
+            self.invalidate(url)
+
+    # Registra a escrita no plano e responde como o DAS responderia a um
+    # comando bem-sucedido
+    def _plan_write(self, method, url, body, params, idempotent):
+        step = current_write_step() + 1
+        set_write_step(step)
+        with self.lock:
+            self.plan_writes.append(dict(step=step, method=method, path=self._endpoint(url), body=body,
+                                         params=params or None, idempotent=idempotent))
+        return GlassfishResponse(200, {}, b'{"exit_code": "SUCCESS", "message": "Planned (check mode)."}', url)
+
+    # Operacoes cujas escritas so podem ser calculadas depois de outras
+    # escritas do plano: o plano fica incompleto e nao pode ser aplicado
+    def defer_plan(self, operations):
+        self.plan_deferred.extend(operations)
+
+    # Descarta do cache as leituras da subarvore afetada por uma escrita. Comandos
+    # no topo do dominio (ex.: create-instance) alteram varias subarvores, entao
+    # invalidam todo o cache deste DAS. Criar ou remover um cluster tambem: o
+    # DAS cria ou remove junto a configuracao <cluster>-config em configs/. O
+    # delete-instance remove a instancia tambem da lista do cluster.
+    def invalidate(self, url):
+        if self.cache is None:
+            return
+        path = url[len(self.base_url):].strip('/') if url.startswith(self.base_url) else ''
+        segments = path.split('/')
+        if (segments[:2] == ['clusters', 'cluster'] and len(segments) <= 3) or segments[-1] == 'delete-instance':
+            self.cache.invalidate(self.base_url)
+        elif len(segments) > 1:
+            self.cache.invalidate(f"{self.base_url}/{segments[0]}/")
+        else:
+            self.cache.invalidate(self.base_url)
+
+    # Versao da configuracao do DAS: ETag ou Last-Modified do recurso raiz
+    # /management/domain, que mudam quando o domain.xml e alterado. None quando
+    # o DAS nao informa nenhum dos dois (o caminho rapido fica desligado).
+    def probe_config_version(self):
+        try:
+            response = self.request('GET', self.base_url)
+        except GlassfishRequestError:
+            return None
+        if response.status_code != 200:
+            return None
+        return response.headers.get('ETag') or response.headers.get('Last-Modified')
+
+    # Parametros que definem o estado desejado; opcoes de conexao, cache,
+    # timeouts e paralelismo nao mudam o resultado e ficam de fora
+    def _fingerprint(self):
+        ignored = set(glassfish_argument_spec()) | {'max_workers', 'poll_interval', 'job_timeout', 'das_hosts',
+                                                    'das_max_workers'}
+        params = {key: value for key, value in self.module.params.items() if key not in ignored}
+        data = json.dumps(dict(base_url=self.base_url, params=params), sort_keys=True, default=str)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    # Com noop_probe, encerra a task com changed=false quando os parametros e a
+    # versao da configuracao do DAS sao os mesmos da ultima execucao
+    # bem-sucedida, sem as leituras de descoberta. Chamado por begin().
+    def skip_if_unchanged(self):
+        if self.fingerprints is None:
+            return
+        self.noop_recording = True
+        self.config_version = self.plan_version if self.planning else self.probe_config_version()
+        if self.config_version is not None and self.fingerprints.lookup(self.fingerprint) == self.config_version:
+            self.exit_json(changed=False, msg="No changes: parameters and DAS configuration unchanged since the last run.",
+                           noop_probe=dict(version=self.config_version, skipped=True))
+
+    # Inicio da reconciliacao, chamado pelos modulos antes de qualquer leitura:
+    # com apply_plan executa o plano gravado e encerra a task; em check mode le
+    # a versao da configuracao em que o plano se baseia; por fim tenta o
+    # caminho rapido do noop_probe. plan=False para operacoes que nao podem ser
+    # planejadas (as escritas dependem do estado em execucao). A impressao
+    # digital dos parametros e calculada aqui, uma vez so, antes de o modulo
+    # comecar a trabalhar.
+    def begin(self, noop_probe=True, plan=True):
+        self.fingerprint = self._fingerprint()
+        if self.module.params.get('apply_plan'):
+            if not plan:
+                self.fail_json(msg="apply_plan is not supported for this operation: its writes depend on runtime state.")
+            self.apply_plan()
+        if self.planning:
+            self.plan_version = self.probe_config_version()
+        if noop_probe:
+            self.skip_if_unchanged()
+
+    def _plan(self):
+        # Passos renumerados a partir de 1
+        numbers = {step: index + 1 for index, step in enumerate(sorted(set(write['step'] for write in self.plan_writes)))}
+        writes = [dict(write, step=numbers[write['step']]) for write in sorted(self.plan_writes, key=lambda write: write['step'])]
+        return dict(module=getattr(self.module, '_name', None), base_url=self.base_url, version=self.plan_version,
+                    fingerprint=self.fingerprint or self._fingerprint(), complete=not self.plan_deferred, deferred=self.plan_deferred,
+                    writes=writes)
+
+    # Executa as escritas do plano gravado em plan_file, sem leituras de
+    # descoberta: le apenas a versao da configuracao para confirmar que o DAS
+    # nao mudou desde o check mode. Se uma escrita falhar, os passos seguintes
+    # nao sao executados.
+    def apply_plan(self):
+        if not self.plan_file:
+            self.fail_json(msg="apply_plan requires plan_file.")
+        plan = load_plan(self.plan_file, self.base_url)
+        if plan is None:
+            self.fail_json(msg=f"No plan for {self.base_url} in {self.plan_file}; run the task in check mode with plan_file first.")
+        if plan.get('fingerprint') != self.fingerprint:
+            self.fail_json(msg="The plan was made with different task parameters; run the task in check mode again.")
+        if not plan.get('complete'):
+            self.fail_json(msg=f"The plan is incomplete: {', '.join(plan.get('deferred', []))} depend on resources it creates; "
+                               "run the task without apply_plan.")
+
+        version = self.probe_config_version()
+        if version is None or plan.get('version') is None:
+            self.fail_json(msg="Cannot apply the plan: the DAS reports no ETag or Last-Modified for /management/domain, "
+                               "so it is not possible to confirm that the configuration did not change since the plan "
+                               "was made; run the task without apply_plan.")
+        if version != plan.get('version'):
+            self.fail_json(msg=f"The DAS configuration changed since the plan was made (plan: {plan.get('version')}, "
+                               f"current: {version}); run the task in check mode again.")
+        if self.planning:
+            self.exit_json(changed=bool(plan['writes']), plan=plan,
+                           msg=f"{len(plan['writes'])} planned writes would be applied.")
+
+        results = []
+        halted = False
+        for writes in plan_steps(plan['writes']):
+            if halted:
+                results.extend(dict(method=write['method'], path=write['path'], status='skipped') for write in writes)
+                continue
+            for write, response, error in run_concurrently(self._apply_write, writes,
+                                                          self.module.params.get('max_workers') or DEFAULT_MAX_WORKERS):
+                result = dict(method=write['method'], path=write['path'], status='ok')
+                if error is None and not response.ok:
+                    error = f"Status code: {response.status_code}, Response: {response.text}"
+                if error is not None:
+                    result.update(status='failed', msg=str(error))
+                    halted = True
+                results.append(result)
+
+        applied = sum(1 for result in results if result['status'] == 'ok')
+        if halted:
+            self.fail_json(msg=f"Plan halted: {sum(1 for r in results if r['status'] == 'failed')} of {len(results)} writes failed.",
+                           changed=applied > 0, results=results)
+        try:
+            discard_plan(self.plan_file, self.base_url)
+        except OSError as e:
+            self.module.warn(f"Could not remove the applied plan from {self.plan_file}: {str(e)}")
+        self.exit_json(changed=applied > 0, results=results, msg=f"{applied} planned writes applied.")
+
+    def _apply_write(self, write):
+        url = self.base_url + write['path'] if write['path'] != '/' else self.base_url
+        if write['method'] == 'DELETE':
+            return self.delete(url, json=write['body'], params=write['params'])
+        return self.post(url, json=write['body'], params=write['params'], idempotent=write['idempotent'])
+
+    # Registra a versao da configuracao apos uma execucao bem-sucedida. Se a
+    # task mudou o dominio, a versao e lida de novo depois das escritas. Com
+    # jobs detached ainda rodando o dominio ainda vai mudar, e a versao lida
+    # agora pularia a proxima execucao antes de o job terminar.
+    def _record_fingerprint(self, changed):
+        self.noop_recording = False
+        if self.module.check_mode or self.unfinished_jobs:
+            return None
+        version = self.probe_config_version() if changed else self.config_version
+        if version is not None:
+            self.fingerprints.store(self.fingerprint, version)
+        return version
+
+    # Campos adicionados a todos os resultados do modulo
+    def result_extras(self):
+        extras = {}
+        if self.cache is not None:
+            extras['cache_reads'] = self.reads
+        if self.module.params.get('metrics'):
+            extras['metrics'] = self.metrics.summary()
+        trace_file = self.module.params.get('trace_file')
+        if trace_file:
+            try:
+                self.metrics.write_trace(trace_file, getattr(self.module, '_name', None), self.base_url)
+            except OSError as e:
+                self.module.warn(f"Could not write GlassFish trace file {trace_file}: {str(e)}")
+        return extras
+
+    # Fecha o cliente e monta o resultado final da task
+    def result(self, kwargs, failed=False):
+        if not failed and self.noop_recording and 'noop_probe' not in kwargs:
+            kwargs['noop_probe'] = dict(version=self._record_fingerprint(kwargs.get('changed')), skipped=False)
+        if not failed and self.planning and 'plan' not in kwargs:
+            kwargs['plan'] = self._plan()
+            if self.plan_file and self.plan_version is None:
+                # Sem versao o plano nao poderia ser conferido no apply_plan
+                self.module.warn(f"The plan was not written to {self.plan_file}: the DAS reports no ETag or "
+                                 "Last-Modified for /management/domain, so it could not be applied with apply_plan.")
+            elif self.plan_file:
+                try:
+                    save_plan(self.plan_file, self.base_url, kwargs['plan'])
+                except OSError as e:
+                    self.module.warn(f"Could not write plan file {self.plan_file}: {str(e)}")
+        self.close()
+        kwargs.update(self.result_extras())
+        if failed:
+            kwargs['endpoints'] = self.endpoints
+        return kwargs
+
+    def exit_json(self, **kwargs):
+        result = self.result(kwargs)
+        if result.get('failed'):
+            self.module.fail_json(**result)
+        self.module.exit_json(**result)
+
+    def fail_json(self, **kwargs):
+        self.module.fail_json(**self.result(kwargs, failed=True))
+
+    # Encerra o transporte (logout da sessao REST quando o token nao fica em cache)
+    def close(self):
+        self.transport.close()
+
+
+# Executa func(item) para cada item num pool de threads limitado. Retorna uma
+# lista de tuplas (item, resultado, erro) na mesma ordem dos itens, sem
+# interromper os demais itens quando um deles falha.
+def run_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    items = list(items)
+    if not items:
+        return []
+
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    # Os itens sao independentes: todos comecam no passo de escrita atual e o
+    # chamador segue a partir do maior passo entre eles
+    steps = [current_write_step()]
+    call = step_task(call, steps[0], steps.append)
+
+    workers = max(1, min(max_workers, len(items)))
+    if workers == 1:
+        results = [call(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(call, items))
+    set_write_step(max(steps))
+    return results
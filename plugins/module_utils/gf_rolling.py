@@ -0,0 +1,195 @@
+# Start/stop/restart das instancias de um cluster em lotes (rolling).
+#
+# As instancias sao divididas em lotes de tamanho fixo (batch_size) ou
+# proporcional ao cluster (batch_percent). Os comandos de um lote saem em
+# paralelo (max_workers) e o lote so termina quando o list-instances do cluster
+# mostra todas as instancias no estado esperado (health gate). Falhas acima de
+# max_failures interrompem o rolling; no restart, min_available garante um
+# minimo de instancias RUNNING durante todo o processo.
+
+import math
+import time
+
+from ansible.module_utils.gf_rest import GlassfishRequestError, DEFAULT_MAX_WORKERS, run_concurrently
+from ansible.module_utils.gf_domain import read_json_array
+from ansible.module_utils.gf_jobs import (DEFAULT_JOB_TIMEOUT, DEFAULT_POLL_INTERVAL, MAX_POLL_INTERVAL,
+                                          submit_detached, wait_for_jobs)
+
+DEFAULT_HEALTH_TIMEOUT = 300
+
+LIFECYCLE_STATES = ('started', 'stopped', 'restarted')
+
+
+def rolling_argument_spec():
+    return dict(
+        batch_size=dict(type='int'),
+        batch_percent=dict(type='int'),
+        max_failures=dict(type='int', default=0),
+        min_available=dict(type='int', default=0),
+        health_timeout=dict(type='int', default=DEFAULT_HEALTH_TIMEOUT),
+    )
+
+
+def is_running(status):
+    # O list-instances pode trazer "RUNNING; requires restart"
+    return str(status or '').upper().startswith('RUNNING')
+
+
+def list_instance_status(client, cluster_name):
+    # Sem cache: o status muda a cada consulta
+    response = client.get(client.url(f"clusters/cluster/{cluster_name}/list-instances"), cache=False)
+    if not response.ok:
+        raise GlassfishRequestError(f"Failed to list instances of cluster '{cluster_name}'. Status code: {response.status_code}, Response: {response.text}")
+    return {instance['name']: instance.get('status') for instance in read_json_array(response, 'instanceList')
+            if 'name' in instance}
+
+
+# Comando de cada instancia para o estado pedido; None quando ela ja esta nele.
+# No restart as instancias paradas recebem start-instance.
+def instance_command(state, status):
+    if state == 'started':
+        return None if is_running(status) else 'start-instance'
+    if state == 'stopped':
+        return 'stop-instance' if is_running(status) else None
+    return 'restart-instance' if is_running(status) else 'start-instance'
+
+
+def batch_limit(total, batch_size=None, batch_percent=None):
+    if batch_percent is not None:
+        return max(1, int(math.ceil(total * batch_percent / 100.0)))
+    return max(1, batch_size or 1)
+
+
+# Divide as instancias em lotes. No restart as instancias paradas vem primeiro
+# (aumentam a capacidade) e um lote nunca derruba mais instancias RUNNING do
+# que o permitido por min_available.
+def plan_batches(state, statuses, batch_size=None, batch_percent=None, min_available=0):
+    pending = [(name, instance_command(state, status)) for name, status in statuses.items()]
+    pending = [(name, command) for name, command in pending if command is not None]
+    if state == 'restarted':
+        pending.sort(key=lambda item: item[1] == 'restart-instance')
+
+    limit = batch_limit(len(statuses), batch_size, batch_percent)
+    running = sum(1 for status in statuses.values() if is_running(status))
+    batches = []
+    while pending:
+        batch = []
+        while pending and len(batch) < limit:
+            name, command = pending[0]
+            if state == 'restarted' and command == 'restart-instance':
+                taken = sum(1 for _, c in batch if c == 'restart-instance')
+                if running - taken - 1 < min_available:
+                    break
+            batch.append(pending.pop(0))
+        if not batch:
+            raise GlassfishRequestError(
+                f"Cannot restart instance '{pending[0][0]}' without dropping below min_available={min_available} "
+                f"({running} instances running).")
+        # As instancias iniciadas neste lote contam como disponiveis nos proximos
+        running += sum(1 for _, command in batch if command == 'start-instance')
+        batches.append(batch)
+    return batches
+
+
+# Consulta o list-instances ate todas as instancias chegarem ao estado esperado
+# ou o timeout vencer, com intervalo crescente como em wait_for_jobs. Retorna o
+# ultimo status lido de todas as instancias do cluster.
+def wait_for_instances(client, cluster_name, names, running, timeout=DEFAULT_HEALTH_TIMEOUT,
+                       poll_interval=DEFAULT_POLL_INTERVAL):
+    deadline = time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        statuses = list_instance_status(client, cluster_name)
+        if all(is_running(statuses.get(name)) == running for name in names):
+            return statuses
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return statuses
+        time.sleep(min(interval, remaining))
+        interval = min(MAX_POLL_INTERVAL, interval * 1.5)
+
+
+def send_command(client, name, command, detached=False):
+    url = client.url(f"servers/server/{name}/{command}")
+    if detached:
+        return submit_detached(client, url, {}, name)
+    response = client.post(url, json={})
+    if response.status_code != 200:
+        raise GlassfishRequestError(f"Status code: {response.status_code}, Response: {response.text}")
+
+
+# Tempo maximo do rolling: cada lote pode esperar o job (detached) e o health
+# gate inteiros
+def rolling_time(batches, health_timeout, detached=False, job_timeout=DEFAULT_JOB_TIMEOUT):
+    return len(batches) * (health_timeout + (job_timeout if detached else 0))
+
+
+# Executa os lotes em ordem. Retorna (resultados por instancia, halted). As
+# instancias dos lotes nao executados apos a interrupcao aparecem como
+# 'skipped'. statuses e o list-instances lido antes do planejamento; ele e
+# atualizado a cada health gate para conferir min_available com o estado real
+# (uma instancia que nao voltou reduz a capacidade disponivel).
+def run_rolling(client, cluster_name, state, batches, statuses, max_workers=DEFAULT_MAX_WORKERS, max_failures=0,
+                min_available=0, health_timeout=DEFAULT_HEALTH_TIMEOUT, detached=False,
+                job_timeout=DEFAULT_JOB_TIMEOUT, poll_interval=DEFAULT_POLL_INTERVAL):
+    running = state != 'stopped'
+    results = {}
+    failures = 0
+    halted = False
+
+    for index, batch in enumerate(batches):
+        if not halted and state == 'restarted':
+            available = sum(1 for status in statuses.values() if is_running(status))
+            restarts = sum(1 for _, command in batch if command == 'restart-instance')
+            if restarts and available - restarts < min_available:
+                halted = True
+                for name, command in batch:
+                    results[name] = dict(name=name, command=command, batch=index, changed=False, failed=True,
+                                         status='failed',
+                                         msg=f"Not restarted: only {available} instances running, min_available is {min_available}.")
+                continue
+
+        if halted:
+            for name, command in batch:
+                results[name] = dict(name=name, command=command, batch=index, changed=False, failed=False,
+                                     status='skipped', msg="Skipped after the rolling was halted.")
+            continue
+
+        sent = []
+        jobs = []
+        for (name, command), job, error in run_concurrently(lambda item: send_command(client, item[0], item[1], detached),
+                                                           batch, max_workers):
+            if error is not None:
+                results[name] = dict(name=name, command=command, batch=index, changed=False, failed=True,
+                                     status='failed', msg=f"{command} failed. Error: {str(error)}")
+            else:
+                sent.append((name, command))
+                if job is not None:
+                    jobs.append(job)
+
+        if jobs:
+            for job in wait_for_jobs(client, jobs, job_timeout, max_workers, poll_interval):
+                if job['failed']:
+                    sent = [(name, command) for name, command in sent if name != job['name']]
+                    command = dict(batch)[job['name']]
+                    results[job['name']] = dict(name=job['name'], command=command, batch=index, changed=True, failed=True,
+                                                status='failed', job=job,
+                                                msg=f"{command} job {job['id']} ended with {job['state']}: {job['message']}")
+
+        # Health gate do lote
+        if sent:
+            statuses = wait_for_instances(client, cluster_name, [name for name, _ in sent], running,
+                                          health_timeout, poll_interval)
+            for name, command in sent:
+                healthy = is_running(statuses.get(name)) == running
+                results[name] = dict(name=name, command=command, batch=index, changed=True, failed=not healthy,
+                                     status='ok' if healthy else 'failed',
+                                     msg=f"Instance '{name}' is {statuses.get(name)}." if healthy else
+                                     f"Instance '{name}' did not reach {'RUNNING' if running else 'NOT_RUNNING'} "
+                                     f"within {health_timeout}s (status: {statuses.get(name)}).")
+
+        failures += sum(1 for name, _ in batch if results[name]['failed'])
+        if failures > max_failures:
+            halted = True
+
+    return [results[name] for batch in batches for name, _ in batch], halted
@@ -0,0 +1,43 @@
+# Os testes importam ansible.module_utils.gf_*, que ficam em plugins/module_utils,
+# e usam o mock do DAS e o runner de modulos do harness de benchmark
+
+import os
+import sys
+
+import pytest
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks')
+sys.path.insert(0, os.path.abspath(BENCHMARKS))
+
+import run_benchmarks  # noqa: E402
+from mock_das import MockDASServer  # noqa: E402
+
+run_benchmarks.setup_module_utils()
+
+
+# Sobe um mock do DAS para o dominio e o derruba no fim do teste
+@pytest.fixture
+def das():
+    servers = []
+
+    def start(domain, **kwargs):
+        server = MockDASServer(domain, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+# Executa o main() do modulo contra o mock e devolve o resultado da task
+@pytest.fixture
+def run_module():
+    modules = {}
+
+    def run(name, server, style='admin_port', **args):
+        if name not in modules:
+            modules[name] = run_benchmarks.load_module(name)
+        return run_benchmarks.run_main(modules[name], dict(run_benchmarks.connection(server.port, style), **args))
+
+    return run
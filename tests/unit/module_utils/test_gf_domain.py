@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from ansible.module_utils.gf_domain import diff_system_properties_delta, escape_system_property, iter_json_array
+
+
+def command_response(**extra):
+    return json.dumps(dict(message='', command='', exit_code='SUCCESS', extraProperties=extra))
+
+
+def test_iter_json_array_reads_items():
+    items = [dict(name=f"i{n}", status='RUNNING') for n in range(3)]
+    assert list(iter_json_array(command_response(instanceList=items), 'instanceList')) == items
+
+
+def test_iter_json_array_with_spaces_and_nesting():
+    text = '{"extraProperties": {"instanceList" :\n [ {"name": "a", "x": [1, {"y": "]"}]} ,\n{"name": "b"} ] }}'
+    assert [item['name'] for item in iter_json_array(text, 'instanceList')] == ['a', 'b']
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(command_response(clusterNames=[]), 'clusterNames')) == []
+
+
+def test_iter_json_array_falls_back_to_json_loads():
+    # Nome ausente ou com valor que nao e array: json.loads completo
+    assert list(iter_json_array(command_response(), 'systemProperties')) == []
+    text = json.dumps(dict(message='systemProperties', extraProperties=dict(systemProperties=[dict(name='a')])))
+    assert list(iter_json_array(text, 'systemProperties')) == [dict(name='a')]
+
+
+def test_iter_json_array_unterminated():
+    with pytest.raises(ValueError):
+        list(iter_json_array('{"extraProperties": {"instanceList": [{"name": "a"}', 'instanceList'))
+
+
+CURRENT = {
+    'a': dict(value='1', default_value=None),
+    'b': dict(value=None, default_value='2'),
+    'c': dict(value='3', default_value=None),
+}
+
+
+def test_delta_only_new_or_changed():
+    changed, to_set, to_delete = diff_system_properties_delta(CURRENT, [
+        dict(name='a', value='1'), dict(name='b', value='2'), dict(name='c', value='changed'), dict(name='d', value='4')])
+    assert changed
+    assert to_set == {'c': 'changed', 'd': '4'}
+    assert to_delete == []
+
+
+def test_delta_absent():
+    changed, to_set, to_delete = diff_system_properties_delta(CURRENT, [
+        dict(name='a', state='absent'), dict(name='missing', state='absent')])
+    assert (changed, to_set, to_delete) == (True, {}, ['a'])
+
+
+def test_delta_unchanged():
+    assert diff_system_properties_delta(CURRENT, [dict(name='a', value='1')]) == (False, {}, [])
+
+
+def test_escape_system_property():
+    assert escape_system_property('C:\\dir=x') == 'C\\:\\\\dir\\=x'
+    assert escape_system_property(None) == ''
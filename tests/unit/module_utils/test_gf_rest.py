@@ -0,0 +1,349 @@
+import json
+
+import pytest
+
+from ansible.module_utils import gf_rest
+from ansible.module_utils.gf_rest import (GlassfishClient, GlassfishConnectionError, GlassfishRequestError, GlassfishResponse,
+                                          TokenAuthTransport, glassfish_argument_spec)
+
+BASE_URL = 'http://das:4848/management/domain'
+
+
+class ModuleExit(Exception):
+    def __init__(self, result, failed):
+        super(ModuleExit, self).__init__(result.get('msg'))
+        self.result = result
+        self.failed = failed
+
+
+# AnsibleModule minimo: exit_json/fail_json levantam ModuleExit com o resultado
+class FakeModule(object):
+    _name = 'gf_test'
+
+    def __init__(self, check_mode=False, **params):
+        self.params = {key: spec.get('default') for key, spec in glassfish_argument_spec().items()}
+        self.params.update(params)
+        self.check_mode = check_mode
+        self.warnings = []
+
+    def warn(self, msg):
+        self.warnings.append(msg)
+
+    def exit_json(self, **kwargs):
+        raise ModuleExit(kwargs, failed=False)
+
+    def fail_json(self, **kwargs):
+        raise ModuleExit(kwargs, failed=True)
+
+
+def response(status=200, body=None, headers=None, url=BASE_URL):
+    content = json.dumps(body if body is not None else dict(exit_code='SUCCESS')).encode('utf-8')
+    return GlassfishResponse(status, headers or {}, content, url)
+
+
+# Transporte que responde com handler(method, url) e guarda as requisicoes
+class StubTransport(object):
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = []
+
+    def send(self, method, url, body=None, params=None, headers=None, timeout=None):
+        self.calls.append((method, url, body))
+        return self.handler(method, url), 0, 0.0
+
+    def connect_time(self):
+        return 0.0
+
+    def close(self):
+        pass
+
+
+def make_client(handler, check_mode=False, user='admin', **params):
+    module = FakeModule(check_mode=check_mode, **params)
+    client = GlassfishClient(module, 'das', 4848, user, 'secret', protocol='http')
+    client.transport = StubTransport(handler)
+    return client
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    # Sem esperas reais; guarda o intervalo sorteado para cada nova tentativa
+    ranges = []
+
+    def uniform(low, high):
+        ranges.append((low, high))
+        return high
+
+    monkeypatch.setattr(gf_rest.random, 'uniform', uniform)
+    monkeypatch.setattr(gf_rest.time, 'sleep', lambda seconds: None)
+    return ranges
+
+
+# Novas tentativas, jitter e deadline
+
+def test_get_is_retried_on_503_with_jittered_backoff(delays):
+    statuses = [503, 503, 200]
+    client = make_client(lambda method, url: response(statuses.pop(0)), retry_backoff=0.5)
+
+    assert client.get(client.url('clusters/cluster')).status_code == 200
+    assert client.endpoints['GET /clusters/cluster']['attempts'] == 3
+    # Espera sorteada entre 0 e o backoff exponencial de cada tentativa
+    assert delays == [(0, 0.5), (0, 1.0)]
+
+
+def test_backoff_is_capped(delays):
+    client = make_client(lambda method, url: response(503), retries=8, retry_backoff=1)
+
+    assert client.get(client.url('clusters/cluster')).status_code == 503
+    assert max(high for _, high in delays) == gf_rest.MAX_RETRY_BACKOFF
+
+
+def test_non_idempotent_post_is_sent_once(delays):
+    client = make_client(lambda method, url: response(503))
+
+    assert client.post(client.url('clusters/cluster'), json={'id': 'c1'}).status_code == 503
+    assert len(client.transport.calls) == 1
+    assert delays == []
+
+
+def test_connection_errors_exhaust_retries(delays):
+    def refuse(method, url):
+        raise GlassfishConnectionError('Connection refused')
+
+    client = make_client(refuse, retries=2)
+
+    with pytest.raises(GlassfishRequestError, match=r'Connection refused \(after 3 attempts'):
+        client.get(client.url('nodes/node'))
+    assert len(client.transport.calls) == 3
+
+
+def test_retry_that_would_pass_the_deadline_is_not_made(delays):
+    client = make_client(lambda method, url: response(503), deadline=1, retry_backoff=5)
+
+    assert client.get(client.url('clusters/cluster')).status_code == 503
+    assert len(client.transport.calls) == 1
+
+
+def test_request_after_the_deadline_fails_without_sending(delays):
+    client = make_client(lambda method, url: response())
+    client.deadline = 5
+    client.started_at -= 10
+
+    with pytest.raises(GlassfishRequestError, match='Deadline of 5s exceeded'):
+        client.get(client.url('clusters/cluster'))
+    assert client.transport.calls == []
+
+
+# Cache de leituras
+
+def test_write_invalidates_the_cached_subtree(tmp_path):
+    client = make_client(lambda method, url: response(body=dict(url=url)), cache_dir=str(tmp_path))
+    clusters = client.url('clusters/cluster/c1')
+    configs = client.url('configs/config/c1-config')
+
+    client.get(clusters)
+    client.get(configs)
+    client.post(client.url('clusters/cluster/c1/system-properties'), json={'a': '1'}, idempotent=True)
+    client.get(clusters)
+    client.get(configs)
+
+    assert [read['source'] for read in client.reads] == ['network', 'network', 'network', 'cache']
+
+
+def test_cluster_deletion_invalidates_the_whole_domain(tmp_path):
+    client = make_client(lambda method, url: response(), cache_dir=str(tmp_path))
+    configs = client.url('configs/config/c1-config')
+
+    client.get(configs)
+    client.delete(client.url('clusters/cluster/c1'))
+    client.get(configs)
+
+    assert [read['source'] for read in client.reads] == ['network', 'network']
+
+
+# Sessao REST
+
+class StubTokenTransport(TokenAuthTransport):
+    def __init__(self, valid_tokens, token_cache=None):
+        self.valid_tokens = valid_tokens
+        self.logins = 0
+        self.sent = []
+        self.init_auth(BASE_URL, 'admin', token_cache=token_cache)
+
+    def login_request(self, timeout):
+        self.logins += 1
+        token = f"t{self.logins}"
+        self.valid_tokens.add(token)
+        return 200, json.dumps(dict(extraProperties=dict(token=token)))
+
+    def logout_request(self, token):
+        self.valid_tokens.discard(token)
+
+    def send_once(self, method, url, body, params, headers, timeout):
+        self.sent.append(self.token)
+        return response(200 if self.token in self.valid_tokens else 401), 0, 0.0
+
+    def connect_time(self):
+        return 0.0
+
+    def close_connections(self):
+        pass
+
+
+def test_expired_token_triggers_a_new_login():
+    valid = set()
+    transport = StubTokenTransport(valid)
+
+    assert transport.send('GET', BASE_URL)[0].status_code == 200
+    valid.clear()
+    assert transport.send('GET', BASE_URL)[0].status_code == 200
+
+    assert transport.logins == 2
+    assert transport.sent == ['t1', 't1', 't2']
+
+
+def test_relogin_replaces_the_cached_token(tmp_path):
+    from ansible.module_utils.gf_cache import SessionTokenCache
+
+    cache = SessionTokenCache(str(tmp_path))
+    cache.store(f"{BASE_URL.rsplit('/', 1)[0]}/sessions admin", 'revoked', 60)
+    transport = StubTokenTransport(set(), token_cache=cache)
+
+    assert transport.send('GET', BASE_URL)[0].status_code == 200
+    assert transport.sent == ['revoked', 't1']
+    assert cache.lookup(transport.token_key) == 't1'
+
+
+# noop_probe
+
+def versioned(versions):
+    # GET na raiz devolve a versao atual da configuracao como ETag
+    def handler(method, url):
+        if method == 'GET' and url == BASE_URL:
+            return response(headers={'ETag': versions[0]})
+        return response()
+    return handler
+
+
+def run_task(client, changed=False):
+    with pytest.raises(ModuleExit) as exit:
+        client.begin()
+        client.exit_json(changed=changed)
+    return exit.value.result
+
+
+def test_noop_probe_records_and_skips(tmp_path):
+    versions = ['"v1"']
+    params = dict(cache_dir=str(tmp_path), noop_probe=True, cluster_name='c1')
+
+    assert run_task(make_client(versioned(versions), **params))['noop_probe'] == dict(version='"v1"', skipped=False)
+    assert run_task(make_client(versioned(versions), **params))['noop_probe'] == dict(version='"v1"', skipped=True)
+
+    # Outros parametros ou outra versao da configuracao: caminho normal
+    assert run_task(make_client(versioned(versions), **dict(params, cluster_name='c2')))['noop_probe']['skipped'] is False
+    versions[0] = '"v2"'
+    assert run_task(make_client(versioned(versions), **params))['noop_probe']['skipped'] is False
+
+
+def test_noop_probe_records_the_version_after_the_writes(tmp_path):
+    versions = ['"v1"']
+    params = dict(cache_dir=str(tmp_path), noop_probe=True, cluster_name='c1')
+    client = make_client(versioned(versions), **params)
+
+    with pytest.raises(ModuleExit) as exit:
+        client.begin()
+        client.post(client.url('clusters/cluster'), json={'id': 'c1'})
+        versions[0] = '"v2"'
+        client.exit_json(changed=True)
+
+    assert exit.value.result['noop_probe'] == dict(version='"v2"', skipped=False)
+    assert run_task(make_client(versioned(versions), **params))['noop_probe']['skipped'] is True
+
+
+def test_noop_probe_does_not_record_in_check_mode_or_with_unfinished_jobs(tmp_path):
+    versions = ['"v1"']
+    params = dict(cache_dir=str(tmp_path), noop_probe=True, cluster_name='c1')
+
+    assert run_task(make_client(versioned(versions), check_mode=True, **params))['noop_probe']['version'] is None
+    client = make_client(versioned(versions), **params)
+    client.unfinished_jobs.add('1')
+    assert run_task(client)['noop_probe']['version'] is None
+    assert run_task(make_client(versioned(versions), **params))['noop_probe']['skipped'] is False
+
+
+# Plano do check mode e apply_plan
+
+def plan_task(client):
+    with pytest.raises(ModuleExit) as exit:
+        client.begin()
+        client.post(client.url('clusters/cluster'), json={'id': 'c1'})
+        client.post(client.url('clusters/cluster/c1/system-properties'), json={'a': '1'}, idempotent=True)
+        client.exit_json(changed=True)
+    return exit.value.result
+
+
+def test_check_mode_plan_is_applied_without_discovery(tmp_path):
+    versions = ['"v1"']
+    params = dict(plan_file=str(tmp_path / 'plan.json'), cluster_name='c1')
+
+    planner = make_client(versioned(versions), check_mode=True, **params)
+    plan = plan_task(planner)['plan']
+    assert [write['path'] for write in plan['writes']] == ['/clusters/cluster', '/clusters/cluster/c1/system-properties']
+    assert [write['step'] for write in plan['writes']] == [1, 2]
+    assert [method for method, _, _ in planner.transport.calls] == ['GET']
+
+    client = make_client(versioned(versions), apply_plan=True, **params)
+    result = run_task(client, changed=True)
+    assert [r['status'] for r in result['results']] == ['ok', 'ok']
+    assert [(method, url) for method, url, _ in client.transport.calls] == [
+        ('GET', BASE_URL), ('POST', f"{BASE_URL}/clusters/cluster"), ('POST', f"{BASE_URL}/clusters/cluster/c1/system-properties")]
+
+
+def test_apply_plan_refuses_a_changed_domain(tmp_path):
+    versions = ['"v1"']
+    params = dict(plan_file=str(tmp_path / 'plan.json'), cluster_name='c1')
+    plan_task(make_client(versioned(versions), check_mode=True, **params))
+
+    versions[0] = '"v2"'
+    client = make_client(versioned(versions), apply_plan=True, **params)
+    result = run_task(client)
+    assert 'configuration changed since the plan was made' in result['msg']
+    assert [method for method, _, _ in client.transport.calls] == ['GET']
+
+
+def test_apply_plan_halts_after_a_failed_step(tmp_path):
+    versions = ['"v1"']
+    params = dict(plan_file=str(tmp_path / 'plan.json'), cluster_name='c1')
+    plan_task(make_client(versioned(versions), check_mode=True, **params))
+
+    def handler(method, url):
+        if method == 'POST':
+            return response(500, dict(exit_code='FAILURE', message='boom'))
+        return versioned(versions)(method, url)
+
+    result = run_task(make_client(handler, apply_plan=True, **params))
+    assert [r['status'] for r in result['results']] == ['failed', 'skipped']
+    assert result['msg'].startswith('Plan halted')
+
+
+def test_cache_entries_are_per_user(tmp_path):
+    first = make_client(lambda method, url: response(), cache_dir=str(tmp_path))
+    first.get(first.url('clusters/cluster'))
+
+    other = make_client(lambda method, url: response(), user='operator', cache_dir=str(tmp_path))
+    other.get(other.url('clusters/cluster'))
+    first.get(first.url('clusters/cluster'))
+
+    assert [read['source'] for read in other.reads] == ['network']
+    assert [read['source'] for read in first.reads] == ['network', 'cache']
+
+
+def test_resources_with_secrets_are_not_cached(tmp_path):
+    client = make_client(lambda method, url: response(body=dict(adminPassword='secret')), cache_dir=str(tmp_path))
+
+    client.get(client.url('configs/config/c1-config/jms-service/jms-host'), params={'expandLevel': 1})
+    client.get(client.url('configs/config/c1-config/jms-service/jms-host/default_JMS_host'))
+    client.get(client.url('nodes/node/n1/ssh-connector/ssh-auth'))
+
+    assert client.reads == []
+    assert not any('secret' in path.read_text() for path in tmp_path.glob('*.json'))
@@ -0,0 +1,56 @@
+import pytest
+
+from ansible.module_utils.gf_rest import GlassfishRequestError
+from ansible.module_utils.gf_rolling import plan_batches, rolling_time
+
+
+def statuses(running, stopped=0):
+    result = {f"i{n}": 'RUNNING' for n in range(running)}
+    result.update({f"s{n}": 'NOT_RUNNING' for n in range(stopped)})
+    return result
+
+
+def test_restart_one_instance_per_batch():
+    batches = plan_batches('restarted', statuses(3))
+    assert batches == [[('i0', 'restart-instance')], [('i1', 'restart-instance')], [('i2', 'restart-instance')]]
+
+
+def test_batch_percent_rounds_up():
+    batches = plan_batches('restarted', statuses(10), batch_percent=25)
+    assert [len(batch) for batch in batches] == [3, 3, 3, 1]
+
+
+def test_restart_starts_stopped_instances_first():
+    batches = plan_batches('restarted', statuses(2, stopped=1), batch_size=2)
+    assert batches[0] == [('s0', 'start-instance'), ('i0', 'restart-instance')]
+    assert batches[1] == [('i1', 'restart-instance')]
+
+
+def test_min_available_limits_the_batch():
+    batches = plan_batches('restarted', statuses(4), batch_size=4, min_available=2)
+    assert [len(batch) for batch in batches] == [2, 2]
+
+
+def test_started_instances_count_as_available():
+    # O start-instance do primeiro lote libera mais um restart no segundo
+    batches = plan_batches('restarted', statuses(2, stopped=1), batch_size=3, min_available=2)
+    assert [[command for _, command in batch] for batch in batches] == [['start-instance'], ['restart-instance'],
+                                                                        ['restart-instance']]
+
+
+def test_min_available_unreachable_fails():
+    with pytest.raises(GlassfishRequestError):
+        plan_batches('restarted', statuses(2), min_available=2)
+
+
+def test_started_and_stopped_skip_instances_already_there():
+    instances = dict(statuses(2, stopped=2), r='RUNNING; requires restart')
+    assert plan_batches('started', instances, batch_size=5) == [[('s0', 'start-instance'), ('s1', 'start-instance')]]
+    assert [name for name, _ in plan_batches('stopped', instances, batch_size=5)[0]] == ['i0', 'i1', 'r']
+    assert plan_batches('started', statuses(3)) == []
+
+
+def test_rolling_time():
+    batches = [[('i0', 'restart-instance')]] * 3
+    assert rolling_time(batches, 60) == 180
+    assert rolling_time(batches, 60, detached=True, job_timeout=30) == 270
@@ -0,0 +1,32 @@
+from mock_das import MockDomain
+
+
+# O usuario JMS nao contem a senha da conexao ('admin'), que o no_log mascara no resultado
+def build_domain():
+    domain = MockDomain.build(clusters=1, jms_hosts=2)
+    for host in domain.configs['cluster0-config']['jms_hosts'].values():
+        host['adminUserName'] = 'jmsuser'
+    return domain
+
+
+def test_jms_hosts_facts_leave_out_admin_password(das, run_module):
+    server = das(build_domain())
+
+    result = run_module('gf_domain_facts', server, gather_subset=['jms_hosts'])
+
+    hosts = result['ansible_facts']['glassfish_domain']['configs']['cluster0-config']['jms_hosts']
+    assert hosts['jms0'] == dict(host='mq0.example.com', port='7676', adminUserName='jmsuser')
+    assert all('adminPassword' not in host for host in hosts.values())
+
+
+def test_jms_host_with_snapshot_does_not_compare_password(das, run_module):
+    server = das(build_domain())
+    facts = run_module('gf_domain_facts', server, gather_subset=['jms_hosts'])['ansible_facts']['glassfish_domain']
+
+    args = dict(target='cluster0', jms_host_name='jms0', jms_host='mq0.example.com', port=7676,
+                jms_admin_user='jmsuser', domain_facts=facts)
+    assert run_module('gf_jms_host', server, **args)['changed'] is False
+
+    result = run_module('gf_jms_host', server, **dict(args, port=7677))
+    assert result['changed'] is True
+    assert result['update_body'] == dict(port=7677)
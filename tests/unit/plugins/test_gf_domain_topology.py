@@ -0,0 +1,33 @@
+import pytest
+
+from mock_das import MockDomain
+
+
+NODE = dict(node_sshuser_name='glassfish', node_path='/opt/glassfish/nodes', node_path_keyssh='')
+JMS_HOST = dict(jms_host='mq.example.com', port=7676)
+
+
+def instance(name, portbase=28000):
+    return dict(name=name, nodeagent='node0', portbase=portbase)
+
+
+@pytest.mark.parametrize('args, msg', [
+    (dict(nodes=[dict(NODE, name='n1', node_host='a'), dict(NODE, name='n1', node_host='b')]),
+     "Nodes listed more than once in nodes: n1"),
+    (dict(clusters=[dict(name='c1'), dict(name='c1')]),
+     "Clusters listed more than once in clusters: c1"),
+    (dict(clusters=[dict(name='c1', instances=[instance('i1')]), dict(name='c2', instances=[instance('i1', 28100)])]),
+     "Instances listed more than once in clusters: i1"),
+    (dict(clusters=[dict(name='c1', jms_hosts=[dict(JMS_HOST, name='mq'), dict(JMS_HOST, name='mq', port=7677)])]),
+     "JMS Hosts listed more than once in jms_hosts of cluster c1: mq"),
+])
+def test_duplicated_names_are_rejected_before_any_write(das, run_module, args, msg):
+    domain = MockDomain.build(nodes=1)
+    server = das(domain)
+    version = domain.version
+
+    result = run_module('gf_domain_topology', server, **args)
+
+    assert result['failed'] is True
+    assert result['msg'] == msg
+    assert domain.version == version
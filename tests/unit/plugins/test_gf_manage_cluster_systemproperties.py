@@ -0,0 +1,31 @@
+from mock_das import MockDomain
+
+
+def test_targets_plan_and_apply_with_inherited_properties(das, run_module, tmp_path):
+    domain = MockDomain.build(clusters=2, properties=2)
+    server = das(domain)
+    args = dict(targets=[dict(target='cluster', server_name='cluster0'),
+                         dict(target='cluster', server_name='cluster1', systemproperties=[dict(name='own', value='1')])],
+                systemproperties=[dict(name='prop0', value='changed')], plan_file=str(tmp_path / 'plan.json'))
+
+    planned = run_module('gf_manage_cluster_systemproperties', server, 'base_port', _ansible_check_mode=True, **args)
+    assert not planned.get('failed'), planned.get('msg')
+    assert len(planned['plan']['writes']) == 2
+    assert domain.clusters['cluster0']['system_properties']['prop0']['value'] == 'value0'
+
+    applied = run_module('gf_manage_cluster_systemproperties', server, 'base_port', apply_plan=True, **args)
+    assert not applied.get('failed'), applied.get('msg')
+    assert applied['changed']
+    assert domain.clusters['cluster0']['system_properties']['prop0']['value'] == 'changed'
+    assert domain.clusters['cluster1']['system_properties']['own']['value'] == '1'
+
+
+def test_apply_plan_rejects_other_parameters(das, run_module, tmp_path):
+    server = das(MockDomain.build(clusters=1, properties=1))
+    args = dict(target='cluster', server_name='cluster0', plan_file=str(tmp_path / 'plan.json'))
+    run_module('gf_manage_cluster_systemproperties', server, 'base_port', _ansible_check_mode=True,
+               systemproperties=[dict(name='prop0', value='a')], **args)
+    result = run_module('gf_manage_cluster_systemproperties', server, 'base_port', apply_plan=True,
+                        systemproperties=[dict(name='prop0', value='b')], **args)
+    assert result['failed']
+    assert 'different task parameters' in result['msg']
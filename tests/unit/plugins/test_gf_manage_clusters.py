@@ -0,0 +1,24 @@
+from mock_das import MockDomain
+
+
+def test_noop_probe_keeps_inventory_when_return_inventory(das, run_module, tmp_path):
+    server = das(MockDomain.build(clusters=2))
+    args = dict(cluster_name='cluster0', type='payara', state='present', noop_probe=True, cache_dir=str(tmp_path), return_inventory=True)
+
+    first = run_module('gf_manage_clusters', server, style='base_port', **args)
+    second = run_module('gf_manage_clusters', server, style='base_port', **args)
+
+    assert first['clusters'] == ['cluster0', 'cluster1']
+    assert second['clusters'] == first['clusters']
+    assert second['changed'] is False
+
+
+def test_noop_probe_skips_discovery_without_return_inventory(das, run_module, tmp_path):
+    server = das(MockDomain.build(clusters=2))
+    args = dict(cluster_name='cluster0', type='payara', state='present', noop_probe=True, cache_dir=str(tmp_path))
+
+    run_module('gf_manage_clusters', server, style='base_port', **args)
+    result = run_module('gf_manage_clusters', server, style='base_port', **args)
+
+    assert result['noop_probe']['skipped'] is True
+    assert 'clusters' not in result
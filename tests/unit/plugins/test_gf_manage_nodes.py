@@ -0,0 +1,33 @@
+from mock_das import MockDomain
+
+
+NODE = dict(node_sshuser_name='glassfish', node_path='/opt/glassfish/nodes', node_path_keyssh='')
+
+
+def test_single_node_ssh_port_drift_is_updated(das, run_module):
+    domain = MockDomain.build(nodes=1)
+    server = das(domain)
+
+    result = run_module('gf_manage_nodes', server, node_name='node0', node_host='host0.example.com',
+                        node_port_ssh=2222, **NODE)
+
+    assert result['changed'] is True
+    assert domain.ssh_connectors['node0']['connector']['sshPort'] == '2222'
+    assert 'sshPort' not in domain.nodes['node0']
+
+
+def test_bulk_ssh_user_drift_is_updated(das, run_module):
+    domain = MockDomain.build(nodes=2)
+    server = das(domain)
+    nodes = [dict(NODE, name=f"node{n}", node_host=f"host{n}.example.com") for n in range(2)]
+    nodes[1]['node_sshuser_name'] = 'payara'
+
+    result = run_module('gf_manage_nodes', server, nodes=nodes)
+
+    assert result['changed'] is True
+    assert domain.ssh_connectors['node0']['auth']['userName'] == 'glassfish'
+    assert domain.ssh_connectors['node1']['auth']['userName'] == 'payara'
+
+    # Sem drift, nada muda
+    result = run_module('gf_manage_nodes', server, nodes=nodes)
+    assert result['changed'] is False